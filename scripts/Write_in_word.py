@@ -1,171 +1,213 @@
+import os
+import copy
 import docx
 import pandas as pd
 
 from docx.shared import Inches, Cm, Mm
 
-def new_word_file(last_trading_day):
-    """Creates a new word file named Daily Marke Report As on {last_trading_day}"""
-
-    from docx.shared import Pt
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.shared import RGBColor
-
-    doc = docx.Document()
-    paragraph = doc.add_paragraph(f'------------------------------\nDaily Market Report \nAs on \n{last_trading_day}\n------------------------------')
-    paragraph_format = paragraph.paragraph_format
-
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Arial'
-    font.size = Pt(12)
-    # font.bold = True
-
-    font.color.rgb = RGBColor(7, 2, 56)
-
-    paragraph.style = doc.styles['Normal']
-
-    section = doc.sections[0]
-    section.page_height = Mm(297)
-    section.page_width = Mm(300)
+# Where reports and their charts live; override with environment variables
+REPORT_DIR = os.getenv("REPORT_DIR", os.path.expanduser("~/Documents/Python Projects/Daily Momentum Report"))
+CHART_DIR = os.getenv("REPORT_CHART_DIR", os.path.join(REPORT_DIR, "Charts"))
+INTRADAY_REPORT_DIR = os.getenv("INTRADAY_REPORT_DIR", os.path.expanduser("~/Reports"))
+INTRADAY_CHART_DIR = os.getenv("INTRADAY_CHART_DIR", os.path.join(INTRADAY_REPORT_DIR, "Charts"))
+
+
+def daily_report_path(last_trading_day, report_dir=REPORT_DIR):
+    return os.path.join(report_dir, f"Report as on {last_trading_day}.docx")
+
+
+def intraday_report_path(report_dir=INTRADAY_REPORT_DIR):
+    return os.path.join(report_dir, "Live Intraday Report.docx")
+
+
+class ReportBuilder:
+    """
+    Builds a Word report in memory and saves it once.
+
+    Tables are filled row by row (one template row copied per data row,
+    the text of its cells' runs set in place) instead of through table.cell(i, j),
+    which python-docx resolves by walking the whole table on every call.
+
+    Example:
+        report = ReportBuilder.daily(last_trading_day)
+        report.add_table("Top Gainers", gainers)
+        report.add_chart("NEPSE", "nepse.png")
+        report.save()
+    """
+
+    def __init__(self, output_path, chart_dir=CHART_DIR, cover_text=None, path=None):
+        """
+        Parameters:
+        - output_path: where save() writes the report
+        - chart_dir: folder add_chart reads chart files from
+        - cover_text: text of the cover page of a new report
+        - path: an existing report to continue instead of starting a new one
+        """
+        self.output_path = output_path
+        self.chart_dir = chart_dir
+        self.doc = docx.Document(path) if path else docx.Document()
+        if path is None and cover_text is not None:
+            self._add_cover(cover_text)
+
+    @classmethod
+    def daily(cls, last_trading_day, report_dir=REPORT_DIR, chart_dir=None):
+        """A new daily market report for last_trading_day."""
+        return cls(
+            daily_report_path(last_trading_day, report_dir),
+            chart_dir or os.path.join(report_dir, "Charts"),
+            f'------------------------------\nDaily Market Report \nAs on \n{last_trading_day}\n------------------------------'
+        )
+
+    @classmethod
+    def intraday(cls, report_dir=INTRADAY_REPORT_DIR, chart_dir=INTRADAY_CHART_DIR):
+        """A new intraday report stamped with the current time."""
+        import datetime
+
+        rounded_time = datetime.datetime.today().strftime("%Y-%m-%d %H:%M:%S")
+        return cls(
+            intraday_report_path(report_dir),
+            chart_dir,
+            f'------------------------------\nIntraday Report \nAs at \n{rounded_time}\n----------------------------------'
+        )
+
+    @classmethod
+    def open(cls, path, chart_dir=CHART_DIR):
+        """Continues an existing report; save() writes it back to the same path."""
+        return cls(path, chart_dir, path=path)
+
+    def _add_cover(self, cover_text):
+        from docx.shared import Pt
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import RGBColor
+
+        doc = self.doc
+        paragraph = doc.add_paragraph(cover_text)
+        paragraph_format = paragraph.paragraph_format
+
+        font = doc.styles['Normal'].font
+        font.name = 'Arial'
+        font.size = Pt(12)
+        font.color.rgb = RGBColor(7, 2, 56)
+
+        paragraph.style = doc.styles['Normal']
+
+        section = doc.sections[0]
+        section.page_height = Mm(297)
+        section.page_width = Mm(300)
+
+        for section in doc.sections:
+            section.left_margin = Cm(1.5)
+            section.right_margin = Cm(1.5)
+
+        paragraph_format.space_before = Pt(160)
+        paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        doc.add_page_break()
+
+    def add_table(self, table_title, df, style='Light Shading Accent 1'):
+        """Adds a titled table of df (header row plus one row per record) and two blank lines."""
+        doc = self.doc
+        doc.add_paragraph(table_title)
+
+        # Header row plus one template row whose cells each hold exactly one run,
+        # as cell.text leaves them
+        t = doc.add_table(2, df.shape[1], style=style)
+        for cell, column in zip(t.rows[0].cells, df.columns):
+            cell.text = str(column)
+        for cell in t.rows[1].cells:
+            cell.text = ''
+        template = t.rows[1]._tr
+
+        # One copy of the template row per record; the run's text setter turns
+        # newlines and tabs into breaks and tabs, as cell.text does
+        tbl = t._tbl
+        for record in df.itertuples(index=False, name=None):
+            tr = copy.deepcopy(template)
+            for run, value in zip(tr.iter(docx.oxml.ns.qn('w:r')), record):
+                run.text = str(value)
+            tbl.append(tr)
+        tbl.remove(template)
+
+        doc.add_paragraph('')
+        doc.add_paragraph('')
+        return t
+
+    def add_chart(self, chart_title, chart_file_name, ltp=None, volume=None, percent_turn=None, sup=None, rest=None,
+                  remarks=False, width=None, height=None):
+        """Adds a titled chart from chart_dir, optionally followed by level/turnover/support/resistance remarks."""
+        p = self.doc.add_paragraph()
+        r = p.add_run()
+        r.add_text(chart_title)
+        r.add_picture(os.path.join(self.chart_dir, chart_file_name), width=width, height=height)
+
+        if remarks:
+            r.add_text('Remarks:')
+            r.add_break()
+            r.add_text(f'Current Level : {ltp}')
+            r.add_break()
+            volume = volume / 10000000
+            r.add_text(f'Turnover : {volume.round(decimals=3)} Crores [{percent_turn}%]')
+            r.add_break()
+            r.add_text(f'Support : {sup}')
+            r.add_break()
+            r.add_text(f'Resistance : {rest}')
+        return p
+
+    def add_page_break(self):
+        self.doc.add_page_break()
+
+    def save(self, output_path=None):
+        """Writes the report, creating the folder if needed, and returns the path."""
+        output_path = output_path or self.output_path
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        self.doc.save(output_path)
+        return output_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.save()
 
-    sections = doc.sections
-    for section in sections:
-        section.left_margin = Cm(1.5)
-        section.right_margin = Cm(1.5)
 
-    paragraph_format.space_before, paragraph_format.space_after
-    paragraph_format.space_before = Pt(160)
-    paragraph_format.alignment
-    paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    doc.add_page_break()
-    doc.save(f'/Users/arun/Documents/Python Projects/Daily Momentum Report/Report as on {last_trading_day}.docx')
 #========================================================================================================================================================
+# One-call helpers: each opens, changes and saves the report. Prefer ReportBuilder for a whole report.
 #========================================================================================================================================================
 
-def df_to_word(last_trading_day, table_title, df):
-    """This function writes dataframe to word. last_trading_day is needed to save the doc file."""
+def new_word_file(last_trading_day, report_dir=REPORT_DIR):
+    """Creates a new word file named Daily Marke Report As on {last_trading_day}"""
+    ReportBuilder.daily(last_trading_day, report_dir).save()
 
-    pd.options.display.float_format = '{:.2f}'.format
-    # open an existing document
-#     doc = Document()
 
-    doc = docx.Document(f'/Users/arun/Documents/Python Projects/Daily Momentum Report/Report as on {last_trading_day}.docx')
-    
-    # add a table to the end and create a reference variable
-    # extra row is so we can add the header row
+def df_to_word(last_trading_day, table_title, df, report_dir=REPORT_DIR):
+    """This function writes dataframe to word. last_trading_day is needed to save the doc file."""
+    with pd.option_context('display.float_format', '{:.2f}'.format), \
+            ReportBuilder.open(daily_report_path(last_trading_day, report_dir)) as report:
+        report.add_table(table_title, df)
 
-    doc.add_paragraph(table_title)
 
-    t = doc.add_table(df.shape[0]+1, df.shape[1], style = 'Light Shading Accent 1')
+def chart_to_word(last_trading_day, chart_title, chart_file_name, ltp,volume, percent_turn, sup, rest,  remarks = False, big = False,
+                  report_dir=REPORT_DIR, chart_dir=None):
+    """
+    Inserts chart to word from the report's Charts folder, at the chart's own size.
 
-    # add the header rows.
-    for j in range(df.shape[-1]):
-        t.cell(0,j).text = df.columns[j]
+    big is accepted for the same call signature as chart_to_word_forintraday and
+    does not change the daily report.
+    """
+    with ReportBuilder.open(daily_report_path(last_trading_day, report_dir), chart_dir or os.path.join(report_dir, "Charts")) as report:
+        report.add_chart(chart_title, chart_file_name, ltp, volume, percent_turn, sup, rest, remarks=remarks)
 
-    # add the rest of the data frame
-    for i in range(df.shape[0]):
-        for j in range(df.shape[-1]):
-            t.cell(i+1,j).text = str(df.values[i,j])
-    doc.add_paragraph('')
-    doc.add_paragraph('')
-    # save the doc
-    doc.save(f'/Users/arun/Documents/Python Projects/Daily Momentum Report/Report as on {last_trading_day}.docx')
 
-#========================================================================================================================================================
-#========================================================================================================================================================
-def chart_to_word(last_trading_day, chart_title, chart_file_name, ltp,volume, percent_turn, sup, rest,  remarks = False, big = False):
-    """ Inserts chart to word from D:/Charts"""
-
-    doc = docx.Document(f'/Users/arun/Documents/Python Projects/Daily Momentum Report/Report as on {last_trading_day}.docx')
-    p = doc.add_paragraph()
-    r = p.add_run()
-    r.add_text(chart_title)
-    if big == True:
-        r.add_picture(f'/Users/arun/Documents/Python Projects/Daily Momentum Report/Charts/{chart_file_name}')#, width=Inches(10), height = Inches(9.2))
-    else:
-        r.add_picture(f'/Users/arun/Documents/Python Projects/Daily Momentum Report/Charts/{chart_file_name}')#, width=Inches(10), height = Inches(6))#
-        
-    if remarks == True:
-        r.add_text('Remarks:')
-        r.add_break()
-        r.add_text(f'Current Level : {ltp}')
-        r.add_break()
-        volume= volume/10000000
-        r.add_text(f'Turnover : {volume.round(decimals=3)} Crores [{percent_turn}%]')
-        r.add_break()
-        r.add_text(f'Support : {sup}')
-        r.add_break()
-        r.add_text(f'Resistance : {rest}')
-    else:
-        pass
-#     doc.add_page_break()
-    doc.save(f'/Users/arun/Documents/Python Projects/Daily Momentum Report/Report as on {last_trading_day}.docx')
-# ======================================================================================================================================== 
-def new_word_file_for_intradayreport():
+def new_word_file_for_intradayreport(report_dir=INTRADAY_REPORT_DIR):
     """Creates a new word file named Daily Marke Report As on {last_trading_day}"""
+    ReportBuilder.intraday(report_dir).save()
+
 
-    from docx.shared import Pt
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.shared import RGBColor
-    import datetime
-
-    current_time = datetime.datetime.today()
-    rounded_time = current_time.strftime("%Y-%m-%d %H:%M:%S")
-    doc = docx.Document()
-    paragraph = doc.add_paragraph(f'------------------------------\nIntraday Report \nAs at \n{rounded_time}\n----------------------------------')
-    paragraph_format = paragraph.paragraph_format
-
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Arial'
-    font.size = Pt(12)
-    # font.bold = True
-
-    font.color.rgb = RGBColor(7, 2, 56)
-
-    paragraph.style = doc.styles['Normal']
-
-    section = doc.sections[0]
-    section.page_height = Mm(297)
-    section.page_width = Mm(300)
-
-    sections = doc.sections
-    for section in sections:
-        section.left_margin = Cm(1.5)
-        section.right_margin = Cm(1.5)
-
-    paragraph_format.space_before, paragraph_format.space_after
-    paragraph_format.space_before = Pt(160)
-    paragraph_format.alignment
-    paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    doc.add_page_break()
-    doc.save(f'C:\\Users\\Dell\\Reports\\Live Intraday Report.docx')
-    
-    
-def chart_to_word_forintraday(last_trading_day, chart_title, chart_file_name, ltp,volume, percent_turn, sup, rest,  remarks = False, big = False):
-    """ Inserts chart to word from D:/Charts"""
-
-    doc = docx.Document(f'C:\\Users\\Dell\\Reports\\Live Intraday Report.docx')
-    p = doc.add_paragraph()
-    r = p.add_run()
-    r.add_text(chart_title)
-    if big == True:
-        r.add_picture(f'D:\\Charts\\{chart_file_name}', width=Inches(10), height = Inches(9.2))#
-    else:
-        r.add_picture(f'D:\\Charts\\{chart_file_name}', width=Inches(10), height = Inches(6))#
-        
-    if remarks == True:
-        r.add_text('Remarks:')
-        r.add_break()
-        r.add_text(f'Current Level : {ltp}')
-        r.add_break()
-        volume= volume/10000000
-        r.add_text(f'Turnover : {volume.round(decimals=3)} Crores [{percent_turn}%]')
-        r.add_break()
-        r.add_text(f'Support : {sup}')
-        r.add_break()
-        r.add_text(f'Resistance : {rest}')
-    else:
-        pass
-#     doc.add_page_break()
-    doc.save(f'C:\\Users\\Dell\\Reports\\Live Intraday Report.docx')
+def chart_to_word_forintraday(last_trading_day, chart_title, chart_file_name, ltp,volume, percent_turn, sup, rest,  remarks = False, big = False,
+                              report_dir=INTRADAY_REPORT_DIR, chart_dir=INTRADAY_CHART_DIR):
+    """ Inserts chart to word from the intraday Charts folder (INTRADAY_CHART_DIR), 9.2 inches high if big else 6"""
+    with ReportBuilder.open(intraday_report_path(report_dir), chart_dir) as report:
+        report.add_chart(
+            chart_title, chart_file_name, ltp, volume, percent_turn, sup, rest, remarks=remarks,
+            width=Inches(10), height=Inches(9.2) if big else Inches(6)
+        )
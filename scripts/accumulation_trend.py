@@ -1,34 +1,130 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from plotly.subplots import make_subplots
 from scripts.get_close_price import get_close_prices
+from scripts.broker_cube import buy_sell_totals
+from scripts.trading_calendar import TradingCalendar, symbol_cutoffs
+from scripts.broker_flows import compute_broker_flows
+from scripts.net_positions import NetPositions
+from scripts.image_export import get_image_exporter
 import os
 import plotly.express as px
 
+RENDER_MODES = ("svg", "webgl")
+
+
+def _add_trader_traces_webgl(fig, cumulative_df, max_labels):
+    """
+    Adds all traders' lines as one Scattergl trace per palette colour, each
+    trader's points separated by a gap, plus a single text trace labelling
+    the max_labels traders with the largest final position.
+    """
+    if cumulative_df.empty:
+        return
+    traders = cumulative_df.index.astype(str).to_numpy()
+    dates = pd.DatetimeIndex(cumulative_df.columns)
+    values = cumulative_df.to_numpy(dtype=float)
+    palette = px.colors.qualitative.Plotly
+
+    for color_index, color in enumerate(palette[:len(traders)]):
+        rows = np.arange(color_index, len(traders), len(palette))
+        # Each trader's points, then a None/NaN point so lines do not join
+        x = np.empty((len(rows), len(dates) + 1), dtype=object)
+        x[:, :-1] = dates.to_pydatetime()
+        y = np.column_stack([values[rows], np.full(len(rows), np.nan)])
+        fig.add_trace(go.Scattergl(
+            x=x.ravel(), y=y.ravel(), text=np.repeat(traders[rows], len(dates) + 1),
+            mode='lines+markers', line=dict(width=1, color=color), marker=dict(size=4, color=color),
+            hovertemplate="Trader %{text}<br>%{x|%b %d}: %{y:,.0f}<extra></extra>",
+            connectgaps=False, showlegend=False
+        ), secondary_y=False)
+
+    labelled = np.argsort(-values[:, -1], kind="stable")[:max_labels]
+    fig.add_trace(go.Scatter(
+        x=[dates[-1]] * len(labelled), y=values[labelled, -1],
+        text=traders[labelled], mode="text", textposition="middle right",
+        hoverinfo="skip", showlegend=False
+    ), secondary_y=False)
+
+
+def _load_stock_window(stock, days, calendar=None):
+    """
+    The stock's trades in its own last `days` trading days (or the last
+    `days` sessions of calendar) from the local store, reading its Date
+    column first to find where that window starts.
+    """
+    from scripts.floorsheet_store import load_floorsheet
+
+    if calendar is None:
+        calendar = TradingCalendar.from_frame(load_floorsheet(symbols=[stock], columns=["Date"]))
+    start_date = calendar.window_start(days) if len(calendar) else None
+    return load_floorsheet(symbols=[stock], start_date=start_date)
+
+
 def plot_top_buyers_sellers(
     df, price_history, stock, file_index,
-    output_folder=None, days=30, save=False, show=True
+    output_folder=None, days=30, save=False, show=True, calendar=None,
+    render="svg", max_labels=30, exporter=None
     ):
     """
     Plots top net buyers' cumulative positions with scaled VPT and closing price.
+
+    df may be trade-level floorsheet data, a broker cube (see broker_cube) or
+    NetPositions (see net_positions), which reads each trader's running net
+    position from prefix sums; pass df=None to read only the trades of the
+    window below from the local store.
+
+    The window is the stock's own last `days` trading days, or the last `days`
+    sessions of `calendar` (a TradingCalendar) when one is given.
+
+    render='svg' draws one line and one label trace per trader (up to 1000
+    traces); render='webgl' packs all trader lines into a few Scattergl
+    traces and labels only the max_labels largest final positions, which is
+    much faster to build, display and export.
+
+    With save=True the PNG is written through the process's warm ImageExporter
+    (see image_export); pass exporter to queue it on that exporter instead
+    and return without waiting for the write.
     """
+    if render not in RENDER_MODES:
+        raise ValueError(f"render must be one of {RENDER_MODES}")
     top_n = 500
     def filter_recent_trades(df, stock, days):
+        if isinstance(df, NetPositions):
+            sessions = calendar if calendar is not None else TradingCalendar(df.sessions(stock))
+            if len(sessions) == 0:
+                print(f"No data for stock: {stock}")
+                return None, None
+            if len(sessions) < days:
+                print(f"Not enough trading days: Requested {days}, Got {len(sessions)}")
+                return None, None
+            return df, sessions.last_n(days)
         df_stock = df[df["Stock Symbol"] == stock].copy()
         if df_stock.empty:
             print(f"No data for stock: {stock}")
             return None, None
-        unique_dates = df_stock['Date'].drop_duplicates().sort_values()
-        if len(unique_dates) < days:
-            print(f"Not enough trading days: Requested {days}, Got {len(unique_dates)}")
+        sessions = calendar if calendar is not None else TradingCalendar.from_frame(df_stock)
+        if len(sessions) < days:
+            print(f"Not enough trading days: Requested {days}, Got {len(sessions)}")
             return None, None
-        cutoff = unique_dates.iloc[-days]
-        return df_stock[df_stock["Date"] >= cutoff], unique_dates[unique_dates >= cutoff]
-
-    def compute_top_cumulative(df_filtered, full_date_range, top_n):
-        buy = df_filtered.groupby(["Buyer", "Date"])["Amount (Rs)"].sum().unstack(fill_value=0)
-        sell = df_filtered.groupby(["Seller", "Date"])["Amount (Rs)"].sum().unstack(fill_value=0)
+        date_range = sessions.last_n(days)
+        return df_stock[df_stock["Date"] >= date_range[0]], date_range
+
+    def compute_top_cumulative(df_filtered, date_range, full_date_range, top_n):
+        if isinstance(df_filtered, NetPositions):
+            # Same as the trade path: brokers that traded in the window ranked by their
+            # window net, lines accumulating only the net of days with a price
+            totals = df_filtered.window(date_range[0], date_range[-1], symbols=[stock])
+            top = totals.set_index("Broker")["net_amt"].nlargest(top_n).index
+            dates = pd.DatetimeIndex(full_date_range)
+            through = df_filtered.cumulative(stock, date_range[0], dates)
+            before = df_filtered.cumulative(stock, date_range[0], dates - pd.Timedelta(days=1))
+            daily = through - before.to_numpy()
+            return daily.loc[top].cumsum(axis=1)
+        buy, sell = buy_sell_totals(df_filtered, by=["Date"], value="Amount (Rs)")
+        buy, sell = buy.unstack(fill_value=0), sell.unstack(fill_value=0)
         all_dates = sorted(set(buy.columns).union(set(sell.columns)))
         buy, sell = buy.reindex(columns=all_dates, fill_value=0), sell.reindex(columns=all_dates, fill_value=0)
         net = buy.subtract(sell, fill_value=0)
@@ -50,6 +146,8 @@ def plot_top_buyers_sellers(
         return df[["Date", "Close", "VPT_Scaled"]].copy()
 
     # --- Begin processing ---
+    if df is None:
+        df = _load_stock_window(stock, days, calendar)
     df_filtered, date_range = filter_recent_trades(df, stock, days)
     if df_filtered is None:
         return None
@@ -57,27 +155,30 @@ def plot_top_buyers_sellers(
     price_data = get_close_prices(stock, date_range, price_history).dropna().sort_values("Date")
     full_dates = price_data["Date"].unique()
 
-    cumulative_df = compute_top_cumulative(df_filtered, full_dates, top_n)
+    cumulative_df = compute_top_cumulative(df_filtered, date_range, full_dates, top_n)
     vpt_df = compute_scaled_vpt(price_history, full_dates)
 
-    # Melt for plot
-    df_long = cumulative_df.T.reset_index().melt(id_vars="Date", var_name="Trader", value_name="Cumulative Amount (Rs)")
-
     # --- Plotting ---
     fig = make_subplots(rows=1, cols=1, shared_xaxes=True, specs=[[{"secondary_y": True}]])
 
     # Traders' net buys
-    for trader in df_long["Trader"].unique():
-        tdf = df_long[df_long["Trader"] == trader]
-        fig.add_trace(go.Scatter(
-            x=tdf["Date"], y=tdf["Cumulative Amount (Rs)"], mode='lines+markers',
-            name=trader, line=dict(width=1), showlegend=False
-        ), secondary_y=False)
-        # Add trader label at last point
-        fig.add_trace(go.Scatter(
-            x=[tdf["Date"].iloc[-1]], y=[tdf["Cumulative Amount (Rs)"].iloc[-1]],
-            text=[trader], mode="text", textposition="middle right", showlegend=False
-        ), secondary_y=False)
+    if render == "webgl":
+        _add_trader_traces_webgl(fig, cumulative_df, max_labels)
+    else:
+        # Melt for plot
+        df_long = cumulative_df.T.reset_index().melt(id_vars="Date", var_name="Trader", value_name="Cumulative Amount (Rs)")
+
+        for trader in df_long["Trader"].unique():
+            tdf = df_long[df_long["Trader"] == trader]
+            fig.add_trace(go.Scatter(
+                x=tdf["Date"], y=tdf["Cumulative Amount (Rs)"], mode='lines+markers',
+                name=trader, line=dict(width=1), showlegend=False
+            ), secondary_y=False)
+            # Add trader label at last point
+            fig.add_trace(go.Scatter(
+                x=[tdf["Date"].iloc[-1]], y=[tdf["Cumulative Amount (Rs)"].iloc[-1]],
+                text=[trader], mode="text", textposition="middle right", showlegend=False
+            ), secondary_y=False)
 
     # Closing price
     fig.add_trace(go.Scatter(
@@ -109,127 +210,93 @@ def plot_top_buyers_sellers(
         if output_folder is None:
             raise ValueError("Output folder must be provided when save=True")
         os.makedirs(output_folder, exist_ok=True)
-        fig.write_image(f"{output_folder}/{file_index}{stock}.png")
+        path = f"{output_folder}/{file_index}{stock}.png"
+        if exporter is not None:
+            exporter.submit(fig, path)
+        else:
+            get_image_exporter().write(fig, path)
 
 
 
-def calculate_cornering_strength(
+def compute_cornering_strength(
     combined_floorsheet,
     active_comps,
     float_data,
     top_n,
-    days=10
+    days=10,
+    calendar=None
 ):
     """
-    Calculates cornering strength for each stock based on the net buy/sell quantities 
-    of the top two brokers over the past N trading days.
+    Computes the cornering strength table without plotting.
+
+    For every non-index stock the window is its own last N trading days, or
+    the last N sessions of `calendar` (a TradingCalendar) when one is given;
+    either way, stocks with fewer than N trading days are left out. The net amount per broker over that window is computed for all stocks in
+    one grouped pass, and the top broker's net is compared with the second's.
+
+    combined_floorsheet may be trade-level data or a broker cube (see broker_cube).
 
     Returns:
         pd.DataFrame with columns:
         Ticker, x up from 2nd Broker, Buyer Broker, Kitta, % of Float Kitta
     """
 
-    import pandas as pd
-    import plotly.express as px
-
-    # -----------------------------
-    # Group floorsheet by symbol
-    # -----------------------------
-    grouped_floorsheet = dict(
-        tuple(combined_floorsheet.groupby("Stock Symbol"))
-    )
-
-    # Remove problematic symbols
+    # Only non-index stocks, without the problematic symbols
     symbols_to_remove = {"NLO", "BNL", "BNT", "UNL"}
-    for symbol in symbols_to_remove:
-        grouped_floorsheet.pop(symbol, None)
-
-    # Only non-index stocks
     tickers = active_comps.loc[
         active_comps["Sector"] != "Index", "Ticker"
     ]
+    tickers = tickers[~tickers.isin(symbols_to_remove)].drop_duplicates()
 
-    all_stock = []
+    df = combined_floorsheet[combined_floorsheet["Stock Symbol"].isin(tickers)]
+    dates = pd.to_datetime(df["Date"])
 
     # -----------------------------
-    # Main loop
+    # Window cutoff: the N-th last session of the calendar, or of each stock
     # -----------------------------
-    for symbol in tickers:
-        df_filtered = grouped_floorsheet.get(symbol)
-
-        if df_filtered is None or df_filtered.empty:
-            continue
-
-        # Ensure Date is datetime
-        df_filtered = df_filtered.copy()
-        df_filtered["Date"] = pd.to_datetime(df_filtered["Date"])
-
-        # Get last N trading days
-        unique_dates = df_filtered["Date"].drop_duplicates().sort_values()
-
-        if len(unique_dates) < days:
-            continue
-
-        cutoff_date = unique_dates.iloc[-days]
-        df_filtered = df_filtered[df_filtered["Date"] >= cutoff_date]
-
-        if df_filtered.empty:
-            continue
-
-        # -----------------------------
-        # Buy vs Sell aggregation
-        # -----------------------------
-        buy_qty = (
-            df_filtered
-            .groupby(["Buyer", "Date"])["Amount (Rs)"]
-            .sum()
-            .unstack(fill_value=0)
-        )
-
-        sell_qty = (
-            df_filtered
-            .groupby(["Seller", "Date"])["Amount (Rs)"]
-            .sum()
-            .unstack(fill_value=0)
-        )
-
-        pivot_table_diff = buy_qty.sub(sell_qty, fill_value=0)
-        pivot_table_diff["Total"] = pivot_table_diff.sum(axis=1)
-        pivot_table_diff = pivot_table_diff.sort_values(
-            by="Total", ascending=False
-        )
-
-        # Need at least 2 brokers
-        if pivot_table_diff.shape[0] < 2:
-            continue
-
-        first_accumulator = pivot_table_diff.iloc[0]["Total"]
-        second_accumulator = pivot_table_diff.iloc[1]["Total"]
-
-        if pd.isna(first_accumulator) or second_accumulator == 0:
-            continue
-
-        difference_ratio = first_accumulator / second_accumulator
-
-        all_stock.append({
-            "Ticker": symbol,
-            "x up from 2nd Broker": difference_ratio,
-            "Buyer Broker": pivot_table_diff.index[0],
-            "Kitta": first_accumulator
-        })
+    # Stocks with fewer than N sessions have no cutoff and stay out of the window
+    cutoffs = symbol_cutoffs(df, days)
+    if calendar is not None:
+        eligible = df["Stock Symbol"].astype(str).isin(cutoffs.index).to_numpy()
+        in_window = (dates >= calendar.nth_last(days)).to_numpy() & eligible
+    else:
+        in_window = dates.to_numpy() >= cutoffs.reindex(df["Stock Symbol"].astype(str)).to_numpy()
+    df_window = df[in_window]
 
     # -----------------------------
-    # SAFETY: empty result
+    # Net amount per (symbol, broker) in one pass
     # -----------------------------
-    if not all_stock:
+    buy, sell = buy_sell_totals(df_window, by=["Stock Symbol"], value="Amount (Rs)")
+    buy = buy.rename_axis(["Broker", "Stock Symbol"])
+    sell = sell.rename_axis(["Broker", "Stock Symbol"])
+    net = buy.sub(sell, fill_value=0).rename("Total").reset_index()
+    net["Stock Symbol"] = net["Stock Symbol"].astype(str)
+
+    # Top two brokers of each symbol
+    net = net.sort_values(["Stock Symbol", "Total"], ascending=[True, False], kind="stable")
+    net["Position"] = net.groupby("Stock Symbol").cumcount()
+    first = net[net["Position"] == 0].set_index("Stock Symbol")
+    second = net[net["Position"] == 1].set_index("Stock Symbol")["Total"]
+
+    top = first.join(second.rename("Second"), how="inner")
+    top = top[top["Total"].notna() & (top["Second"] != 0)]
+
+    if top.empty:
         print("No stocks qualified for cornering strength.")
         return pd.DataFrame()
 
     # -----------------------------
     # Build final DataFrame
     # -----------------------------
+    # Keep the active_comps ticker order
+    top = top.loc[[ticker for ticker in tickers.astype(str) if ticker in top.index]]
     df = (
-        pd.DataFrame(all_stock)
+        pd.DataFrame({
+            "Ticker": top.index,
+            "x up from 2nd Broker": (top["Total"] / top["Second"]).to_numpy(),
+            "Buyer Broker": top["Broker"].to_numpy(),
+            "Kitta": top["Total"].to_numpy()
+        })
         .sort_values("x up from 2nd Broker", ascending=False)
         .head(top_n)
     )
@@ -247,7 +314,43 @@ def calculate_cornering_strength(
     )
 
     df.drop(columns=["Symbol", "Floated Shares"], inplace=True)
-    df = df.round(2)
+    return df.round(2)
+
+
+def calculate_cornering_strength(
+    combined_floorsheet,
+    active_comps,
+    float_data,
+    top_n,
+    days=10,
+    show=True,
+    calendar=None
+):
+    """
+    Calculates cornering strength for each stock based on the net buy/sell quantities 
+    of the top two brokers over the past N trading days, and plots it.
+
+    combined_floorsheet may be trade-level data or a broker cube (see broker_cube).
+    Use compute_cornering_strength for the table alone.
+
+    Returns:
+        pd.DataFrame with columns:
+        Ticker, x up from 2nd Broker, Buyer Broker, Kitta, % of Float Kitta
+    """
+
+    df = compute_cornering_strength(combined_floorsheet, active_comps, float_data, top_n, days, calendar)
+    if df.empty:
+        return df
+
+    if show:
+        plot_cornering_strength(df).show()
+
+    return df
+
+
+def plot_cornering_strength(table):
+    """Horizontal bar chart of a compute_cornering_strength table."""
+    df = table.copy()
 
     # -----------------------------
     # Plot labels
@@ -303,9 +406,7 @@ def calculate_cornering_strength(
         marker_color="darkcyan"
     )
 
-    
-
-    return fig.show()
+    return fig
 
 
 
@@ -314,80 +415,42 @@ def calculate_cornering_strength(
 def plot_buyer_seller_sankey(
     df, stock, file_index=None,
     output_folder=None, days=30,
-    save=False, show=True, top_n=10
+    save=False, show=True, top_n=10, calendar=None,
+    format="html", exporter=None
 ):
-    df_stock = df[df["Stock Symbol"] == stock].copy()
-    if df_stock.empty:
+    """
+    Plots seller -> buyer flows between the top net sellers and net buyers of a stock.
+
+    The window is the stock's own last `days` trading days (all of them if it
+    has fewer), or the last `days` sessions of `calendar` when one is given;
+    pass df=None to read only that window's trades from the local store.
+    Use broker_flows.compute_broker_flows to compute the flows of many stocks at once.
+
+    save=True writes an interactive HTML file by default; format='png' or
+    'svg' writes a static image through the process's warm ImageExporter
+    (or queues it on exporter when one is given).
+    """
+    if df is None:
+        df = _load_stock_window(stock, days, calendar)
+    flows = compute_broker_flows(df, [stock], days=days, top_n=top_n, calendar=calendar).get(stock)
+    if flows is None:
         raise ValueError(f"No data found for stock: {stock}")
-    
-    df_stock["Date"] = pd.to_datetime(df_stock["Date"])
-    unique_dates = df_stock["Date"].sort_values().unique()
-    cutoff = unique_dates[0] if len(unique_dates) < days else unique_dates[-days]
-    df_filtered = df_stock[df_stock["Date"] >= cutoff]
-
-    # Compute total bought and sold
-    total_bought = df_filtered.groupby("Buyer")["Amount (Rs)"].sum()
-    total_sold = df_filtered.groupby("Seller")["Amount (Rs)"].sum()
-
-    brokers = pd.concat([total_bought, total_sold], axis=1, keys=["Bought", "Sold"]).fillna(0)
-    brokers["Net"] = brokers["Bought"] - brokers["Sold"]
-    
-    # Split into net sellers and net buyers
-    net_sellers = brokers[brokers["Net"] < 0].copy()
-    net_buyers = brokers[brokers["Net"] > 0].copy()
-
-    # Keep top N by absolute net position
-    top_sellers = net_sellers["Net"].abs().nlargest(top_n).index.tolist()
-    top_buyers = net_buyers["Net"].nlargest(top_n).index.tolist()
-
-    # Filter original trades for only these brokers
-    flow_df = df_filtered[
-        df_filtered["Seller"].isin(top_sellers) & df_filtered["Buyer"].isin(top_buyers)
-    ].groupby(["Seller", "Buyer"])["Amount (Rs)"].sum().reset_index()
-
-    if flow_df.empty:
+
+    if flows.empty:
         print("No matching flows found between top sellers and buyers.")
         return None
 
-    # Create node list with unique sellers and buyers (no overlap)
-    sellers = sorted(flow_df["Seller"].unique())
-    buyers = sorted(flow_df["Buyer"].unique())
-    nodes = sellers + buyers
-    node_map = {name: i for i, name in enumerate(nodes)}
-
-    # Build Sankey structure
-    sources = flow_df["Seller"].map(node_map).tolist()
-    targets = flow_df["Buyer"].map(node_map).tolist()
-    values = flow_df["Amount (Rs)"].tolist()
-
-    fig = go.Figure(go.Sankey(
-        node=dict(
-            pad=15,
-            thickness=20,
-            line=dict(color="black", width=0.5),
-            label=nodes,
-            color=["#FF9999"] * len(sellers) + ["#99CCFF"] * len(buyers)
-        ),
-        link=dict(
-            source=sources,
-            target=targets,
-            value=values,
-            color='rgba(160,160,160,0.4)',
-            hovertemplate='<b>%{source.label}</b> → <b>%{target.label}</b><br>Shares: %{value:,}<extra></extra>'
-        )
-    ))
-
-    fig.update_layout(
-        title_text=f"{stock} Net Broker Flows (Last {len(df_filtered['Date'].unique())} Days)",
-        font_size=12,
-        width=1000,
-        height=600
-    )
+    fig = flows.figure()
 
     if save:
         os.makedirs(output_folder, exist_ok=True)
-        filename = f"sankey_clean_{stock}_{file_index}.html" if file_index else f"sankey_clean_{stock}.html"
-        fig.write_html(os.path.join(output_folder, filename))
+        filename = f"sankey_clean_{stock}_{file_index}.{format}" if file_index else f"sankey_clean_{stock}.{format}"
+        if format == "html":
+            fig.write_html(os.path.join(output_folder, filename))
+        elif exporter is not None:
+            exporter.submit(fig, os.path.join(output_folder, filename))
+        else:
+            get_image_exporter().write(fig, os.path.join(output_folder, filename))
 
     if show:
         fig.show()
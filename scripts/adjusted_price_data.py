@@ -1,32 +1,71 @@
-import pandas as pd 
+import os
+import io
+import json
+import pandas as pd
 import numpy as np
 
-def get_adjusted_price_of_all_companies():
-    import os
+ADJUSTED_PRICE_URL = (
+    "https://raw.githubusercontent.com/"
+    "Arun-Lama/Adjusted-price-to-sheet/main/"
+    "adjusted price/all_adj_companies_data.csv"
+)
+DEFAULT_CACHE_DIR = os.getenv(
+    "ADJUSTED_PRICE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Floorsheet", "store", "adjusted_price")
+)
+
+
+def _read_price_csv(content):
+    """Parses the CSV payload straight from bytes, with the pyarrow engine when available."""
+    try:
+        return pd.read_csv(io.BytesIO(content), engine="pyarrow")
+    except (ImportError, ValueError):
+        return pd.read_csv(io.BytesIO(content))
+
+
+def get_adjusted_price_of_all_companies(url=ADJUSTED_PRICE_URL, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """
+    Returns the adjusted price history of all companies sorted by Date.
+
+    With use_cache the download is revalidated with If-None-Match; when GitHub
+    answers 304 Not Modified the local Parquet copy is returned instead.
+    """
     import requests
-    import io
     from dotenv import load_dotenv
-    
+
     load_dotenv()
-    
+
     GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-    
-    url = (
-        "https://raw.githubusercontent.com/"
-        "Arun-Lama/Adjusted-price-to-sheet/main/"
-        "adjusted price/all_adj_companies_data.csv"
-    )
-    
+
     headers = {
         "Authorization": f"token {GITHUB_TOKEN}"
     }
-    
+
+    parquet_path = os.path.join(cache_dir, "all_adj_companies_data.parquet")
+    meta_path = os.path.join(cache_dir, "meta.json")
+    meta = {}
+    if use_cache and os.path.exists(parquet_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+
     response = requests.get(url, headers=headers)
+    if response.status_code == 304:
+        return clean_price_data(pd.read_parquet(parquet_path))
     response.raise_for_status()
-    
-    df = pd.read_csv(io.StringIO(response.text))
+
+    df = _read_price_csv(response.content)
     df['Date'] = pd.to_datetime(df['Date'])
-    df.sort_values(by = ['Date'], ascending = True, inplace = True) 
+    df.sort_values(by = ['Date'], ascending = True, inplace = True)
+
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_parquet(parquet_path + ".tmp", index=False)
+        os.replace(parquet_path + ".tmp", parquet_path)
+        with open(meta_path, "w") as f:
+            json.dump({"etag": response.headers.get("ETag")}, f)
+
     return clean_price_data(df)
 
 def clean_price_data(df: pd.DataFrame) -> pd.DataFrame:
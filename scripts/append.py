@@ -1,34 +1,29 @@
 import os
+import sys
 import pandas as pd
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.floorsheet_store import append_to_store, read_manifest
+
 # Define paths
 base_path = os.path.expanduser("~/Downloads/Semi_A_FS_Data/")
-parquet_file = "/Users/arun/Documents/Python Projects/Floorsheet Code/Floorsheet/combined_data.parquet"
-
-# Collect all CSV files
-csv_files = [os.path.join(base_path, f) for f in os.listdir(base_path) if f.endswith(".csv")]
-
-# Read and concatenate all CSVs
-dataframes = []
-for f in csv_files:
-    df = pd.read_csv(f, dtype=str)  # Read all columns as strings to avoid type issues
-    dataframes.append(df)
-
-combined_csv_data = pd.concat(dataframes, ignore_index=True)
-
-# Optional: replace NaNs with empty string if needed
-combined_csv_data = combined_csv_data.fillna("")
-
-# Load existing Parquet data if exists
-if os.path.exists(parquet_file):
-    existing_data = pd.read_parquet(parquet_file)
-    # Ensure matching dtypes
-    existing_data = existing_data.astype(str).fillna("")
-    final_data = pd.concat([existing_data, combined_csv_data], ignore_index=True)
-else:
-    final_data = combined_csv_data
-
-# Save to Parquet
-final_data.to_parquet(parquet_file, index=False)
-
-print(f"Appended {len(combined_csv_data)} rows to {parquet_file}")
+store_dir = "/Users/arun/Documents/Python Projects/Floorsheet Code/Floorsheet/combined_data"
+# Single-file history written by earlier versions of this script, imported once
+legacy_parquet_file = "/Users/arun/Documents/Python Projects/Floorsheet Code/Floorsheet/combined_data.parquet"
+
+# One-time import of the legacy file into the partitioned store
+if os.path.exists(legacy_parquet_file) and not read_manifest(store_dir)["files"]:
+    imported = append_to_store(pd.read_parquet(legacy_parquet_file), store_dir, source="legacy")
+    print(f"Imported {imported} rows from {legacy_parquet_file}")
+
+# Collect all CSV files and the Parquet files written by exceltocsv.py
+data_files = [os.path.join(base_path, f) for f in os.listdir(base_path) if f.endswith((".csv", ".parquet"))]
+
+# Append each file as new partitions; already stored contracts are skipped and
+# existing partitions are never rewritten
+total = 0
+for f in sorted(data_files):
+    data = pd.read_parquet(f) if f.endswith(".parquet") else pd.read_csv(f)
+    total += append_to_store(data, store_dir, source="local")
+
+print(f"Appended {total} rows to {store_dir}")
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scripts.trading_calendar import TradingCalendar
+
+STATUS_FILE = "_batch_status.json"
+
+
+def _chart_path(output_folder, file_index, stock):
+    return os.path.join(output_folder, f"{file_index}{stock}.png")
+
+
+def _render_accumulation_chart(file_index, stock, df_stock, price_stock, output_folder, days, render="svg"):
+    """Worker: renders one stock's accumulation chart and returns (stock, seconds, error)."""
+    from scripts.accumulation_trend import plot_top_buyers_sellers
+
+    start = time.perf_counter()
+    try:
+        plot_top_buyers_sellers(
+            df_stock, price_stock, stock, file_index,
+            output_folder=output_folder, days=days, save=True, show=False, render=render
+        )
+        error = None if os.path.exists(_chart_path(output_folder, file_index, stock)) else "no chart written"
+    except Exception as e:
+        message = str(e).strip().splitlines()
+        error = f"{type(e).__name__}: {message[0] if message else ''}"
+    return stock, time.perf_counter() - start, error
+
+
+def _last_sessions(df_stock, days):
+    """Keeps the stock's last `days` trading dates, all plot_top_buyers_sellers reads."""
+    calendar = TradingCalendar.from_frame(df_stock)
+    if len(calendar) < days:
+        return df_stock
+    return df_stock[df_stock["Date"] >= calendar.nth_last(days)]
+
+
+def render_accumulation_charts(
+    df, price_history, tickers, output_folder,
+    days=30, max_workers=None, resume=True, render="svg"
+):
+    """
+    Renders plot_top_buyers_sellers PNGs for many stocks across a process pool.
+
+    The floorsheet and price history are split by symbol once and each worker
+    only receives its stock's slice. Progress is kept in a status file in
+    output_folder; with resume=True stocks whose chart already exists are
+    skipped, so a failed or interrupted sweep picks up where it stopped.
+
+    Parameters:
+    - df: floorsheet (trades or broker cube)
+    - price_history: adjusted price data with 'Ticker', 'Date', 'Close', 'Turnover'
+    - tickers: symbols to render; the position in this list is the file index
+    - output_folder: where '<index><stock>.png' files are written
+    - days: trading days per chart
+    - max_workers: processes to use, defaults to the number of CPUs
+    - resume: skip stocks whose chart already exists
+    - render: 'svg' or 'webgl' (see plot_top_buyers_sellers)
+
+    Returns:
+    - DataFrame with 'Stock', 'Seconds' and 'Error' per rendered stock
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    status_path = os.path.join(output_folder, STATUS_FILE)
+    status = {}
+    if resume and os.path.exists(status_path):
+        with open(status_path) as f:
+            status = json.load(f)
+
+    tickers = list(tickers)
+    pending = [
+        (file_index, stock) for file_index, stock in enumerate(tickers)
+        if not (resume and os.path.exists(_chart_path(output_folder, file_index, stock)))
+    ]
+    print(f"{len(pending)} chart(s) to render, {len(tickers) - len(pending)} already done")
+
+    # Slice once per stock
+    wanted = {stock for _, stock in pending}
+    df = df[df["Stock Symbol"].isin(wanted)].assign(Date=lambda d: pd.to_datetime(d["Date"]))
+    stock_slices = {str(stock): rows for stock, rows in df.groupby("Stock Symbol", observed=True)}
+    price_slices = {
+        str(stock): rows for stock, rows in price_history[price_history["Ticker"].isin(wanted)].groupby("Ticker")
+    }
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for file_index, stock in pending:
+            df_stock = stock_slices.get(stock)
+            if df_stock is None:
+                results.append({"Stock": stock, "Seconds": 0.0, "Error": "no trades"})
+                continue
+            futures.append(executor.submit(
+                _render_accumulation_chart, file_index, stock,
+                _last_sessions(df_stock, days), price_slices.get(stock, price_history.iloc[:0]),
+                output_folder, days, render
+            ))
+
+        for future in as_completed(futures):
+            stock, seconds, error = future.result()
+            results.append({"Stock": stock, "Seconds": seconds, "Error": error})
+            status[stock] = {"seconds": round(seconds, 3), "error": error}
+            with open(status_path, "w") as f:
+                json.dump(status, f, indent=1, sort_keys=True)
+            print(f"{stock}: {seconds:.2f}s" + (f" FAILED ({error})" if error else ""))
+
+    report = pd.DataFrame(results, columns=["Stock", "Seconds", "Error"])
+    failed = report["Error"].notna().sum()
+    print(f"Rendered {len(report) - failed} chart(s) in {time.perf_counter() - start:.1f}s, {failed} failed")
+    return report
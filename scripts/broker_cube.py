@@ -0,0 +1,146 @@
+import os
+import pandas as pd
+
+from scripts.floorsheet_store import DEFAULT_STORE_DIR, read_manifest, write_manifest, store_trading_dates
+
+CUBE_DIR = "cube"
+CUBE_KEYS = ["Date", "Stock Symbol", "Broker"]
+CUBE_COLUMNS = CUBE_KEYS + ["buy_qty", "sell_qty", "buy_amt", "sell_amt", "buy_trades", "sell_trades"]
+
+# Trade-level value columns and their buy/sell columns in the cube
+CUBE_VALUES = {
+    "Quantity": ("buy_qty", "sell_qty"),
+    "Amount (Rs)": ("buy_amt", "sell_amt"),
+}
+
+
+def build_broker_cube(trades):
+    """
+    Aggregates trades to one row per (Date, Stock Symbol, Broker) with bought and
+    sold quantity, amount and trade counts.
+
+    Parameters:
+    - trades: floorsheet with 'Date', 'Stock Symbol', 'Buyer', 'Seller', 'Quantity', 'Amount (Rs)'
+
+    Returns:
+    - DataFrame with CUBE_COLUMNS
+    """
+    trades = trades.assign(Date=pd.to_datetime(trades["Date"]))
+
+    sides = []
+    for side, broker_column in (("buy", "Buyer"), ("sell", "Seller")):
+        sides.append(
+            trades.groupby(["Date", "Stock Symbol", broker_column], observed=True)
+            .agg(**{
+                f"{side}_qty": ("Quantity", "sum"),
+                f"{side}_amt": ("Amount (Rs)", "sum"),
+                f"{side}_trades": ("Quantity", "size"),
+            })
+            .rename_axis(CUBE_KEYS)
+        )
+
+    cube = sides[0].join(sides[1], how="outer").fillna(0).reset_index()
+    for column in ["buy_qty", "sell_qty", "buy_trades", "sell_trades"]:
+        cube[column] = cube[column].astype("int64")
+    return cube[CUBE_COLUMNS]
+
+
+def is_broker_cube(df):
+    """True when df is a broker cube rather than trade-level floorsheet data."""
+    return "buy_trades" in df.columns and "Broker" in df.columns
+
+
+def buy_sell_totals(df, by=("Date",), value="Amount (Rs)"):
+    """
+    Bought and sold totals per broker from either trades or a broker cube.
+
+    Parameters:
+    - df: floorsheet trades or a broker cube
+    - by: extra grouping columns, e.g. ("Date",) or ("Stock Symbol",)
+    - value: 'Amount (Rs)' or 'Quantity'
+
+    Returns:
+    - (buy, sell): Series indexed by ('Buyer', *by) and ('Seller', *by), the same
+      as groupby(['Buyer', *by])[value].sum() on trades
+    """
+    by = list(by)
+    if not is_broker_cube(df):
+        buy = df.groupby(["Buyer"] + by, observed=True)[value].sum()
+        sell = df.groupby(["Seller"] + by, observed=True)[value].sum()
+        return buy, sell
+
+    buy_column, sell_column = CUBE_VALUES[value]
+    buy = df[df["buy_trades"] > 0].groupby(["Broker"] + by, observed=True)[buy_column].sum()
+    sell = df[df["sell_trades"] > 0].groupby(["Broker"] + by, observed=True)[sell_column].sum()
+    buy = buy.rename_axis(["Buyer"] + by).rename(value)
+    sell = sell.rename_axis(["Seller"] + by).rename(value)
+    return buy, sell
+
+
+def update_broker_cube(store_dir=DEFAULT_STORE_DIR):
+    """
+    Builds cube partitions for store partitions that do not have one yet.
+
+    Trade partitions are immutable, so each gets its cube once; a partition
+    re-downloaded by the sync loses its cube entry and is rebuilt here.
+
+    Returns:
+    - number of cube partitions written
+    """
+    manifest = read_manifest(store_dir)
+    os.makedirs(os.path.join(store_dir, CUBE_DIR), exist_ok=True)
+
+    built = 0
+    for name, entry in manifest["files"].items():
+        if entry.get("cube") and os.path.exists(os.path.join(store_dir, entry["cube"])):
+            continue
+        trades = pd.read_parquet(
+            os.path.join(store_dir, entry["path"]),
+            columns=["Date", "Stock Symbol", "Buyer", "Seller", "Quantity", "Amount (Rs)"]
+        )
+        rel_path = os.path.join(CUBE_DIR, os.path.basename(entry["path"]))
+        build_broker_cube(trades).to_parquet(os.path.join(store_dir, rel_path), index=False)
+        entry["cube"] = rel_path
+        built += 1
+
+    if built:
+        write_manifest(manifest, store_dir)
+    return built
+
+
+def load_broker_cube(store_dir=DEFAULT_STORE_DIR, symbols=None, last_n_trading_days=None, update=True):
+    """
+    Reads the broker cube from the store.
+
+    Parameters:
+    - store_dir: location of the store
+    - symbols: optional list of Stock Symbols to keep
+    - last_n_trading_days: optional number of most recent trading dates to keep
+    - update: build missing cube partitions first
+
+    Returns:
+    - DataFrame with CUBE_COLUMNS sorted by Date
+    """
+    if update:
+        update_broker_cube(store_dir)
+    manifest = read_manifest(store_dir)
+
+    entries = list(manifest["files"].values())
+    if last_n_trading_days is not None:
+        wanted = set(store_trading_dates(store_dir, manifest)[-last_n_trading_days:])
+        entries = [entry for entry in entries if wanted.intersection(entry.get("dates") or [entry["min_date"], entry["max_date"]])]
+
+    filters = [("Stock Symbol", "in", list(symbols))] if symbols is not None else None
+    parts = [pd.read_parquet(os.path.join(store_dir, entry["cube"]), filters=filters) for entry in entries if entry.get("cube")]
+    if not parts:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+
+    cube = pd.concat(parts, ignore_index=True)
+    if last_n_trading_days is not None:
+        cube = cube[cube["Date"] >= pd.Timestamp(min(wanted))]
+
+    # A date appended in several parts has several cube rows per key
+    if cube.duplicated(CUBE_KEYS).any():
+        cube = cube.groupby(CUBE_KEYS, as_index=False, observed=True).sum()
+
+    return cube.sort_values("Date", kind="stable").reset_index(drop=True)
@@ -0,0 +1,144 @@
+import os
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from scripts.trading_calendar import symbol_cutoffs
+from scripts.image_export import get_image_exporter
+
+
+class BrokerFlows:
+    """
+    Seller -> buyer flows of one stock between its top net sellers and top net buyers.
+
+    Holds only the small flow table; the Sankey figure is built when figure()
+    is called, so flows for a whole watchlist can be computed up front and
+    rendered one at a time.
+    """
+
+    def __init__(self, stock, sessions, flows):
+        self.stock = stock
+        self.sessions = sessions
+        self.flows = flows
+        self.sellers = sorted(flows["Seller"].unique())
+        self.buyers = sorted(flows["Buyer"].unique())
+
+    def __repr__(self):
+        return f"BrokerFlows({self.stock!r}, {len(self.sellers)} sellers, {len(self.buyers)} buyers, {len(self.flows)} flows)"
+
+    @property
+    def empty(self):
+        return self.flows.empty
+
+    def figure(self):
+        """The Sankey figure of these flows."""
+        # Node list with unique sellers and buyers (no overlap)
+        nodes = self.sellers + self.buyers
+        node_map = {name: i for i, name in enumerate(nodes)}
+
+        fig = go.Figure(go.Sankey(
+            node=dict(
+                pad=15,
+                thickness=20,
+                line=dict(color="black", width=0.5),
+                label=nodes,
+                color=["#FF9999"] * len(self.sellers) + ["#99CCFF"] * len(self.buyers)
+            ),
+            link=dict(
+                source=self.flows["Seller"].map(node_map).tolist(),
+                target=self.flows["Buyer"].map(node_map).tolist(),
+                value=self.flows["Amount (Rs)"].tolist(),
+                color='rgba(160,160,160,0.4)',
+                hovertemplate='<b>%{source.label}</b> → <b>%{target.label}</b><br>Shares: %{value:,}<extra></extra>'
+            )
+        ))
+
+        fig.update_layout(
+            title_text=f"{self.stock} Net Broker Flows (Last {self.sessions} Days)",
+            font_size=12,
+            width=1000,
+            height=600
+        )
+        return fig
+
+
+def _top_per_symbol(net, top_n, ascending):
+    """(Stock Symbol, Broker) pairs of the top_n brokers of each symbol by Net, ties in broker order."""
+    ranked = net.sort_values(["Stock Symbol", "Net"], ascending=[True, ascending], kind="stable")
+    ranked = ranked[ranked.groupby("Stock Symbol").cumcount() < top_n]
+    return pd.MultiIndex.from_frame(ranked[["Stock Symbol", "Broker"]])
+
+
+def compute_broker_flows(df, symbols=None, days=30, top_n=10, calendar=None):
+    """
+    Top net buyers, top net sellers and the seller -> buyer flows between them
+    for every symbol in one grouped pass.
+
+    Parameters:
+    - df: trade-level floorsheet with 'Date', 'Stock Symbol', 'Buyer', 'Seller', 'Amount (Rs)'
+    - symbols: optional list of symbols, all symbols in df by default
+    - days: each symbol's own last `days` trading days (all of them if it has fewer),
+      or the last `days` sessions of `calendar` when one is given
+    - top_n: net buyers and net sellers kept per symbol
+    - calendar: optional TradingCalendar
+
+    Returns:
+    - dict of symbol -> BrokerFlows; flows may be empty when the top sellers and
+      buyers did not trade with each other
+    """
+    columns = ["Date", "Stock Symbol", "Buyer", "Seller", "Amount (Rs)"]
+    df = df[columns] if symbols is None else df.loc[df["Stock Symbol"].isin(list(symbols)), columns]
+    df = df.assign(Date=pd.to_datetime(df["Date"]), **{"Stock Symbol": df["Stock Symbol"].astype(str)})
+
+    # Window: the N-th last session of the calendar, or of each symbol
+    if calendar is not None:
+        df = df[df["Date"] >= calendar.last_n(days)[0]]
+    else:
+        cutoffs = symbol_cutoffs(df, days)
+        cutoff = cutoffs.reindex(df["Stock Symbol"]).fillna(df["Date"].min()).to_numpy()
+        df = df[(df["Date"].to_numpy() >= cutoff)]
+    sessions = df.groupby("Stock Symbol")["Date"].nunique()
+
+    # Net position per (symbol, broker)
+    bought = df.groupby(["Stock Symbol", "Buyer"], observed=True)["Amount (Rs)"].sum().rename_axis(["Stock Symbol", "Broker"])
+    sold = df.groupby(["Stock Symbol", "Seller"], observed=True)["Amount (Rs)"].sum().rename_axis(["Stock Symbol", "Broker"])
+    net = bought.sub(sold, fill_value=0).rename("Net").reset_index()
+
+    top_sellers = _top_per_symbol(net[net["Net"] < 0], top_n, ascending=True)
+    top_buyers = _top_per_symbol(net[net["Net"] > 0], top_n, ascending=False)
+
+    # Flows per (symbol, seller, buyer), kept where both sides are in the top lists
+    pairs = df.groupby(["Stock Symbol", "Seller", "Buyer"], observed=True)["Amount (Rs)"].sum().reset_index()
+    keep = (
+        pd.MultiIndex.from_frame(pairs[["Stock Symbol", "Seller"]]).isin(top_sellers)
+        & pd.MultiIndex.from_frame(pairs[["Stock Symbol", "Buyer"]]).isin(top_buyers)
+    )
+    pairs = pairs[np.asarray(keep)]
+
+    flows = {symbol: rows.drop(columns="Stock Symbol").reset_index(drop=True) for symbol, rows in pairs.groupby("Stock Symbol")}
+    empty = pairs.iloc[:0].drop(columns="Stock Symbol")
+    return {
+        symbol: BrokerFlows(symbol, int(count), flows.get(symbol, empty))
+        for symbol, count in sessions.items()
+    }
+
+
+def export_broker_flows(flows, output_folder, format="png", exporter=None):
+    """
+    Writes the Sankey image of every non-empty BrokerFlows in one exporter batch.
+
+    Parameters:
+    - flows: dict of symbol -> BrokerFlows, as returned by compute_broker_flows
+    - output_folder: where 'sankey_clean_<stock>.<format>' files are written
+    - format: 'png', 'svg' or another image_export.IMAGE_FORMATS entry
+    - exporter: ImageExporter to use, the process's shared one by default
+
+    Returns:
+    - DataFrame with 'Path', 'Seconds' and 'Error' per written image
+    """
+    flows = [stock_flows for stock_flows in flows.values() if not stock_flows.empty]
+    return (exporter or get_image_exporter()).export(
+        (stock_flows.figure() for stock_flows in flows),
+        [os.path.join(output_folder, f"sankey_clean_{stock_flows.stock}.{format}") for stock_flows in flows],
+        format
+    )
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from scripts.broker_cube import CUBE_VALUES, is_broker_cube
+from scripts.contract_no import contract_trade_date
+
+INDEX_COLUMNS = ["Date", "Stock Symbol", "Buyer", "Seller", "Quantity", "Amount (Rs)"]
+
+
+class BrokerIndex:
+    """
+    Trades sorted by buying broker and by selling broker, with offset ranges per broker.
+
+    Built once from the floorsheet (trades or a broker cube); afterwards one
+    broker's buys or sells across all symbols are a slice, so sweeping a
+    report over every broker does not rescan the floorsheet per broker.
+    For trades the 'Date' is decoded from 'Contract No.' once at build time.
+
+    Example:
+        index = BrokerIndex(combined_floorsheet)
+        for broker in index.brokers:
+            brokers_top_accumulation(index, broker)
+    """
+
+    def __init__(self, df):
+        if is_broker_cube(df):
+            sides = {}
+            for side, position in (("buy", 0), ("sell", 1)):
+                renames = {columns[position]: value for value, columns in CUBE_VALUES.items()}
+                rows = df[df[f"{side}_trades"] > 0]
+                sides[side] = (rows["Broker"], rows[["Date", "Stock Symbol", "Broker"] + list(renames)].rename(columns=renames))
+        else:
+            trades = df[[column for column in INDEX_COLUMNS if column in df.columns]]
+            if "Contract No." in df.columns:
+                trades = trades.assign(Date=contract_trade_date(df))
+            sides = {"buy": (trades["Buyer"], trades), "sell": (trades["Seller"], trades)}
+
+        self._sides = {}
+        for side, (brokers, rows) in sides.items():
+            codes, labels = pd.factorize(brokers, sort=True)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+            self._sides[side] = (
+                rows.iloc[order].reset_index(drop=True),
+                {broker: (bounds[i], bounds[i + 1]) for i, broker in enumerate(labels)}
+            )
+
+    @property
+    def brokers(self):
+        """Every broker that bought or sold, sorted."""
+        return sorted(set(self._sides["buy"][1]) | set(self._sides["sell"][1]))
+
+    def buys(self, broker):
+        """Rows bought by broker (empty when it bought nothing)."""
+        return self._rows("buy", broker)
+
+    def sells(self, broker):
+        """Rows sold by broker (empty when it sold nothing)."""
+        return self._rows("sell", broker)
+
+    def _rows(self, side, broker):
+        rows, offsets = self._sides[side]
+        start, end = offsets.get(broker, (0, 0))
+        return rows.iloc[start:end]
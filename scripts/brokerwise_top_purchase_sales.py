@@ -1,45 +1,58 @@
 import pandas as pd
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from scripts.contract_no import contract_trade_date
+from scripts.broker_cube import is_broker_cube
+from scripts.broker_index import BrokerIndex
+from scripts.trading_calendar import TradingCalendar
 
-def brokers_top_accumulation(df, broker, days=30):
+def brokers_top_accumulation(df, broker, days=21, calendar=None):
     """
     Generates an interactive Plotly line chart for the top 10 buyers and top 10 sellers of a given broker over time.
 
     Parameters:
-    df (pd.DataFrame): The floorsheet data containing 'Contract No.', 'Stock Symbol', 'Buyer', 'Seller', and 'Amount (Rs)'.
+    df (pd.DataFrame): The floorsheet data containing 'Contract No.', 'Stock Symbol', 'Buyer', 'Seller', and 'Amount (Rs)',
+        or a broker cube (see broker_cube), or a BrokerIndex built from either; use the index when
+        sweeping many brokers so each call reads only that broker's rows.
     broker (str): The broker to filter the data.
-    days (int): The number of days to consider for filtering the data.
+    days (int): The number of most recent trading days to consider. Default is 21 (about a month).
+    calendar (TradingCalendar): Optional shared calendar; built from the broker's trade dates when omitted.
 
     Returns:
     None: Displays the Plotly charts.
     """
 
     # Filter the data for the given broker
-    df_filtered_buy = df[df["Buyer"] == broker].copy()
-    df_filtered_sell = df[df["Seller"] == broker].copy()
+    if isinstance(df, BrokerIndex):
+        df_filtered_buy = df.buys(broker)
+        df_filtered_sell = df.sells(broker)
+    elif is_broker_cube(df):
+        broker_rows = df[df["Broker"] == broker]
+        df_filtered_buy = broker_rows[broker_rows["buy_trades"] > 0].rename(columns={"buy_amt": "Amount (Rs)"})
+        df_filtered_sell = broker_rows[broker_rows["sell_trades"] > 0].rename(columns={"sell_amt": "Amount (Rs)"})
+    else:
+        df_filtered_buy = df[df["Buyer"] == broker].copy()
+        df_filtered_sell = df[df["Seller"] == broker].copy()
 
     if df_filtered_buy.empty and df_filtered_sell.empty:
         print(f"No data found for broker: {broker}")
         return None
 
-    # Convert 'Contract No.' to string and extract Date
-    df_filtered_buy["Contract No."] = df_filtered_buy["Contract No."].astype(str)
-    df_filtered_sell["Contract No."] = df_filtered_sell["Contract No."].astype(str)
+    if isinstance(df, pd.DataFrame) and not is_broker_cube(df):
+        # Trade date from the decoded 'Contract No.'
+        df_filtered_buy["Date"] = contract_trade_date(df_filtered_buy)
+        df_filtered_sell["Date"] = contract_trade_date(df_filtered_sell)
 
-    df_filtered_buy["Date"] = pd.to_datetime(df_filtered_buy["Contract No."].str[:8], format='%Y%m%d', errors='coerce')
-    df_filtered_sell["Date"] = pd.to_datetime(df_filtered_sell["Contract No."].str[:8], format='%Y%m%d', errors='coerce')
+    # Cutoff: the first of the last n trading days
+    if calendar is None:
+        calendar = TradingCalendar(pd.concat([df_filtered_buy["Date"], df_filtered_sell["Date"]]))
+    cutoff_date = calendar.window_start(days)
 
-    # Get the current date and calculate the cutoff date (last n days)
-    current_date = datetime.now()
-    cutoff_date = current_date - timedelta(days=days)
-
-    # Filter the data for the last 'n' days
+    # Filter the data for the last 'n' trading days
     df_filtered_buy = df_filtered_buy[df_filtered_buy["Date"] >= cutoff_date]
     df_filtered_sell = df_filtered_sell[df_filtered_sell["Date"] >= cutoff_date]
 
     if df_filtered_buy.empty and df_filtered_sell.empty:
-        print(f"No recent data in the last {days} days for broker: {broker}")
+        print(f"No recent data in the last {days} trading days for broker: {broker}")
         return None
 
     # Create pivot tables for buys and sells
@@ -49,7 +62,8 @@ def brokers_top_accumulation(df, broker, days=30):
         index="Stock Symbol",
         columns="Date",
         aggfunc="sum",
-        fill_value=0
+        fill_value=0,
+        observed=True
     )
 
     pivot_table_sell = pd.pivot_table(
@@ -58,7 +72,8 @@ def brokers_top_accumulation(df, broker, days=30):
         index="Date",
         columns="Stock Symbol",
         aggfunc="sum",
-        fill_value=0
+        fill_value=0,
+        observed=True
     ).T  # Transpose sell table to match buy table format (Stock Symbol x Date)
 
     # Compute net accumulation (buy - sell)
@@ -90,7 +105,7 @@ def brokers_top_accumulation(df, broker, days=30):
             ))
 
         fig.update_layout(
-            title=f"{title} of {broker} Over Time (Last {days} Days)",
+            title=f"{title} of {broker} Over Time (Last {days} Trading Days)",
             xaxis=dict(title="Date"),
             yaxis=dict(title="Cumulative Amount (Rs)"),
             width=900,
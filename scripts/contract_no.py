@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# A contract number is the trade date (YYYYMMDD) followed by an intra-day
+# sequence, e.g. 2025010203000123 -> 2025-01-02, sequence 3000123.
+_POWERS_OF_TEN = 10 ** np.arange(19, dtype=np.int64)
+
+
+def decode_contract_no(contract_no):
+    """
+    Decodes contract numbers into trade date and intra-day sequence using
+    integer arithmetic only.
+
+    Parameters:
+    - contract_no: Series (or array) of contract numbers, numeric or string
+
+    Returns:
+    - (trade_date, sequence): datetime64 Series and Int64 Series aligned to the input;
+      unparsable numbers give NaT / <NA>
+    """
+    index = contract_no.index if isinstance(contract_no, pd.Series) else None
+    numbers = pd.to_numeric(pd.Series(contract_no, index=index), errors="coerce")
+    valid = numbers.notna().to_numpy() & (numbers.fillna(0).to_numpy() >= 10 ** 7)
+    values = numbers.fillna(0).to_numpy(dtype=np.int64)
+
+    # Number of digits, then split off the leading 8 (the date)
+    digits = np.searchsorted(_POWERS_OF_TEN, values, side="right")
+    divisor = _POWERS_OF_TEN[np.clip(digits - 8, 0, 18)]
+    ymd = np.where(valid, values // divisor, 0)
+    sequence = np.where(valid, values % divisor, 0)
+
+    # A day has one date value, so only the unique values need calendar parsing
+    unique_ymd, inverse = np.unique(ymd, return_inverse=True)
+    unique_dates = pd.to_datetime(
+        pd.DataFrame({"year": unique_ymd // 10000, "month": unique_ymd // 100 % 100, "day": unique_ymd % 100}),
+        errors="coerce"
+    ).to_numpy()
+    trade_date = pd.Series(unique_dates[inverse], index=numbers.index, name="trade_date")
+    trade_date[~valid] = pd.NaT
+
+    sequence = pd.Series(sequence, index=numbers.index, name="sequence").astype("Int64")
+    sequence[~valid] = pd.NA
+    return trade_date, sequence
+
+
+def add_contract_columns(df):
+    """Returns a copy of df with 'trade_date' and 'sequence' decoded from 'Contract No.'."""
+    df = df.copy()
+    df["trade_date"], df["sequence"] = decode_contract_no(df["Contract No."])
+    return df
+
+
+def contract_trade_date(df):
+    """Trade date of each row: the stored 'trade_date' column when present, decoded otherwise."""
+    if "trade_date" in df.columns:
+        return df["trade_date"]
+    return decode_contract_no(df["Contract No."])[0]
@@ -2,32 +2,20 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from scripts.price_panel import get_price_panel
 
 def plot_cumulative_returns_by_trading_days(all_stock_data, trading_days=5, top_n=20):
     """
     Plot cumulative returns for top `n` tickers over the last `trading_days` trading days.
 
     Parameters:
-    - all_stock_data (DataFrame): DataFrame with 'Date', 'Ticker', 'Close'.
+    - all_stock_data (DataFrame): DataFrame with 'Date', 'Ticker', 'Close', or its PricePanel.
     - trading_days (int): Number of most recent trading days to include.
     - top_n (int): Number of top tickers to display.
     """
 
-    # Ensure 'Date' is datetime and sort
-    all_stock_data['Date'] = pd.to_datetime(all_stock_data['Date'])
-    all_stock_data = all_stock_data.sort_values('Date')
-
-    # Pivot closing prices by date and ticker
-    pivot_close = pd.pivot_table(
-        all_stock_data,
-        values="Close",
-        index="Date",
-        columns="Ticker",
-        aggfunc="last"
-    )
-
-    # Keep only last `trading_days` rows
-    pivot_close = pivot_close.tail(trading_days)
+    # Closing prices by date and ticker, last `trading_days` rows only
+    pivot_close = get_price_panel(all_stock_data).tail(trading_days).frame("Close")
 
     # Calculate log returns
     log_returns = np.log(pivot_close / pivot_close.shift(1))
@@ -1,50 +1,28 @@
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from scripts.price_panel import get_price_panel
+from scripts.price_store import get_price_store
 
-def get_index_history(ticker: str, date_series: pd.Series, index_history: pd.DataFrame) -> pd.DataFrame:
-    index = index_history[index_history['Ticker'] == ticker].copy()
-    index.reset_index(inplace=True)
-    index['Date'] = pd.to_datetime(index['Date'], format="%Y-%m-%d")
-    if index.empty:
-        raise ValueError(f"No price history found for ticker: {ticker}")
-
-    query_df = pd.DataFrame({'Date': date_series})
-    result_df = query_df.merge(
-        index[['Date', 'Close']],
-        on='Date',
-        how='left'
-    )
-    result_df['Close'] = result_df['Close'].astype(float)
-    result_df['Close'] = result_df['Close'].ffill()
-    return result_df
+def get_index_history(ticker: str, date_series: pd.Series, index_history: pd.DataFrame, mode: str = "ffill") -> pd.DataFrame:
+    """Index closes on the given dates; see get_close_price.get_close_prices for the modes."""
+    return get_price_store(index_history).frame(ticker, date_series, mode)
 
 
-def plot_cumulative_pct_change_by_trading_days(all_stock_data, indices_data, trading_days=5, top_n=20):
+def plot_cumulative_pct_change_by_trading_days(all_stock_data, indices_data, trading_days=5, top_n=20, renderer=None):
     """
     Plot cumulative turnover for top `n` tickers over the last `trading_days` trading days.
 
     Parameters:
-    - all_stock_data (DataFrame): DataFrame with 'Date', 'Ticker', 'Turnover'.
+    - all_stock_data (DataFrame): DataFrame with 'Date', 'Ticker', 'Turnover', or its PricePanel.
     - indices_data (DataFrame): Index data including 'Date', 'Ticker', 'Close'.
     - trading_days (int): Number of most recent trading days to include.
     - top_n (int): Number of top tickers to display.
+    - renderer (str): Plotly renderer for fig.show(); the default renderer when None.
     """
 
-    # Ensure 'Date' is datetime and sort
-    all_stock_data['Date'] = pd.to_datetime(all_stock_data['Date'])
-    all_stock_data = all_stock_data.sort_values('Date')
-
-    # Pivot and slice last N trading days
-    pivot_table_buy = pd.pivot_table(
-        all_stock_data,
-        values="Turnover",
-        index="Date",
-        columns="Ticker",
-        fill_value=0
-    )
-
-    pivot_table_buy = pivot_table_buy.tail(trading_days)
+    # Turnover for the last N trading days
+    pivot_table_buy = get_price_panel(all_stock_data).tail(trading_days).frame("Turnover", fill_value=0)
 
     # Calculate cumulative turnover
     cumulative_turnover = pivot_table_buy.cumsum()
@@ -101,4 +79,4 @@ def plot_cumulative_pct_change_by_trading_days(all_stock_data, indices_data, tra
         showlegend = False
     )
 
-    fig.show()
+    fig.show(renderer=renderer)
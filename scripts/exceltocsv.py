@@ -1,29 +1,108 @@
 import pandas as pd
 import os
+import sys
 import glob
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.contract_no import add_contract_columns
+from scripts.floorsheet_schema import normalize_floorsheet
 
 # Define base paths
 base_path = os.path.expanduser("~/Downloads/Semi_A_FS_Data/")
 output_path = os.path.expanduser("~/Downloads/Semi_A_FS_Data/")
 
-# Create output folder if it doesn't exist
-os.makedirs(output_path, exist_ok=True)
-print("hi")
-# Loop through all Excel files in the folder
-for file_path in glob.glob(os.path.join(base_path, "*.xlsx")):
+MANIFEST_NAME = "excel_manifest.json"
+
+
+def _excel_engine():
+    """Uses the much faster calamine reader when python-calamine is installed."""
     try:
-        # Read Excel file
-        data = pd.read_excel(file_path)
-
-        # Extract date from Contract No.
-        data['Date'] = pd.to_datetime(data['Contract No.'].astype(str).str[:8], format='%Y%m%d')
-        date = data['Date'].iloc[0].date()
-
-        # Save as CSV with date in the filename
-        output_file = os.path.join(output_path, f"{date} floorsheet.csv")
-        data.to_csv(output_file, index=False)
-        
-        print(f"Processed: {os.path.basename(file_path)} → {os.path.basename(output_file)}")
-    
-    except Exception as e:
-        print(f"Error processing {file_path}: {e}")
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return None
+
+
+def convert_workbook(file_path, output_path):
+    """
+    Converts one exchange workbook to a typed Parquet file named '<date> floorsheet.parquet'.
+
+    Returns:
+    - (output file, rows, seconds)
+    """
+    start = time.perf_counter()
+
+    # Read Excel file
+    data = pd.read_excel(file_path, engine=_excel_engine())
+
+    # Decode trade date and sequence from Contract No.
+    data = add_contract_columns(data)
+    data['Date'] = data['trade_date']
+    date = data['Date'].iloc[0].date()
+
+    # Save as Parquet with date in the filename
+    output_file = os.path.join(output_path, f"{date} floorsheet.parquet")
+    normalize_floorsheet(data).to_parquet(output_file, index=False)
+
+    return output_file, len(data), time.perf_counter() - start
+
+
+def convert_all_workbooks(base_path, output_path, max_workers=None):
+    """
+    Converts every .xlsx in base_path across a process pool, skipping workbooks
+    whose mtime and size match the manifest from a previous run.
+
+    Returns:
+    - (converted, failed) lists of workbook paths
+    """
+    # Create output folder if it doesn't exist
+    os.makedirs(output_path, exist_ok=True)
+
+    manifest_path = os.path.join(output_path, MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    pending = []
+    for file_path in sorted(glob.glob(os.path.join(base_path, "*.xlsx"))):
+        stat = os.stat(file_path)
+        seen = manifest.get(os.path.basename(file_path), {})
+        if seen.get("mtime") == stat.st_mtime and seen.get("size") == stat.st_size and os.path.exists(seen.get("output", "")):
+            continue
+        pending.append((file_path, stat))
+
+    print(f"{len(pending)} workbook(s) to convert, {len(manifest)} already in manifest")
+    start = time.perf_counter()
+    converted, failed = [], []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(convert_workbook, file_path, output_path): (file_path, stat) for file_path, stat in pending}
+        for future in as_completed(futures):
+            file_path, stat = futures[future]
+            try:
+                output_file, rows, seconds = future.result()
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+                failed.append(file_path)
+                continue
+
+            manifest[os.path.basename(file_path)] = {"mtime": stat.st_mtime, "size": stat.st_size, "output": output_file}
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+
+            print(f"Processed: {os.path.basename(file_path)} → {os.path.basename(output_file)} "
+                  f"({rows} rows in {seconds:.1f}s, {rows / seconds:,.0f} rows/s)")
+            converted.append(file_path)
+
+    print(f"Converted {len(converted)} workbook(s) in {time.perf_counter() - start:.1f}s")
+    if failed:
+        print(f"Failed to convert {len(failed)} workbook(s): {', '.join(os.path.basename(path) for path in sorted(failed))}")
+    return converted, failed
+
+
+if __name__ == "__main__":
+    convert_all_workbooks(base_path, output_path)
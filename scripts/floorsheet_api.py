@@ -0,0 +1,86 @@
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.get_floorsheet import make_session
+
+API_URL = "https://nepalstock.com/api/nots/nepse-data/floorsheet"
+
+BROWSER_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+}
+
+# JSON fields of the floorsheet API mapped to the columns of the web page table
+FIELD_MAP = {
+    "contractId": "Contract No.",
+    "stockSymbol": "Stock Symbol",
+    "buyerMemberId": "Buyer",
+    "sellerMemberId": "Seller",
+    "contractQuantity": "Quantity",
+    "contractRate": "Rate (Rs)",
+    "contractAmount": "Amount (Rs)",
+}
+COLUMNS = ["S.N"] + list(FIELD_MAP.values())
+
+
+def get_floorsheet_page(session, page, api_url=API_URL, page_size=500, payload=None):
+    """
+    Fetches one page of the floorsheet API.
+
+    The exchange serves the data the floorsheet page renders from a paged JSON
+    endpoint; when it expects a POST body (e.g. the site's request id) pass it
+    as payload.
+
+    Returns:
+    - the 'floorsheets' object with 'content' (list of trades) and 'totalPages'
+    """
+    params = {"page": page, "size": page_size, "sort": "contractId,desc"}
+    if payload is None:
+        response = session.get(api_url, params=params)
+    else:
+        response = session.post(api_url, params=params, json=payload)
+    response.raise_for_status()
+    return response.json()["floorsheets"]
+
+
+def page_to_frame(content):
+    """Converts the trades of one API page to the web table's column layout."""
+    df = pd.DataFrame(content, columns=list(FIELD_MAP))
+    return df.rename(columns=FIELD_MAP)
+
+
+def fetch_floorsheet(api_url=API_URL, page_size=500, max_workers=8, session=None, payload=None):
+    """
+    Downloads the whole floorsheet from the paged API without a browser.
+
+    The first page gives the page count; the remaining pages are fetched
+    concurrently and stitched back together in page order.
+
+    Parameters:
+    - api_url: floorsheet endpoint, override to point at a local stand-in server
+    - page_size: trades per page
+    - max_workers: pages in flight at once
+    - session: optional requests.Session, one with retries is created otherwise
+    - payload: optional JSON body, switches the requests to POST
+
+    Returns:
+    - DataFrame with columns S.N, Contract No., Stock Symbol, Buyer, Seller,
+      Quantity, Rate (Rs), Amount (Rs)
+    """
+    if session is None:
+        session = make_session(pool_size=max_workers, headers=BROWSER_HEADERS, methods=("GET", "POST"))
+
+    first = get_floorsheet_page(session, 0, api_url, page_size, payload)
+    num_pages = int(first.get("totalPages", 1))
+    print("Number of Pages =", num_pages)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rest = executor.map(
+            lambda page: get_floorsheet_page(session, page, api_url, page_size, payload)["content"],
+            range(1, num_pages)
+        )
+        pages = [first["content"]] + list(rest)
+
+    floorsheet = pd.concat([page_to_frame(content) for content in pages], ignore_index=True)
+    floorsheet.insert(0, "S.N", range(1, len(floorsheet) + 1))
+    return floorsheet[COLUMNS]
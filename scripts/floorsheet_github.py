@@ -3,14 +3,17 @@ import os
 import time
 import pandas as pd
 from io import StringIO
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
+import sys
 import datetime
 from read_write_google_sheet import write_new_google_sheet_to_folder
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.floorsheet_api import fetch_floorsheet
+
+# "browser" clicks through the floorsheet page with Selenium; "api" (opt-in) pulls the paged data behind it
+# directly, but does not derive the request payload the site may require
+FETCH_MODE = os.getenv("FLOORSHEET_FETCH_MODE", "browser")
+
 # Print current date and time
 print(datetime.datetime.now())
 
@@ -18,59 +21,70 @@ print(datetime.datetime.now())
 base_url = "https://nepalstock.com/floor-sheet?&symbol=&floor=1&startDate=&endDate=&_limit="
 
 
-# Set up Selenium WebDriver with Chrome options
-options = Options()
-options.headless = True  # Enable headless mode
-driver = webdriver.Chrome(options=options)
+if FETCH_MODE == "api":
+    all_floorsheet_data = [fetch_floorsheet()]
+    print("Rows =", len(all_floorsheet_data[0]))
+else:
+    # Selenium is only needed to drive the browser
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.by import By
 
-# Open the webpage
-driver.get(base_url)
+    # Set up Selenium WebDriver with Chrome options
+    options = Options()
+    options.headless = True  # Enable headless mode
+    driver = webdriver.Chrome(options=options)
 
-# Set limit
-select_element = WebDriverWait(driver, 10).until(
-    EC.presence_of_element_located((By.XPATH, "/html/body/app-root/div/main/div/app-floor-sheet/div/div[3]/div/div[5]/div/select/option[6]"))
-)
-select_element.click()
-limit_set = select_element.text
-print("Set Limit =", limit_set)
+    # Open the webpage
+    driver.get(base_url)
 
-# Click Filter button
-filter_button = WebDriverWait(driver, 10).until(
-    EC.element_to_be_clickable((By.XPATH, "/html/body/app-root/div/main/div/app-floor-sheet/div/div[3]/div/div[6]/button[1]"))
-)
-filter_button.click()
-time.sleep(1.5)  # Wait for the page to load
+    # Set limit
+    select_element = WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.XPATH, "/html/body/app-root/div/main/div/app-floor-sheet/div/div[3]/div/div[5]/div/select/option[6]"))
+    )
+    select_element.click()
+    limit_set = select_element.text
+    print("Set Limit =", limit_set)
 
-# Extract number of pages
-try:
-    num_pages_element = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, '/html/body/app-root/div/main/div/app-floor-sheet/div/div[5]/div[2]/pagination-controls/pagination-template/ul/li[9]/a/span[2]'))
+    # Click Filter button
+    filter_button = WebDriverWait(driver, 10).until(
+        EC.element_to_be_clickable((By.XPATH, "/html/body/app-root/div/main/div/app-floor-sheet/div/div[3]/div/div[6]/button[1]"))
     )
-    num_pages = int(num_pages_element.text)
-except:
-    # In case the XPath is still incorrect or changes, print an error and set a default value for number of pages
-    print("Could not locate the number of pages element.")
-    num_pages = 1  # Default to 1 page if unable to determine the actual number
-print("Number of Pages =", num_pages)
+    filter_button.click()
+    time.sleep(1.5)  # Wait for the page to load
 
-# Initialize an empty list to store all the pages' data
-all_floorsheet_data = []
+    # Extract number of pages
+    try:
+        num_pages_element = WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, '/html/body/app-root/div/main/div/app-floor-sheet/div/div[5]/div[2]/pagination-controls/pagination-template/ul/li[9]/a/span[2]'))
+        )
+        num_pages = int(num_pages_element.text)
+    except:
+        # In case the XPath is still incorrect or changes, print an error and set a default value for number of pages
+        print("Could not locate the number of pages element.")
+        num_pages = 1  # Default to 1 page if unable to determine the actual number
+    print("Number of Pages =", num_pages)
 
-# Loop through pages and extract data
-for page in range(1, num_pages + 1):
-    # Extract the table data using Pandas
-    dfs = pd.read_html(StringIO(driver.page_source))
-    floorsheet_data = dfs[0]
+    # Initialize an empty list to store all the pages' data
+    all_floorsheet_data = []
 
-    # Append the current page's data to the overall data list
-    all_floorsheet_data.append(floorsheet_data)
-    print("Page:", page)
-# Navigate to the next page if not on the last page
-    if page < num_pages:
-        next_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "/html/body/app-root/div/main/div/app-floor-sheet/div/div[5]/div[2]/pagination-controls/pagination-template/ul/li[10]/a"))
-        )
-        next_button.click()
-        time.sleep(1.5)  # Wait for the page to load
+    # Loop through pages and extract data
+    for page in range(1, num_pages + 1):
+        # Extract the table data using Pandas
+        dfs = pd.read_html(StringIO(driver.page_source))
+        floorsheet_data = dfs[0]
+
+        # Append the current page's data to the overall data list
+        all_floorsheet_data.append(floorsheet_data)
+        print("Page:", page)
+    # Navigate to the next page if not on the last page
+        if page < num_pages:
+            next_button = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.XPATH, "/html/body/app-root/div/main/div/app-floor-sheet/div/div[5]/div[2]/pagination-controls/pagination-template/ul/li[10]/a"))
+            )
+            next_button.click()
+            time.sleep(1.5)  # Wait for the page to load
 
-driver.quit()
\ No newline at end of file
+    driver.quit()
\ No newline at end of file
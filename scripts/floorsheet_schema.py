@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# Compact dtypes for the combined floorsheet. Broker codes and quantities fit
+# comfortably in small ints; float32 keeps ~7 significant digits, which is
+# enough for rates and per-trade amounts but not for exact rupee totals of
+# very large aggregates.
+COMPACT_DTYPES = {
+    "S.N": "int32",
+    "Contract No.": "int64",
+    "Stock Symbol": "category",
+    "Buyer": "int16",
+    "Seller": "int16",
+    "Quantity": "int32",
+    "Rate (Rs)": "float32",
+    "Amount (Rs)": "float32",
+}
+
+
+# Dtypes every store partition is written with, so partitions from different
+# sources (GitHub CSVs, exchange workbooks, manual appends) share one schema.
+STORE_DTYPES = {
+    "S.N": "int64",
+    "Contract No.": "int64",
+    "Buyer": "int64",
+    "Seller": "int64",
+    "Quantity": "int64",
+    "Rate (Rs)": "float64",
+    "Amount (Rs)": "float64",
+}
+
+
+def _to_numeric(series, nullable=False):
+    """
+    Parses numbers that may arrive as strings with thousands separators.
+
+    With nullable=True the result is Int64/Float64, so integers with gaps are
+    parsed exactly instead of going through float64.
+    """
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        series = series.astype(str).str.replace(",", "", regex=False)
+    if nullable:
+        if pd.api.types.is_float_dtype(series):
+            return series.astype("Float64")
+        return pd.to_numeric(series, errors="coerce", dtype_backend="numpy_nullable")
+    return pd.to_numeric(series, errors="coerce")
+
+
+def normalize_floorsheet(df):
+    """
+    Returns a copy of the floorsheet with the store schema: numeric columns
+    parsed (integer columns as int64, or nullable Int64 when they have gaps),
+    Stock Symbol as string and Date as datetime64.
+    """
+    df = df.copy()
+
+    for column, dtype in STORE_DTYPES.items():
+        if column not in df.columns:
+            continue
+        if dtype == "int64":
+            # Parsed as nullable integers so large Contract No. never pass through float64
+            values = _to_numeric(df[column], nullable=True)
+            df[column] = values.astype("Int64" if values.isna().any() else dtype)
+        else:
+            df[column] = _to_numeric(df[column]).astype(dtype)
+
+    if "Stock Symbol" in df.columns:
+        df["Stock Symbol"] = df["Stock Symbol"].astype(str).str.strip()
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"])
+
+    return df
+
+
+def _to_compact_int(series, dtype):
+    """
+    Casts to a small int when every value fits, int64 otherwise, using the
+    nullable variant (Int16, Int64, ...) when there are gaps.
+    """
+    values = _to_numeric(series, nullable=True)
+    present = values.dropna()
+    info = np.iinfo(dtype)
+    if len(present) and (present.min() < info.min or present.max() > info.max):
+        dtype = "int64"
+    if len(present) < len(values):
+        return values.astype(dtype.capitalize())
+    return values.to_numpy(dtype="float64" if values.dtype == "Float64" else "int64").astype(dtype)
+
+
+def compact_floorsheet(df, report=False):
+    """
+    Returns a copy of the floorsheet with compact dtypes: categorical symbols,
+    int16 broker codes, int32 quantity, float32 rate/amount and datetime64 dates.
+
+    Parameters:
+    - df: floorsheet DataFrame
+    - report: print the memory used before and after
+
+    Columns not in COMPACT_DTYPES are left unchanged.
+    """
+    compact = df.copy()
+
+    for column, dtype in COMPACT_DTYPES.items():
+        if column not in compact.columns:
+            continue
+        if dtype == "category":
+            # Missing symbols stay missing instead of becoming a "nan" category
+            compact[column] = compact[column].astype("category")
+        elif dtype.startswith("int"):
+            compact[column] = _to_compact_int(compact[column], dtype)
+        else:
+            compact[column] = _to_numeric(compact[column]).astype(dtype)
+
+    if "Date" in compact.columns:
+        compact["Date"] = pd.to_datetime(compact["Date"])
+
+    if report:
+        summary = memory_report(df, compact)
+        before, after = summary.loc["Total", "Before (MB)"], summary.loc["Total", "After (MB)"]
+        print(f"Floorsheet memory: {before:.1f} MB -> {after:.1f} MB ({before / after if after else 0:.1f}x smaller)")
+
+    return compact
+
+
+def memory_report(before, after):
+    """
+    Per-column memory usage of two versions of the same frame.
+
+    Returns:
+    - DataFrame indexed by column (plus a 'Total' row) with 'Before (MB)',
+      'After (MB)', 'Before dtype' and 'After dtype'
+    """
+    mb = 1024 ** 2
+    before_usage = before.memory_usage(deep=True, index=False) / mb
+    after_usage = after.memory_usage(deep=True, index=False) / mb
+
+    report = pd.DataFrame({
+        "Before (MB)": before_usage,
+        "After (MB)": after_usage,
+        "Before dtype": before.dtypes.astype(str),
+        "After dtype": after.dtypes.astype(str),
+    })
+    report.loc["Total", ["Before (MB)", "After (MB)"]] = [before_usage.sum(), after_usage.sum()]
+    return report.round({"Before (MB)": 2, "After (MB)": 2})
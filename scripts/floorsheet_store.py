@@ -0,0 +1,299 @@
+import os
+import json
+import pandas as pd
+
+from scripts.contract_no import add_contract_columns, decode_contract_no
+from scripts.floorsheet_schema import compact_floorsheet, normalize_floorsheet
+from scripts.get_floorsheet import list_daily_floorsheet_files, iter_daily_floorsheet_csvs, make_session
+
+DEFAULT_STORE_DIR = os.getenv(
+    "FLOORSHEET_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Floorsheet", "store")
+)
+MANIFEST_NAME = "manifest.json"
+TRADES_DIR = "trades"
+# Partitions are sorted by symbol and written in small row groups so that
+# symbol filters can skip row groups using the Parquet min/max statistics.
+ROW_GROUP_SIZE = 16384
+
+
+def read_manifest(store_dir=DEFAULT_STORE_DIR):
+    """
+    Reads the store manifest.
+
+    The manifest maps each source file name to its GitHub blob sha, the
+    partition it was written to and the dates it covers:
+    {"files": {"2025-01-01.csv": {"sha": ..., "path": ..., "rows": ..., "min_date": ..., "max_date": ...}}}
+    """
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {"files": {}}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, store_dir=DEFAULT_STORE_DIR):
+    """Writes the manifest atomically so an interrupted sync never leaves it half written."""
+    os.makedirs(store_dir, exist_ok=True)
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def write_partition(df, store_dir, key):
+    """
+    Writes one partition to trades/<key>.parquet with the store schema plus the
+    'trade_date' and 'sequence' columns decoded from Contract No., and returns
+    its manifest entry (path relative to store_dir, row count, date range and
+    the trading dates it holds).
+    """
+    rel_path = os.path.join(TRADES_DIR, f"{key}.parquet")
+    path = os.path.join(store_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    df = normalize_floorsheet(df)
+    if "Contract No." in df.columns:
+        df = add_contract_columns(df)
+    sort_by = [column for column in ["Stock Symbol", "Contract No."] if column in df.columns]
+    df = df.sort_values(sort_by, kind="stable")
+
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+    dates = sorted({str(date.date()) for date in df["Date"].dropna().unique()})
+    return {
+        "path": rel_path,
+        "rows": int(len(df)),
+        "min_date": dates[0] if dates else None,
+        "max_date": dates[-1] if dates else None,
+        "dates": dates,
+    }
+
+
+def sync_daily_floorsheet_store(store_dir=DEFAULT_STORE_DIR, files=None, max_workers=8, session=None):
+    """
+    Brings the local store up to date with the GitHub daily_floorsheet folder.
+
+    Only files whose name is new or whose blob sha changed are downloaded; files
+    that disappeared upstream are dropped from the store.
+
+    Parameters:
+    - store_dir: directory holding manifest.json and trades/*.parquet
+    - files: optional pre-fetched listing from list_daily_floorsheet_files()
+    - max_workers: number of concurrent downloads
+    - session: optional requests.Session shared by the listing and the downloads
+
+    Returns:
+    - list of file names that were downloaded
+    """
+    manifest = read_manifest(store_dir)
+    entries = manifest["files"]
+
+    if session is None:
+        session = make_session(pool_size=max_workers)
+    if files is None:
+        files = list_daily_floorsheet_files(session=session)
+    files = [file for file in files if file["name"].endswith(".csv")]
+
+    # Drop partitions for files removed upstream (appended partitions carry no sha)
+    remote_names = {file["name"] for file in files}
+    for name in [name for name in entries if "sha" in entries[name] and name not in remote_names]:
+        entry = entries.pop(name)
+        for rel_path in (entry["path"], entry.get("cube")):
+            if rel_path and os.path.exists(os.path.join(store_dir, rel_path)):
+                os.remove(os.path.join(store_dir, rel_path))
+
+    pending = [file for file in files if entries.get(file["name"], {}).get("sha") != file["sha"]]
+
+    for file, df in iter_daily_floorsheet_csvs(pending, max_workers=max_workers, session=session):
+        key = os.path.splitext(file["name"])[0]
+        entry = write_partition(df, store_dir, key)
+        entry["sha"] = file["sha"]
+        entries[file["name"]] = entry
+        # Save after every file so an interrupted sync resumes where it stopped
+        write_manifest(manifest, store_dir)
+
+    write_manifest(manifest, store_dir)
+    if pending:
+        print(f"Downloaded {len(pending)} new floorsheet file(s) into {store_dir}")
+    return [file["name"] for file in pending]
+
+
+def existing_contract_numbers(store_dir, dates, manifest=None):
+    """
+    Returns the set of Contract No. already stored for the given dates, reading
+    only the Contract No. column of partitions whose date range covers them.
+    """
+    if manifest is None:
+        manifest = read_manifest(store_dir)
+    days = {str(pd.Timestamp(date).date()) for date in dates}
+
+    contract_numbers = set()
+    for entry in manifest["files"].values():
+        if entry["min_date"] is None or not any(entry["min_date"] <= day <= entry["max_date"] for day in days):
+            continue
+        stored = pd.read_parquet(os.path.join(store_dir, entry["path"]), columns=["Contract No."])
+        contract_numbers.update(stored["Contract No."].tolist())
+    return contract_numbers
+
+
+def append_to_store(df, store_dir=DEFAULT_STORE_DIR, source="local"):
+    """
+    Appends trades to the store as new partitions, one per trade date.
+
+    Rows whose Contract No. is already in the store (or repeated within df) are
+    dropped. Existing partitions are never rewritten; a date that already has
+    data gets an additional part file.
+
+    Parameters:
+    - df: floorsheet rows with 'Contract No.' and either 'Date' or a Contract No.
+      that starts with the trade date (YYYYMMDD)
+    - store_dir: store to append to
+    - source: label used in the partition names, e.g. 'local' or 'excel'
+
+    Returns:
+    - number of rows written
+    """
+    df = normalize_floorsheet(df)
+    df = df.dropna(subset=["Contract No."])
+    df["Contract No."] = df["Contract No."].astype("int64")
+    if "Date" not in df.columns:
+        df["Date"] = decode_contract_no(df["Contract No."])[0]
+    df = df.drop_duplicates(subset="Contract No.")
+
+    manifest = read_manifest(store_dir)
+    entries = manifest["files"]
+    written = 0
+
+    # Existing partitions are read once for all the dates being appended
+    days = df["Date"].dt.normalize()
+    existing = existing_contract_numbers(store_dir, days.unique(), manifest)
+
+    for date, day in df.groupby(days):
+        day = day[~day["Contract No."].isin(existing)]
+        if day.empty:
+            continue
+
+        prefix = f"{date:%Y-%m-%d}-{source}"
+        part = sum(1 for name in entries if name.startswith(prefix))
+        key = f"{prefix}-{part}"
+
+        entry = write_partition(day, store_dir, key)
+        entry["source"] = source
+        entries[key] = entry
+        write_manifest(manifest, store_dir)
+        written += len(day)
+
+    return written
+
+
+def store_trading_dates(store_dir=DEFAULT_STORE_DIR, manifest=None):
+    """Sorted trading dates held in the store, read from the manifest alone."""
+    if manifest is None:
+        manifest = read_manifest(store_dir)
+    dates = set()
+    for entry in manifest["files"].values():
+        dates.update(entry.get("dates") or [date for date in (entry["min_date"], entry["max_date"]) if date])
+    return sorted(dates)
+
+
+def load_floorsheet(
+    symbols=None, last_n_trading_days=None, brokers=None,
+    start_date=None, end_date=None, columns=None,
+    store_dir=DEFAULT_STORE_DIR, compact=False
+):
+    """
+    Reads only the trades an analysis needs from the local store.
+
+    Date filters pick partitions from the manifest without opening the others;
+    symbol and broker filters are pushed down to Parquet so row groups whose
+    statistics rule them out are skipped.
+
+    Parameters:
+    - symbols: list of Stock Symbols to keep
+    - last_n_trading_days: keep the last N trading dates in the store
+    - brokers: list of broker codes; keeps trades where the broker bought or sold
+    - start_date, end_date: inclusive date bounds
+    - columns: subset of columns to read (Date is always included)
+    - store_dir: location of the store
+    - compact: convert to the compact typed schema
+
+    Returns:
+    - DataFrame sorted by Date, in the same layout as get_all_daily_floorsheet_data()
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    manifest = read_manifest(store_dir)
+    entries = list(manifest["files"].values())
+    if not entries:
+        raise ValueError("No CSV files found in the directory.")
+
+    # Partition pruning on dates
+    wanted = store_trading_dates(store_dir, manifest)
+    if start_date is not None:
+        wanted = [date for date in wanted if date >= str(pd.Timestamp(start_date).date())]
+    if end_date is not None:
+        wanted = [date for date in wanted if date <= str(pd.Timestamp(end_date).date())]
+    if last_n_trading_days is not None:
+        wanted = wanted[-last_n_trading_days:]
+    date_filtered = len(wanted) < len(store_trading_dates(store_dir, manifest))
+    wanted = set(wanted)
+
+    paths = sorted(
+        os.path.join(store_dir, entry["path"]) for entry in entries
+        if wanted.intersection(entry.get("dates") or [entry["min_date"], entry["max_date"]])
+    )
+
+    # Row-group pushdown on symbols, brokers and (for multi-day partitions) dates
+    expression = None
+    if symbols is not None:
+        expression = ds.field("Stock Symbol").isin([str(symbol) for symbol in symbols])
+    if brokers is not None:
+        broker_expression = ds.field("Buyer").isin(list(brokers)) | ds.field("Seller").isin(list(brokers))
+        expression = broker_expression if expression is None else expression & broker_expression
+    if date_filtered and wanted:
+        dates = pa.array(pd.to_datetime(sorted(wanted)).to_numpy(), pa.timestamp("us"))
+        date_expression = ds.field("Date").cast(pa.timestamp("us")).isin(dates)
+        expression = date_expression if expression is None else expression & date_expression
+
+    # With no matching partition the result is empty but keeps the store's columns and dtypes
+    schema_paths = paths or [os.path.join(store_dir, entries[-1]["path"])]
+    schema = pa.unify_schemas([pq.read_schema(path) for path in schema_paths], promote_options="permissive")
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + ["Date"]))
+        columns = [column for column in columns if column in schema.names]
+
+    if paths:
+        table = ds.dataset(paths, schema=schema, format="parquet").to_table(columns=columns, filter=expression)
+    else:
+        table = schema.empty_table()
+        table = table.select(columns) if columns is not None else table
+    final_df = table.to_pandas()
+
+    final_df["Date"] = pd.to_datetime(final_df["Date"])
+    final_df.sort_values("Date", inplace=True, kind="stable")
+    final_df.reset_index(drop=True, inplace=True)
+
+    # Partitions written before the contract columns existed
+    if columns is None and "Contract No." in final_df.columns and ("trade_date" not in final_df.columns or final_df["trade_date"].isna().any()):
+        final_df["trade_date"], final_df["sequence"] = decode_contract_no(final_df["Contract No."])
+
+    if compact:
+        final_df = compact_floorsheet(final_df, report=True)
+
+    return final_df
+
+
+def load_floorsheet_store(store_dir=DEFAULT_STORE_DIR, compact=False):
+    """
+    Reads every partition in the local store into one DataFrame sorted by Date,
+    the same layout get_all_daily_floorsheet_data() returns.
+
+    compact=True converts to the compact typed schema and prints the memory saved.
+    """
+    return load_floorsheet(store_dir=store_dir, compact=compact)
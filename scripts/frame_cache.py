@@ -0,0 +1,53 @@
+import weakref
+
+
+def frame_signature(df):
+    """
+    Cheap stand-in for a version of df: its row count and column names.
+
+    Reading it costs O(columns), so a cache hit stays a dictionary lookup;
+    in-place edits of values that keep the shape are not seen (pass an
+    explicit version for those).
+    """
+    return len(df), tuple(df.columns)
+
+
+class FrameCache:
+    """
+    Objects built from a DataFrame, built once per version of its data.
+
+    With an explicit version (e.g. the download's ETag or the file's mtime)
+    an entry is shared by every frame carrying that version. Without one the
+    entry belongs to the frame object and its frame_signature: it is rebuilt
+    when rows or columns are added or removed, and dropped when the frame is
+    garbage-collected.
+
+    Example:
+        _PANELS = FrameCache(PricePanel.from_frame)
+        panel = _PANELS.get(data)
+    """
+
+    def __init__(self, build):
+        """
+        Parameters:
+        - build: function of (df, *args) returning the cached object
+        """
+        self.build = build
+        self._entries = {}
+
+    def get(self, df, *args, version=None):
+        """The object built from df (and args), reused while df's version is unchanged."""
+        key = (version if version is not None else id(df),) + args
+        signature = None if version is not None else frame_signature(df)
+
+        cached = self._entries.get(key)
+        if cached is not None:
+            ref, cached_signature, value = cached
+            if version is not None or (ref() is df and cached_signature == signature):
+                return value
+
+        value = self.build(df, *args)
+        self._entries[key] = (weakref.ref(df), signature, value)
+        if version is None and (cached is None or cached[0]() is not df):
+            weakref.finalize(df, self._entries.pop, key, None)
+        return value
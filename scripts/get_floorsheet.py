@@ -1,38 +1,162 @@
-def get_all_daily_floorsheet_data():
-    import os
-    import requests
-    import pandas as pd
-    from dotenv import load_dotenv
+import io
+import os
+import requests
+import pandas as pd
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
 
-    load_dotenv()
+OWNER = "Arun-Lama"
+REPO = "floorsheet_automation"
+PATH = "daily_floorsheet"
+API_HOST = "api.github.com"
 
-    GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
-    OWNER = "Arun-Lama"
-    REPO = "floorsheet_automation"
-    PATH = "daily_floorsheet"
+def github_headers():
+    """Returns the GitHub API headers, authorised with GITHUB_TOKEN when it is set."""
+    load_dotenv()
 
-    api_url = f"https://api.github.com/repos/{OWNER}/{REPO}/contents/{PATH}"
+    GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
     headers = {"Accept": "application/vnd.github+json"}
     if GITHUB_TOKEN:
         headers["Authorization"] = f"token {GITHUB_TOKEN}"
+    return headers
+
+
+class HostAuth(AuthBase):
+    """Sets the Authorization header on requests to one host only."""
+
+    def __init__(self, authorization, host=API_HOST):
+        self.authorization = authorization
+        self.host = host
+
+    def __call__(self, request):
+        if urlparse(request.url).hostname == self.host:
+            request.headers["Authorization"] = self.authorization
+        return request
+
+
+def make_session(pool_size=8, retries=3, backoff=0.5, headers=None, methods=("GET",), api_host=API_HOST):
+    """
+    Returns a requests.Session with a connection pool of pool_size and
+    retries with exponential backoff on connection errors and 429/5xx responses.
+
+    headers default to the GitHub API headers; methods lists the HTTP methods
+    that are safe to retry. An 'Authorization' header is only sent to
+    api_host, not to the raw file downloads made over the same session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(methods),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    headers = dict(github_headers() if headers is None else headers)
+    authorization = headers.pop("Authorization", None)
+    session.headers.update(headers)
+    if authorization:
+        session.auth = HostAuth(authorization, api_host)
+    return session
+
+
+def list_daily_floorsheet_files(api_url=None, session=None):
+    """
+    Lists the daily floorsheet CSVs in the GitHub repo.
 
-    response = requests.get(api_url, headers=headers)
+    Parameters:
+    - api_url: contents API URL, override to point at a mirror or a local stand-in
+    - session: optional requests.Session to reuse
+
+    Returns:
+    - list of dicts with at least 'name', 'sha' and 'download_url'
+    """
+    if api_url is None:
+        api_url = f"https://api.github.com/repos/{OWNER}/{REPO}/contents/{PATH}"
+
+    if session is None:
+        response = requests.get(api_url, headers=github_headers())
+    else:
+        response = session.get(api_url)
     response.raise_for_status()
 
-    files = response.json()
-    dfs = []
+    return [file for file in response.json() if file["name"].endswith(".csv")]
+
+
+def read_daily_floorsheet_csv(source):
+    """Reads one daily floorsheet CSV (URL, path or buffer) into a DataFrame."""
+    df = pd.read_csv(source, index_col=0)
+    df.index.name = "Date"
+    # df.reset_index(inplace=True)
+    return df
+
+
+def iter_daily_floorsheet_csvs(files, max_workers=8, session=None, retries=3, backoff=0.5, progress=True):
+    """
+    Downloads daily floorsheet CSVs concurrently over one pooled session.
+
+    Parameters:
+    - files: listing entries with 'name' and 'download_url'
+    - max_workers: number of downloads in flight at once
+    - session: optional requests.Session, one with retries is created otherwise
+    - retries, backoff: retry policy for the session created here
+    - progress: print a running count of finished downloads
 
-    for file in files:
-        if file["name"].endswith(".csv"):
-            raw_url = file["download_url"]
+    Yields:
+    - (file, DataFrame) pairs in completion order
+    """
+    files = list(files)
+    if not files:
+        return
+    if session is None:
+        session = make_session(pool_size=max_workers, retries=retries, backoff=backoff)
 
-            df = pd.read_csv(raw_url, index_col=0)
-            df.index.name = "Date"
-            # df.reset_index(inplace=True)
+    def fetch(file):
+        response = session.get(file["download_url"])
+        response.raise_for_status()
+        return read_daily_floorsheet_csv(io.BytesIO(response.content))
 
-            dfs.append(df)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, file): file for file in files}
+        for done, future in enumerate(as_completed(futures), start=1):
+            file = futures[future]
+            df = future.result()
+            if progress:
+                print(f"\rFetched {done}/{len(files)}: {file['name']}", end="\n" if done == len(files) else "")
+            yield file, df
+
+
+def get_all_daily_floorsheet_data(use_store=True, store_dir=None, max_workers=8, compact=False):
+    """
+    Returns the combined daily floorsheet sorted by Date.
+
+    Parameters:
+    - use_store: sync the local Parquet store (only new or changed days are
+      downloaded) and read from it. False re-downloads every CSV.
+    - store_dir: location of the local store, defaults to floorsheet_store.DEFAULT_STORE_DIR
+    - max_workers: number of concurrent downloads
+    - compact: return the compact typed schema (see floorsheet_schema.compact_floorsheet)
+      and print the memory saved
+    """
+    if use_store:
+        from scripts.floorsheet_store import DEFAULT_STORE_DIR, sync_daily_floorsheet_store, load_floorsheet_store
+
+        store_dir = store_dir or DEFAULT_STORE_DIR
+        sync_daily_floorsheet_store(store_dir, max_workers=max_workers)
+        return load_floorsheet_store(store_dir, compact=compact)
+
+    session = make_session(pool_size=max_workers)
+    files = list_daily_floorsheet_files(session=session)
+    fetched = iter_daily_floorsheet_csvs(files, max_workers=max_workers, session=session)
+    dfs = [df for _, df in sorted(fetched, key=lambda pair: pair[0]["name"])]
 
     if not dfs:
         raise ValueError("No CSV files found in the directory.")
@@ -42,4 +166,8 @@ def get_all_daily_floorsheet_data():
     final_df["Date"] = pd.to_datetime(final_df["Date"])
     final_df.sort_values("Date", inplace=True)
 
+    if compact:
+        from scripts.floorsheet_schema import compact_floorsheet
+        final_df = compact_floorsheet(final_df, report=True)
+
     return final_df
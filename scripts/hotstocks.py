@@ -1,48 +1,102 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from scripts.trading_calendar import TradingCalendar
 
-def hot_stocks_custom(data):
-    while True:
+NUM_OF_PERIODS = 50  # 50 periods of the selected bar grouping
+BAR_GROUPINGS = (1, 2, 3, 4, 5)
+
+
+def _surge_column(num_of_bars, num_of_periods=NUM_OF_PERIODS):
+    return f"Last {num_of_bars}-Bar Vol Vs Avg {num_of_periods} {num_of_bars}-Bar Vol"
+
+
+def hot_stocks(data, bar_groupings=BAR_GROUPINGS, num_of_periods=NUM_OF_PERIODS):
+    """
+    Last-bar volume surge for several bar groupings at once.
+
+    For a grouping of n bars the last n-bar volume is compared with the average
+    n-bar volume over the last num_of_periods bars (n-bar sums rolled one
+    trading day at a time). Only the trailing num_of_periods + max(n) - 1
+    trading days are read, and every grouping comes from one cumulative sum
+    over them, so the cost does not grow with the length of the history.
+
+    Parameters:
+    - data: price data with 'Date', 'Ticker', 'Volume'
+    - bar_groupings: bar sizes to evaluate
+    - num_of_periods: number of n-bar periods in the average
+
+    Returns:
+    - DataFrame indexed by Ticker with one '% vs average' column per grouping
+      (0 where there is not enough history), as on the latest trading day
+    """
+    bar_groupings = list(bar_groupings)
+    rows = num_of_periods + max(bar_groupings) - 1
+
+    calendar = TradingCalendar.from_frame(data)
+    recent = data[data["Date"] >= calendar.last_n(rows)[0]]
+    pivot_volume = pd.pivot_table(recent, values="Volume", index=["Date"], columns=["Ticker"]).fillna(0)
+
+    # cumulative[t] is the volume of the first t rows, so an n-bar sum ending
+    # at row t is cumulative[t + 1] - cumulative[t + 1 - n]
+    volume = pivot_volume.to_numpy(dtype=float)
+    cumulative = np.vstack([np.zeros((1, volume.shape[1])), np.cumsum(volume, axis=0)])
+    end = len(volume)
+
+    surges = {}
+    for num_of_bars in bar_groupings:
+        if end < num_of_periods + num_of_bars - 1:
+            surges[_surge_column(num_of_bars, num_of_periods)] = np.zeros(volume.shape[1])
+            continue
+        ends = np.arange(end - num_of_periods + 1, end + 1)
+        grouped_volume = cumulative[ends] - cumulative[ends - num_of_bars]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            surge = (grouped_volume[-1] / grouped_volume.mean(axis=0) - 1) * 100
+        surges[_surge_column(num_of_bars, num_of_periods)] = np.where(np.isnan(surge), 0.0, surge)
+
+    return pd.DataFrame(surges, index=pivot_volume.columns)
+
+
+def hot_stocks_custom(data, num_of_bars=None, top_n=40, show=True):
+    """
+    Plots the stocks with the highest last-bar volume surge.
+
+    Parameters:
+    - data: price data with 'Date', 'Ticker', 'Volume'
+    - num_of_bars: bar grouping between 1 and 5; asked for interactively when None
+    - top_n: number of stocks ranked before the first half is plotted
+    - show: display the chart
+
+    Returns:
+    - DataFrame of the top_n stocks and their surge, largest first
+    """
+    while num_of_bars is None:
         try:
             num_of_bars = int(input("Enter a number between 1 and 5 to define the bar grouping: "))
-            if 1 <= num_of_bars <= 5:
-                break
-            else:
+            if not 1 <= num_of_bars <= 5:
                 print("Please enter a valid number between 1 and 5.")
+                num_of_bars = None
         except ValueError:
             print("Invalid input! Please enter a number between 1 and 5.")
 
-    num_of_periods = 50  # 50 periods of the selected bar grouping
+    num_of_periods = NUM_OF_PERIODS
+    column = _surge_column(num_of_bars, num_of_periods)
+    latest_trading_day = pd.Timestamp(data["Date"].max())
 
-    # Pivot volume table
-    pivot_volume = pd.pivot_table(data, values='Volume', index=['Date'], columns=['Ticker']).fillna(0)
-    latest_trading_day = pivot_volume.index[-1]
-    # Aggregate bars using rolling sum instead of resampling by calendar days
-    grouped_volume = pivot_volume.rolling(num_of_bars).sum()
-
-    # Compute rolling average over 50 periods of the selected grouping
-    rolling_avg_volume = grouped_volume.rolling(num_of_periods).mean()
-
-    # Calculate percentage difference from 50-bar average for the selected bar size
-    vol_vs_avgVol = ((grouped_volume / rolling_avg_volume) - 1) * 100
-    vol_vs_avgVol = vol_vs_avgVol[-1:].fillna(0)
-    vol_vs_avgVol.reset_index(drop=True, inplace=True)
-    vol_vs_avgVol = vol_vs_avgVol.transpose()
-    vol_vs_avgVol.rename(columns={vol_vs_avgVol.columns[0]: f"Last {num_of_bars}-Bar Vol Vs Avg {num_of_periods} {num_of_bars}-Bar Vol"}, inplace=True)
-
-    # Sort and select top 40 stocks with highest volume surge
-    vol_vs_avgVol = vol_vs_avgVol.sort_values([f'Last {num_of_bars}-Bar Vol Vs Avg {num_of_periods} {num_of_bars}-Bar Vol'], ascending=False).nlargest(40, [f'Last {num_of_bars}-Bar Vol Vs Avg {num_of_periods} {num_of_bars}-Bar Vol'])
-    vol_vs_avgVol = vol_vs_avgVol.sort_values([f'Last {num_of_bars}-Bar Vol Vs Avg {num_of_periods} {num_of_bars}-Bar Vol'], ascending=False).round(2)
+    # Sort and select top stocks with highest volume surge
+    vol_vs_avgVol = hot_stocks(data, [num_of_bars], num_of_periods)
+    vol_vs_avgVol = vol_vs_avgVol.nlargest(top_n, column).round(2)
+    if not show:
+        return vol_vs_avgVol
 
     # Split into two equal parts
     vol_vs_avgVol_split = np.array_split(vol_vs_avgVol, 2)
-    vol_vs_avgVol_split_first_part = vol_vs_avgVol_split[0].sort_values([f'Last {num_of_bars}-Bar Vol Vs Avg {num_of_periods} {num_of_bars}-Bar Vol'], ascending=True)
+    vol_vs_avgVol_split_first_part = vol_vs_avgVol_split[0].sort_values([column], ascending=True)
 
     # Plot first part of hot stocks
     fig, ax1 = plt.subplots(figsize=(8, 6))
     plt.rcParams['figure.facecolor'] = 'white'
-    ax1.barh(vol_vs_avgVol_split_first_part.index, vol_vs_avgVol_split_first_part[f'Last {num_of_bars}-Bar Vol Vs Avg {num_of_periods} {num_of_bars}-Bar Vol'], color='dodgerblue')
+    ax1.barh(vol_vs_avgVol_split_first_part.index, vol_vs_avgVol_split_first_part[column], color='dodgerblue')
     ax1.set_title(f"Hot Stocks as on {latest_trading_day.date()} (Current {num_of_bars}-Bar Vol / Avg {num_of_periods} {num_of_bars}-Bar Vol) %", fontsize=12)
     ax1.axes.get_xaxis().set_visible(False)
     ax1.set_facecolor('xkcd:white')
@@ -52,8 +106,10 @@ def hot_stocks_custom(data):
         ax1.spines[spine].set_visible(False)
 
     # Add labels to bars
-    for index, value in enumerate(vol_vs_avgVol_split_first_part[f'Last {num_of_bars}-Bar Vol Vs Avg {num_of_periods} {num_of_bars}-Bar Vol']): 
+    for index, value in enumerate(vol_vs_avgVol_split_first_part[column]):
         ax1.text(value, index, f"{value:.2f}%", va='center', fontsize=10, color='black')
 
     plt.tight_layout()
     plt.show()
+
+    return vol_vs_avgVol
@@ -0,0 +1,195 @@
+import os
+import time
+import atexit
+import threading
+import pandas as pd
+import plotly.io as pio
+import plotly.graph_objects as go
+from importlib import metadata
+from concurrent.futures import ThreadPoolExecutor, wait
+
+IMAGE_FORMATS = ("png", "svg", "jpg", "jpeg", "webp", "pdf")
+
+_EXPORTER = None
+_EXPORTER_LOCK = threading.Lock()
+
+
+def _major_version(package):
+    try:
+        return int(metadata.version(package).split(".")[0])
+    except metadata.PackageNotFoundError:
+        return None
+
+
+class ImageExporter:
+    """
+    Writes static images of Plotly figures through one warm kaleido renderer.
+
+    fig.write_image starts (kaleido >= 1: a browser, kaleido 0.2: a renderer
+    process on first use) for every chart. The exporter starts the renderer
+    once and keeps it running until close(). Figures are rendered one at a
+    time, since kaleido's shared server and renderer process are not safe to
+    call from several threads, and the image files are written on a thread
+    pool so that writing one image overlaps with rendering the next.
+
+    Example:
+        with ImageExporter() as exporter:
+            for stock in stocks:
+                exporter.submit(make_figure(stock), f"charts/{stock}.png")
+        exporter.report
+    """
+
+    def __init__(self, max_workers=4, scale=None, width=None, height=None):
+        """
+        Parameters:
+        - max_workers: image files written at the same time
+        - scale, width, height: defaults for every image; a figure's own layout
+          width/height is used when these are None
+        """
+        self.max_workers = max_workers
+        self.options = {"scale": scale, "width": width, "height": height}
+        self._kaleido_major = _major_version("kaleido")
+        self._server = False
+        self._executor = None
+        self._futures = []
+        self._results = []
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._started_at = None
+
+    def start(self):
+        """Starts the renderer; called on first use."""
+        with self._lock:
+            if self._executor is not None:
+                return self
+            if self._kaleido_major is None:
+                raise ImportError("Image export requires the kaleido package: pip install kaleido")
+            if self._kaleido_major >= 1:
+                import kaleido
+
+                # kaleido >= 1.1 keeps one browser for all export calls of the process
+                if hasattr(kaleido, "start_sync_server"):
+                    kaleido.start_sync_server(n=1, silence_warnings=True)
+                    self._server = True
+            elif (_major_version("plotly") or 0) >= 7:
+                raise ImportError(
+                    f"plotly {metadata.version('plotly')} exports images with kaleido >= 1, "
+                    f"kaleido {metadata.version('kaleido')} is installed: pip install --upgrade \"kaleido>=1\""
+                )
+            else:
+                # Renders one empty figure so the kaleido process is up before the first real chart
+                pio.to_image(go.Figure(), format="png", width=10, height=10)
+
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._started_at = time.perf_counter()
+            return self
+
+    def _write(self, fig, path, format):
+        start = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with self._render_lock:
+                image = pio.to_image(fig, format=format, **self.options)
+            with open(path + ".tmp", "wb") as f:
+                f.write(image)
+            os.replace(path + ".tmp", path)
+            error = None
+        except Exception as e:
+            message = str(e).strip().splitlines()
+            error = f"{type(e).__name__}: {message[0] if message else ''}"
+        result = {"Path": path, "Seconds": time.perf_counter() - start, "Error": error}
+        with self._lock:
+            self._results.append(result)
+        return result
+
+    def submit(self, fig, path, format=None):
+        """
+        Queues one figure for export and returns its future.
+
+        The format defaults to the file extension of path. Failures do not
+        raise; they are recorded in report.
+        """
+        format = format or os.path.splitext(path)[1].lstrip(".").lower() or "png"
+        if format not in IMAGE_FORMATS:
+            raise ValueError(f"format must be one of {IMAGE_FORMATS}")
+        self.start()
+        future = self._executor.submit(self._write, fig, path, format)
+        with self._lock:
+            self._futures = [pending for pending in self._futures if not pending.done()] + [future]
+        return future
+
+    def write(self, fig, path, format=None):
+        """Exports one figure and waits for it; raises on failure like fig.write_image."""
+        result = self.submit(fig, path, format).result()
+        if result["Error"]:
+            raise RuntimeError(f"Image export failed for {path}: {result['Error']}")
+        return path
+
+    def export(self, figures, paths, format=None):
+        """
+        Exports a batch of figures to the matching paths and waits for all of them.
+
+        Returns:
+        - DataFrame with 'Path', 'Seconds' and 'Error' for this batch
+        """
+        figures, paths = list(figures), list(paths)
+        if len(figures) != len(paths):
+            raise ValueError("figures and paths must have the same length")
+        start = time.perf_counter()
+        futures = [self.submit(fig, path, format) for fig, path in zip(figures, paths)]
+        batch = pd.DataFrame([future.result() for future in futures], columns=["Path", "Seconds", "Error"])
+        _print_throughput(batch, time.perf_counter() - start)
+        return batch
+
+    def wait(self):
+        """Waits for every queued export."""
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
+        with self._lock:
+            self._futures = [future for future in self._futures if not future.done()]
+
+    @property
+    def report(self):
+        """DataFrame with 'Path', 'Seconds' and 'Error' of every export so far."""
+        with self._lock:
+            return pd.DataFrame(self._results, columns=["Path", "Seconds", "Error"])
+
+    def close(self):
+        """Waits for queued exports, prints the throughput and stops the renderer."""
+        if self._executor is None:
+            return
+        self.wait()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        executor.shutdown()
+        if self._server:
+            import kaleido
+            kaleido.stop_sync_server(silence_warnings=True)
+            self._server = False
+        _print_throughput(self.report, time.perf_counter() - self._started_at)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _print_throughput(report, seconds):
+    failed = report["Error"].notna().sum()
+    written = len(report) - failed
+    rate = written / seconds if seconds > 0 else 0.0
+    print(f"Exported {written} image(s) in {seconds:.1f}s ({rate:.1f}/s), {failed} failed")
+
+
+def get_image_exporter():
+    """The exporter shared by this process, kept warm between calls."""
+    global _EXPORTER
+    with _EXPORTER_LOCK:
+        if _EXPORTER is None:
+            _EXPORTER = ImageExporter()
+            atexit.register(_EXPORTER.close)
+        return _EXPORTER
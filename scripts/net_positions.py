@@ -0,0 +1,209 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from scripts.floorsheet_store import DEFAULT_STORE_DIR, read_manifest, write_manifest
+from scripts.broker_cube import CUBE_KEYS, update_broker_cube
+
+POSITIONS_DIR = "positions"
+LAST_NAME = "last.parquet"
+PAIR_KEYS = ["Stock Symbol", "Broker"]
+POSITION_COLUMNS = CUBE_KEYS + ["cum_qty", "cum_amt"]
+
+# Dates are stored as day numbers in the low bits of a (pair, day) search key
+_DAY_BITS = 20
+
+
+def _entry_dates(entry):
+    return entry.get("dates") or [date for date in (entry["min_date"], entry["max_date"]) if date]
+
+
+def _fingerprint(entry):
+    """GitHub blob sha of a synced file, or the partition path of an appended one."""
+    return entry.get("sha") or entry["path"]
+
+
+def _read_cube_parts(store_dir, entries):
+    parts = [pd.read_parquet(os.path.join(store_dir, entry["cube"])) for entry in entries]
+    cube = pd.concat(parts, ignore_index=True)
+    cube["Stock Symbol"] = cube["Stock Symbol"].astype(str)
+    # A date appended in several parts has several cube rows per key
+    return cube.groupby(CUBE_KEYS, as_index=False, observed=True).sum()
+
+
+def update_net_positions(store_dir=DEFAULT_STORE_DIR):
+    """
+    Brings the running net positions per (Stock Symbol, Broker) up to date with the store.
+
+    For every cube row the cumulative net quantity and amount of that pair up
+    to and including its date are kept, so the net position over any window
+    is the difference of two prefix values. New store files whose dates are
+    all after the last processed date are added incrementally (only their
+    cube partitions are read); anything else, such as a re-downloaded or
+    back-filled day, rebuilds the state from the cube.
+
+    Returns:
+    - number of store files added to the state
+    """
+    update_broker_cube(store_dir)
+    manifest = read_manifest(store_dir)
+    files = manifest["files"]
+    state = manifest.get("positions") or {"files": {}, "parts": [], "max_date": None}
+    positions_dir = os.path.join(store_dir, POSITIONS_DIR)
+
+    new = {name: entry for name, entry in files.items() if name not in state["files"] and entry.get("cube")}
+    changed = any(name not in files or _fingerprint(files[name]) != seen for name, seen in state["files"].items())
+    # A file without trades (e.g. an empty day's sheet) has no dates and never back-fills
+    new_dates = [dates for dates in map(_entry_dates, new.values()) if dates]
+    backfill = state["max_date"] is not None and any(min(dates) <= state["max_date"] for dates in new_dates)
+    if changed or backfill:
+        shutil.rmtree(positions_dir, ignore_errors=True)
+        state = {"files": {}, "parts": [], "max_date": None}
+        new = {name: entry for name, entry in files.items() if entry.get("cube")}
+    if not new:
+        return 0
+
+    cube = _read_cube_parts(store_dir, new.values())
+    if cube.empty:
+        state["files"].update({name: _fingerprint(entry) for name, entry in new.items()})
+        manifest["positions"] = state
+        write_manifest(manifest, store_dir)
+        return len(new)
+
+    os.makedirs(positions_dir, exist_ok=True)
+    last_path = os.path.join(positions_dir, LAST_NAME)
+    last = pd.read_parquet(last_path) if state["parts"] else None
+
+    # Daily net per pair, accumulated on top of each pair's last prefix value
+    cube = cube.sort_values(["Stock Symbol", "Broker", "Date"], kind="stable")
+    daily = cube[CUBE_KEYS].assign(
+        cum_qty=(cube["buy_qty"] - cube["sell_qty"]).astype("int64"),
+        cum_amt=(cube["buy_amt"] - cube["sell_amt"]).astype(float)
+    )
+    pairs = daily.groupby(PAIR_KEYS, observed=True, sort=False)
+    daily["cum_qty"] = pairs["cum_qty"].cumsum()
+    daily["cum_amt"] = pairs["cum_amt"].cumsum()
+    if last is not None:
+        start = daily[PAIR_KEYS].merge(last, on=PAIR_KEYS, how="left")
+        daily["cum_qty"] += start["cum_qty"].fillna(0).to_numpy().astype("int64")
+        daily["cum_amt"] += start["cum_amt"].fillna(0).to_numpy()
+
+    max_date = str(daily["Date"].max().date())
+    rel_path = os.path.join(POSITIONS_DIR, f"{max_date}-{len(state['parts'])}.parquet")
+    daily.to_parquet(os.path.join(store_dir, rel_path), index=False)
+
+    last = pd.concat([last, daily.drop_duplicates(PAIR_KEYS, keep="last")], ignore_index=True) if last is not None else daily
+    last.drop_duplicates(PAIR_KEYS, keep="last").to_parquet(last_path + ".tmp", index=False)
+    os.replace(last_path + ".tmp", last_path)
+
+    state["files"].update({name: _fingerprint(entry) for name, entry in new.items()})
+    state["parts"].append(rel_path)
+    state["max_date"] = max(max_date, state["max_date"] or max_date)
+    manifest["positions"] = state
+    write_manifest(manifest, store_dir)
+    return len(new)
+
+
+def load_net_positions(store_dir=DEFAULT_STORE_DIR, update=True):
+    """Reads the running net positions from the store as NetPositions."""
+    if update:
+        update_net_positions(store_dir)
+    state = read_manifest(store_dir).get("positions") or {"parts": []}
+    parts = [pd.read_parquet(os.path.join(store_dir, path)) for path in state["parts"]]
+    return NetPositions(pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=POSITION_COLUMNS))
+
+
+class NetPositions:
+    """
+    Prefix sums of net quantity and amount per (Stock Symbol, Broker).
+
+    Rows are sorted by pair and date, so the value of a pair as of any date
+    is one binary search, and a window's net position is the as-of value at
+    its end minus the as-of value just before its start, without touching
+    the trades in between.
+
+    Example:
+        positions = load_net_positions()
+        net = positions.window("2025-01-01", "2025-01-31")
+    """
+
+    def __init__(self, positions):
+        positions = positions.sort_values(["Stock Symbol", "Broker", "Date"], kind="stable")
+        self.pairs = pd.MultiIndex.from_frame(positions[PAIR_KEYS].drop_duplicates())
+        pair_codes = self.pairs.get_indexer(pd.MultiIndex.from_frame(positions[PAIR_KEYS]))
+
+        self.dates = pd.to_datetime(positions["Date"]).to_numpy(dtype="datetime64[ns]")
+        self._pair_codes = pair_codes
+        self._keys = (pair_codes.astype(np.int64) << _DAY_BITS) + _day_numbers(self.dates)
+        self._values = {
+            "qty": positions["cum_qty"].to_numpy(dtype=float),
+            "amt": positions["cum_amt"].to_numpy(dtype=float),
+        }
+
+    def __len__(self):
+        return len(self._keys)
+
+    def sessions(self, symbol=None):
+        """Sorted dates with a position row, for one symbol or all."""
+        dates = self.dates if symbol is None else self.dates[self._pair_codes_of([symbol])[1]]
+        return pd.DatetimeIndex(np.unique(dates))
+
+    def window(self, start, end, symbols=None):
+        """
+        Net position of every pair that traded from start to end (both inclusive).
+
+        Returns:
+        - DataFrame with 'Stock Symbol', 'Broker', 'net_qty', 'net_amt'
+        """
+        codes = np.arange(len(self.pairs)) if symbols is None else self._pair_codes_of(symbols)[0]
+        before, before_row = self._asof(codes, _day_numbers(pd.Timestamp(start)) - 1)
+        after, after_row = self._asof(codes, _day_numbers(pd.Timestamp(end)))
+        traded = after_row != before_row
+        return pd.DataFrame({
+            "Stock Symbol": self.pairs.get_level_values(0)[codes[traded]],
+            "Broker": self.pairs.get_level_values(1)[codes[traded]],
+            "net_qty": (after["qty"] - before["qty"])[traded],
+            "net_amt": (after["amt"] - before["amt"])[traded],
+        })
+
+    def cumulative(self, symbol, start, dates, value="amt"):
+        """
+        Net position of each broker in symbol accumulated from start up to each of dates.
+
+        Returns:
+        - DataFrame indexed by Broker with one column per date
+        """
+        codes = self._pair_codes_of([symbol])[0]
+        days = _day_numbers(pd.DatetimeIndex(dates))
+        before, _ = self._asof(codes, _day_numbers(pd.Timestamp(start)) - 1)
+        grid, _ = self._asof(np.repeat(codes, len(days)), np.tile(days, len(codes)))
+        values = grid[value].reshape(len(codes), len(days)) - before[value][:, None]
+        return pd.DataFrame(
+            values,
+            index=pd.Index(self.pairs.get_level_values(1)[codes], name="Broker"),
+            columns=pd.DatetimeIndex(dates, name="Date")
+        )
+
+    def _pair_codes_of(self, symbols):
+        """Pair codes of the symbols and the mask of their rows."""
+        codes = np.flatnonzero(self.pairs.get_level_values(0).isin([str(symbol) for symbol in symbols]))
+        return codes, np.isin(self._pair_codes, codes)
+
+    def _asof(self, codes, days):
+        """Prefix values of each pair as of each day (0 before its first row) and the row used (-1 for none)."""
+        codes = np.asarray(codes, dtype=np.int64)
+        rows = np.searchsorted(self._keys, (codes << _DAY_BITS) + days, side="right") - 1
+        # A row of the previous pair means this pair has no row on or before the day
+        found = rows >= 0
+        found[found] = self._pair_codes[rows[found]] == codes[found]
+        rows = np.where(found, rows, -1)
+        values = {name: np.where(found, array[rows.clip(0)] if len(array) else 0.0, 0.0) for name, array in self._values.items()}
+        return values, rows
+
+
+def _day_numbers(dates):
+    """Days since the epoch of a Timestamp or of datetime values."""
+    if isinstance(dates, pd.Timestamp):
+        return int(dates.to_datetime64().astype("datetime64[D]").astype(np.int64))
+    return np.asarray(dates, dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from scripts.frame_cache import FrameCache
+
+PANEL_VALUES = ("Close", "Volume", "Turnover")
+
+
+class PricePanel:
+    """
+    Date x Ticker arrays of Close, Volume and Turnover built from long price data.
+
+    The same as pd.pivot_table(data, values=..., index="Date", columns="Ticker")
+    (mean of duplicate rows, dates and tickers sorted) for all value columns at
+    once, with cheap tail, date-range, ticker and sector slicing on top.
+
+    Example:
+        panel = get_price_panel(adjusted_price)
+        turnover = panel.sector("Hydro Power").tail(20).frame("Turnover", fill_value=0)
+    """
+
+    def __init__(self, dates, tickers, values, present, sectors=None):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers)
+        self.values = values
+        self.present = present
+        self.sectors = sectors
+
+    @classmethod
+    def from_frame(cls, data, values=PANEL_VALUES):
+        """
+        Builds the panel from long data with 'Date', 'Ticker' and any of the value
+        columns (plus 'Sector' when present, for sector slicing).
+        """
+        date_codes, dates = pd.factorize(pd.to_datetime(data["Date"]), sort=True)
+        ticker_codes, tickers = pd.factorize(data["Ticker"], sort=True)
+        shape = (len(dates), len(tickers))
+        cells = date_codes * shape[1] + ticker_codes
+
+        arrays = {}
+        for column in values:
+            if column not in data.columns:
+                continue
+            column_values = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype=float)
+            valid = ~np.isnan(column_values)
+            sums = np.bincount(cells[valid], weights=column_values[valid], minlength=shape[0] * shape[1])
+            counts = np.bincount(cells[valid], minlength=shape[0] * shape[1])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                arrays[column] = np.where(counts > 0, sums / counts, np.nan).reshape(shape)
+
+        present = (np.bincount(cells, minlength=shape[0] * shape[1]) > 0).reshape(shape)
+
+        sectors = None
+        if "Sector" in data.columns:
+            sectors = pd.Series(data["Sector"].to_numpy(), index=tickers[ticker_codes])
+            sectors = sectors[~sectors.index.duplicated(keep="last")].reindex(tickers)
+
+        return cls(dates, tickers, arrays, present, sectors)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def frame(self, value, fill_value=None):
+        """One value as a Date x Ticker DataFrame; missing cells are NaN or fill_value."""
+        if value not in self.values:
+            raise KeyError(f"Price panel has no '{value}' column")
+        array = self.values[value]
+        if fill_value is not None:
+            array = np.where(np.isnan(array), fill_value, array)
+        return pd.DataFrame(array, index=self.dates.rename("Date"), columns=self.tickers.rename("Ticker"))
+
+    def tail(self, n):
+        """The last n dates."""
+        return self._take(slice(max(len(self.dates) - n, 0), None), slice(None))
+
+    def between(self, start, end):
+        """Dates from start to end, both inclusive."""
+        lo = self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return self._take(slice(lo, hi), slice(None))
+
+    def select(self, tickers):
+        """Only the given tickers, keeping dates on which at least one of them traded."""
+        columns = np.flatnonzero(self.tickers.isin(list(tickers)))
+        rows = np.flatnonzero(self.present[:, columns].any(axis=1))
+        return self._take(rows, columns)
+
+    def drop(self, tickers):
+        """All tickers except the given ones."""
+        return self.select(self.tickers[~self.tickers.isin(list(tickers))])
+
+    def sector(self, sector_name):
+        """Only the tickers of one sector."""
+        if self.sectors is None:
+            raise ValueError("Data must include 'Sector' column to filter by sector.")
+        return self.select(self.tickers[(self.sectors == sector_name).to_numpy()])
+
+    def _take(self, rows, columns):
+        return PricePanel(
+            self.dates[rows],
+            self.tickers[columns],
+            {name: array[rows][:, columns] for name, array in self.values.items()},
+            self.present[rows][:, columns],
+            None if self.sectors is None else self.sectors.iloc[columns]
+        )
+
+
+def get_price_panel(data, version=None):
+    """
+    Returns the PricePanel of data, building it only once per data version.
+
+    Without a version the panel is cached for this DataFrame object, its
+    row count and columns (see frame_cache), so repeated calls in a report
+    session pivot once; pass a version (e.g. the download's ETag) when the
+    frame is replaced by a copy of the same data or edited in place.
+    A PricePanel is returned unchanged.
+    """
+    if isinstance(data, PricePanel):
+        return data
+    return _PANEL_CACHE.get(data, version=version)
+
+
+# Panels of the price frames seen so far; see get_price_panel
+_PANEL_CACHE = FrameCache(PricePanel.from_frame)
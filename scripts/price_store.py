@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from scripts.frame_cache import FrameCache
+
+LOOKUP_MODES = ("asof", "exact", "ffill")
+
+
+class PriceStore:
+    """
+    Price history split by ticker into date-sorted arrays, for binary-search lookups.
+
+    Built once from long price data ('Ticker', 'Date', 'Close'); every lookup
+    afterwards is a dictionary hit plus np.searchsorted over that ticker's
+    dates, instead of a boolean mask over the whole history and a merge.
+
+    Lookup modes:
+    - 'asof': the value on the last date on or before each query date
+    - 'exact': the value on the query date, NaN when the ticker did not trade
+    - 'ffill': exact, then forward-filled along the query dates (the original
+      get_close_prices behaviour)
+
+    Example:
+        store = get_price_store(price_history)
+        closes = store.lookup("NABIL", dates, mode="asof")
+    """
+
+    def __init__(self, price_history, value="Close"):
+        if "Date" not in price_history.columns:
+            price_history = price_history.reset_index()
+
+        values = price_history[value]
+        if values.dtype == object:
+            values = values.astype(str).str.replace(",", "", regex=False)
+        values = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+        dates = pd.to_datetime(price_history["Date"]).to_numpy(dtype="datetime64[ns]")
+        codes, tickers = pd.factorize(price_history["Ticker"])
+
+        # One sort by (ticker, date); each ticker is then a contiguous slice
+        order = np.lexsort((dates, codes))
+        self.value = value
+        self.dates = dates[order]
+        self.values = values[order]
+        bounds = np.searchsorted(codes[order], np.arange(len(tickers) + 1))
+        self._slices = {ticker: slice(bounds[i], bounds[i + 1]) for i, ticker in enumerate(tickers)}
+
+    def __contains__(self, ticker):
+        return ticker in self._slices
+
+    @property
+    def tickers(self):
+        return list(self._slices)
+
+    def history(self, ticker):
+        """(dates, values) of one ticker, sorted by date."""
+        if ticker not in self._slices:
+            raise ValueError(f"No price history found for ticker: {ticker}")
+        rows = self._slices[ticker]
+        return self.dates[rows], self.values[rows]
+
+    def lookup(self, ticker, dates, mode="asof"):
+        """
+        Values of one ticker on many dates at once.
+
+        Parameters:
+        - ticker: ticker symbol
+        - dates: array-like of query dates, in any order
+        - mode: 'asof', 'exact' or 'ffill' (see the class docstring)
+
+        Returns:
+        - float array aligned to dates
+        """
+        if mode not in LOOKUP_MODES:
+            raise ValueError(f"mode must be one of {LOOKUP_MODES}")
+        history_dates, history_values = self.history(ticker)
+        query = pd.to_datetime(pd.Series(np.asarray(dates).ravel())).to_numpy(dtype="datetime64[ns]")
+
+        # Last history row on or before each query date
+        position = np.searchsorted(history_dates, query, side="right") - 1
+        found = (position >= 0) & ~np.isnat(query)
+        position = position.clip(0)
+        if mode != "asof":
+            found &= history_dates[position] == query
+
+        result = np.where(found, history_values[position], np.nan)
+        if mode == "ffill":
+            result = pd.Series(result).ffill().to_numpy()
+        return result
+
+    def frame(self, ticker, dates, mode="ffill"):
+        """DataFrame with the query 'Date's and the looked-up values."""
+        return pd.DataFrame({
+            "Date": np.asarray(dates).ravel(),
+            self.value: self.lookup(ticker, dates, mode)
+        })
+
+
+def get_price_store(price_history, value="Close", version=None):
+    """
+    Returns the PriceStore of price_history, building it only once per data version.
+
+    Without a version the store is cached for this DataFrame object, its
+    row count and columns (see frame_cache); pass a version when the frame
+    is replaced by a copy of the same data or edited in place. A PriceStore
+    is returned unchanged.
+    """
+    if isinstance(price_history, PriceStore):
+        return price_history
+    return _STORE_CACHE.get(price_history, value, version=version)
+
+
+# Stores of the price frames seen so far, per value column; see get_price_store
+_STORE_CACHE = FrameCache(PriceStore)
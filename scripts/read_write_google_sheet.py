@@ -1,13 +1,21 @@
-from gspread_dataframe import set_with_dataframe, get_as_dataframe
 import gspread
 import pandas as pd
+import numpy as np
 import os
 import base64
-from googleapiclient.discovery import build
+import threading
 from google.oauth2.service_account import Credentials
 from dotenv import load_dotenv
 load_dotenv()
 
+SERVICE_ACCOUNT_EMAIL = 'todaysprice-506@todaysprice.iam.gserviceaccount.com'
+# Rows per request when writing large frames; keeps each payload well under the API request size limit
+CHUNK_ROWS = 5000
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
 def get_credentials():
     """Decode base64 key from env variable and return Credentials object without writing to disk."""
     key_base64 = os.environ["GCP_SA_KEY_BASE64"]
@@ -24,54 +32,162 @@ def get_credentials():
     return creds
 
 
-
-def read_google_sheet(sheet_id):   
-    creds = get_credentials()
-    client = gspread.authorize(creds)
-    sheet = client.open_by_key(sheet_id).sheet1
-    sheet_data = sheet.get_all_values()
-    data = pd.DataFrame(sheet_data[1:], columns=sheet_data[0])  # skip header row
-    return data
-
-
-def write_to_google_sheet(df, sheet_id, mode='append'):
-    creds = get_credentials()
-    client = gspread.authorize(creds)
-    sheet = client.open_by_key(sheet_id).sheet1
-
-    if mode == 'overwrite':
+def _cell(value):
+    """A DataFrame value as a Sheets cell: blanks for missing values, plain Python numbers, text otherwise."""
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return ""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def dataframe_values(df, include_index=False, include_column_header=True):
+    """Rows of cell values of df, as written by gspread_dataframe.set_with_dataframe."""
+    values = df.to_numpy(dtype=object).tolist()
+    if include_index:
+        values = [[index] + row for index, row in zip(df.index.to_numpy(dtype=object).tolist(), values)]
+    values = [[_cell(value) for value in row] for row in values]
+    if include_column_header:
+        header = [str(column) for column in df.columns]
+        if include_index:
+            header = [df.index.name or ""] + header
+        values = [header] + values
+    return values
+
+
+class SheetsClient:
+    """
+    One authorized gspread client reused for every read and write.
+
+    Credentials are decoded and authorized once; the gspread client keeps
+    its HTTP session (and connection pool) for its lifetime, and opened
+    worksheets are cached per sheet id (their grid size is re-read before a
+    write resizes the grid, since other writers may have grown it). Appends are sent as server-side
+    values.append calls and large frames are written in chunks of
+    chunk_rows rows.
+
+    Pass client to use an already authorized gspread.Client, or any object
+    with the same open_by_key/create interface (a local fake in tests).
+
+    Example:
+        sheets = get_sheets_client()
+        prices = sheets.read(sheet_id)
+        sheets.write(today, sheet_id, mode="append")
+    """
+
+    def __init__(self, client=None, credentials=None, chunk_rows=CHUNK_ROWS):
+        self._client = client
+        self._credentials = credentials
+        self.chunk_rows = chunk_rows
+        self._worksheets = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = gspread.authorize(self._credentials or get_credentials())
+            return self._client
+
+    def worksheet(self, sheet_id):
+        """First worksheet of the spreadsheet, opened once per sheet id."""
+        if sheet_id not in self._worksheets:
+            self._worksheets[sheet_id] = self.client.open_by_key(sheet_id).sheet1
+        return self._worksheets[sheet_id]
+
+    def read(self, sheet_id):
+        """The sheet as a DataFrame of strings, with the first row as header."""
+        sheet_data = self.worksheet(sheet_id).get_all_values()
+        return pd.DataFrame(sheet_data[1:], columns=sheet_data[0])  # skip header row
+
+    def append(self, df, sheet_id):
+        """Appends the rows of df (no header) after the last row with data, on the server side."""
+        sheet = self.worksheet(sheet_id)
+        values = dataframe_values(df, include_column_header=False)
+        for start in range(0, len(values), self.chunk_rows):
+            sheet.append_rows(
+                values[start:start + self.chunk_rows],
+                value_input_option="USER_ENTERED",
+                insert_data_option="INSERT_ROWS",
+                table_range="A1"
+            )
+
+    def overwrite(self, df, sheet_id, include_index=True):
+        """Clears the sheet and writes df with its header in chunked batch updates."""
+        sheet = self.worksheet(sheet_id)
+        values = dataframe_values(df, include_index=include_index)
         sheet.clear()
-        set_with_dataframe(sheet, df, include_index=True, include_column_header=True)
+        self._write_values(sheet, values)
+
+    def _refresh(self, sheet):
+        """The worksheet with its current properties (grid size), replacing the cached one."""
+        sheet = sheet.spreadsheet.get_worksheet_by_id(sheet.id)
+        self._worksheets[sheet.spreadsheet.id] = sheet
+        return sheet
+
+    def _write_values(self, sheet, values):
+        if not values:
+            return
+        rows, cols = len(values), len(values[0])
+        # values.batchUpdate does not grow the grid; the cached size misses rows added by other writers
+        sheet = self._refresh(sheet)
+        if sheet.row_count < rows or sheet.col_count < cols:
+            sheet.resize(rows=max(sheet.row_count, rows), cols=max(sheet.col_count, cols))
+
+        last_column = gspread.utils.rowcol_to_a1(1, cols).rstrip("0123456789")
+        for start in range(0, rows, self.chunk_rows):
+            chunk = values[start:start + self.chunk_rows]
+            sheet.batch_update(
+                [{"range": f"A{start + 1}:{last_column}{start + len(chunk)}", "values": chunk}],
+                value_input_option="USER_ENTERED"
+            )
+
+    def write(self, df, sheet_id, mode='append'):
+        """Writes df to the sheet; mode is 'append' or 'overwrite'."""
+        if mode == 'overwrite':
+            self.overwrite(df, sheet_id)
+        elif mode == 'append':
+            self.append(df, sheet_id)
+        else:
+            raise ValueError("mode must be 'append' or 'overwrite'")
+
+    def create_in_folder(self, df, sheet_title, folder_id, share_with=SERVICE_ACCOUNT_EMAIL):
+        """Creates a spreadsheet in a Drive folder, shares it and writes df with its header; returns the spreadsheet."""
+        spreadsheet = self.client.create(sheet_title, folder_id=folder_id)
+        if share_with:
+            spreadsheet.share(share_with, perm_type='user', role='writer')
+
+        sheet = spreadsheet.sheet1
+        self._worksheets[spreadsheet.id] = sheet
+        self._write_values(sheet, dataframe_values(df))
+        return spreadsheet
+
+
+def get_sheets_client():
+    """The SheetsClient shared by this process, authorized on first use."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = SheetsClient()
+        return _CLIENT
+
+
+def read_google_sheet(sheet_id, client=None):
+    return (client or get_sheets_client()).read(sheet_id)
+
+
+def write_to_google_sheet(df, sheet_id, mode='append', client=None):
+    (client or get_sheets_client()).write(df, sheet_id, mode)
+    if mode == 'overwrite':
         print("Data written (overwritten) to Google Sheet successfully.")
-    elif mode == 'append':
-        existing_data = get_as_dataframe(sheet, evaluate_formulas=True)
-        non_empty_rows = existing_data.dropna(how='all').shape[0]
-        next_row = non_empty_rows + 2
-        set_with_dataframe(sheet, df, row=next_row, include_column_header=False)
+    else:
         print("Data appended to Google Sheet successfully.")
 
 
-def write_new_google_sheet_to_folder(df, sheet_title, folder_id):
-    creds = get_credentials()
-    client = gspread.authorize(creds)
-
-    spreadsheet = client.create(sheet_title)
-    spreadsheet.share('todaysprice-506@todaysprice.iam.gserviceaccount.com', perm_type='user', role='writer')
-
-    drive_service = build('drive', 'v3', credentials=creds)
-    file_id = spreadsheet.id
-
-    current_parents = drive_service.files().get(fileId=file_id, fields='parents').execute().get('parents', [])
-
-    drive_service.files().update(
-        fileId=file_id,
-        addParents=folder_id,
-        removeParents=",".join(current_parents),
-        fields='id, parents'
-    ).execute()
-
-    sheet = spreadsheet.sheet1
-    set_with_dataframe(sheet, df, include_column_header=True)
+def write_new_google_sheet_to_folder(df, sheet_title, folder_id, client=None):
+    spreadsheet = (client or get_sheets_client()).create_in_folder(df, sheet_title, folder_id)
 
     print(f"Sheet '{sheet_title}' created and moved to folder successfully.")
-    print(f"URL: {spreadsheet.url}")
\ No newline at end of file
+    print(f"URL: {spreadsheet.url}")
@@ -0,0 +1,572 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import datetime
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import plotly.io as pio
+import plotly.graph_objects as go
+from plotly.io.base_renderers import ExternalRenderer
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "REPORT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Floorsheet", "store", "report_cache")
+)
+INDEX_NAME = "index.json"
+STAGE_KINDS = ("load", "derive", "analyze", "render", "publish")
+CAPTURE_RENDERER = "report_pipeline"
+INDICES_SHEET_ID = "1VvJsBXRGZ7sKRhGeHr-DCjnESjiYWsVm-A0ZIYG6en0"
+
+
+#========================================================================================================================================================
+# Figure capture: the plot functions end in fig.show(renderer=...); the capture renderer hands the figure to the calling stage
+#========================================================================================================================================================
+
+_captured = threading.local()
+
+
+class _FigureCollector(ExternalRenderer):
+    def render(self, fig_dict):
+        figures = getattr(_captured, "figures", None)
+        if figures is not None:
+            figures.append(go.Figure(fig_dict))
+
+
+pio.renderers[CAPTURE_RENDERER] = _FigureCollector()
+
+
+@contextmanager
+def captured_figures():
+    """Collects the figures shown in this thread with the capture renderer into the yielded list."""
+    _captured.figures = figures = []
+    try:
+        yield figures
+    finally:
+        _captured.figures = None
+
+
+def capture(func, *args, **kwargs):
+    """Calls a plotting function that takes a renderer argument and returns the figures it showed."""
+    with captured_figures() as figures:
+        func(*args, renderer=CAPTURE_RENDERER, **kwargs)
+    return figures
+
+
+#========================================================================================================================================================
+# Stages and the pipeline
+#========================================================================================================================================================
+
+class Stage:
+    """
+    One step of a report pipeline.
+
+    func is called with the values of its dependencies as keyword arguments
+    (named after the dependency stages) plus params.
+
+    Parameters:
+    - name: stage name, also the keyword its value is passed under
+    - func: callable producing the stage value
+    - deps: names of the stages it reads
+    - kind: one of STAGE_KINDS
+    - params: extra keyword arguments, part of the cache key
+    - version: callable returning the version of an external input (e.g. the
+      store manifest or today's date); part of the cache key
+    - cache: pickle the value into the cache directory. Stages whose source
+      is already cached locally (the floorsheet store) set this to False and
+      are run only when a stale stage needs them.
+    - token: the value is a small version of what the stage fetched (e.g. the
+      store fingerprint after a sync). Stages reading it are keyed by that
+      value instead of by this stage's key, and their keys are computed after
+      it has run, so a re-run that fetches nothing new rebuilds nothing else.
+    """
+
+    def __init__(self, name, func, deps=(), kind="analyze", params=None, version=None, cache=True, token=False):
+        if kind not in STAGE_KINDS:
+            raise ValueError(f"kind must be one of {STAGE_KINDS}")
+        if token and not cache:
+            raise ValueError("token stages must be cached")
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.kind = kind
+        self.params = params or {}
+        self.version = version
+        self.cache = cache
+        self.token = token
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, kind={self.kind!r}, deps={list(self.deps)})"
+
+
+class ReportPipeline:
+    """
+    Runs stages in dependency order, caching each value keyed by its input version.
+
+    A stage's key hashes its name, params, version and the keys of its
+    dependencies, so a new floorsheet day changes the key of everything
+    downstream of the floorsheet and nothing else. Stages whose key matches
+    the cache are skipped (and their value is only read from disk when a
+    stale stage needs it); the stale ones run on a thread pool as soon as
+    their dependencies are done, so independent analyses and renders overlap.
+
+    Example:
+        pipeline = daily_report_pipeline()
+        pipeline.run()
+    """
+
+    def __init__(self, stages, cache_dir=DEFAULT_CACHE_DIR):
+        self.stages = {}
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown or later stage(s): {missing}")
+            self.stages[stage.name] = stage
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+    def _order(self, targets=None):
+        """Stages needed for targets (all by default), in dependency order."""
+        needed = set()
+        pending = list(targets or self.stages)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage: {name}")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in needed]
+
+    def _sinks(self, order):
+        """Stages of order that no other stage of order reads."""
+        read = {dep for name in order for dep in self.stages[name].deps}
+        return [name for name in order if name not in read]
+
+    def _key(self, stage, keys, tokens):
+        version = stage.version() if stage.version else None
+        inputs = [tokens[dep] if self.stages[dep].token else keys[dep] for dep in stage.deps]
+        payload = [stage.name, stage.kind, stage.params, version, inputs]
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _read_index(self):
+        index_path = os.path.join(self.cache_dir, INDEX_NAME)
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path) as f:
+            return json.load(f)
+
+    def _artifact_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.pkl")
+
+    def _is_fresh(self, stage, key, index):
+        entry = index.get(stage.name)
+        return (
+            stage.cache and entry is not None and entry["key"] == key
+            and os.path.exists(self._artifact_path(stage.name))
+            and all(os.path.exists(path) for path in entry.get("files", []))
+        )
+
+    def _store(self, stage, key, value):
+        path = self._artifact_path(stage.name)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+        entry = {"key": key, "updated": datetime.datetime.now().isoformat(timespec="seconds")}
+        if stage.kind == "publish":
+            entry["files"] = [str(path) for path in value]
+        with self._lock:
+            index = self._read_index()
+            index[stage.name] = entry
+            with open(os.path.join(self.cache_dir, INDEX_NAME + ".tmp"), "w") as f:
+                json.dump(index, f, indent=1, sort_keys=True)
+            os.replace(os.path.join(self.cache_dir, INDEX_NAME + ".tmp"), os.path.join(self.cache_dir, INDEX_NAME))
+
+    def plan(self, targets=None, force=()):
+        """
+        Keys of the needed stages and the names of those that would run.
+
+        Stages reading a stale token stage are keyed with its cached value
+        (None when there is none); run() plans again once the token stages
+        have run.
+
+        Returns:
+        - (dict of stage -> key, list of stale stages in dependency order)
+        """
+        order = self._order(targets)
+        index = self._read_index()
+        keys, tokens, stale = {}, {}, set()
+        for name in order:
+            stage = self.stages[name]
+            keys[name] = self._key(stage, keys, tokens)
+            fresh = self._is_fresh(stage, keys[name], index)
+            if name in force or not fresh:
+                stale.add(name)
+            if stage.token:
+                tokens[name] = self._load(name) if os.path.exists(self._artifact_path(name)) else None
+
+        # Stages not worth caching run only when a stale stage reads them (or they are a target)
+        wanted = set(targets or self._sinks(order))
+        run = set()
+        for name in reversed(order):
+            stage = self.stages[name]
+            if name in stale and (stage.cache or name in wanted or name in run):
+                run.add(name)
+                run.update(dep for dep in stage.deps if dep in stale)
+        return keys, [name for name in order if name in run]
+
+    def _load(self, name):
+        with open(self._artifact_path(name), "rb") as f:
+            return pickle.load(f)
+
+    def run(self, targets=None, force=(), max_workers=4):
+        """
+        Brings the targets (all stages by default) up to date.
+
+        Stale token stages (and what they read) run first; the other stages
+        are then planned with the token values they produced.
+
+        Parameters:
+        - targets: stage names to produce; their dependencies are included
+        - force: stage names to re-run even when their cache is current
+        - max_workers: stages run at the same time
+
+        Returns:
+        - dict of target -> value
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        values = {}
+        keys, run = self.plan(targets, force)
+
+        token_stages = [name for name in run if self.stages[name].token]
+        if token_stages:
+            first = [name for name in run if name in set(self._order(token_stages))]
+            print(f"{len(first)} token stage(s) to run first")
+            self._execute(first, keys, values, max_workers)
+            keys, run = self.plan(targets, set(force) - set(first))
+            run = [name for name in run if name not in values]
+
+        print(f"{len(run)} stage(s) to run, {len(keys) - len(run)} up to date")
+        self._execute(run, keys, values, max_workers)
+        return {name: self._value_of(name, values) for name in (targets or self._sinks(list(keys)))}
+
+    def _value_of(self, name, values):
+        with self._lock:
+            if name not in values:
+                values[name] = self._load(name)
+            return values[name]
+
+    def _execute(self, run, keys, values, max_workers):
+        """Runs the stages of run as soon as their dependencies are done, storing each value in values."""
+        def value_of(name):
+            return self._value_of(name, values)
+
+        def execute(name):
+            stage = self.stages[name]
+            start = time.perf_counter()
+            inputs = {dep: value_of(dep) for dep in stage.deps}
+            value = stage.func(**inputs, **stage.params)
+            if stage.cache:
+                key = keys[name]
+                if stage.token:
+                    # Keyed by its version after the run (e.g. the store it just synced), so the next run finds it fresh
+                    key = self._key(stage, keys, {dep: value_of(dep) for dep in stage.deps if self.stages[dep].token})
+                self._store(stage, key, value)
+            return value, time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            remaining = list(run)
+            running = {}
+            while remaining or running:
+                for name in [name for name in remaining if not any(dep in remaining or dep in running.values() for dep in self.stages[name].deps)]:
+                    remaining.remove(name)
+                    running[executor.submit(execute, name)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        value, seconds = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        print(f"{name}: FAILED")
+                        raise
+                    with self._lock:
+                        values[name] = value
+                    print(f"{name}: {seconds:.2f}s")
+
+
+#========================================================================================================================================================
+# The daily report
+#========================================================================================================================================================
+
+DAILY_SETTINGS = {
+    "sector_days": 10,
+    "sectors": ["Non Life Insurance"],
+    "sector_top_n": 10,
+    "turnover_days": 5,
+    "turnover_top_n": 20,
+    "vpt_days": 10,
+    "heatmap_top_n": 20,
+    "net_buy_days": [1, 5],
+    "net_buy_top_n": 10,
+    "cornering_days": 3,
+    "cornering_top_n": 20,
+    "sankey_days": 5,
+    "sankey_top_n": 5,
+}
+
+
+def today_version():
+    """Inputs fetched from the web are taken to change once a day."""
+    return datetime.date.today().isoformat()
+
+
+def floorsheet_version(store_dir=None):
+    """Fingerprint of the files in the floorsheet store, read from its manifest only."""
+    from scripts.floorsheet_store import DEFAULT_STORE_DIR, read_manifest
+
+    files = read_manifest(store_dir or DEFAULT_STORE_DIR)["files"]
+    return {name: entry.get("sha") or entry["path"] for name, entry in files.items()}
+
+
+def sync_version():
+    """The sync runs again on a new day or when the store changed since the last sync (e.g. a manual append)."""
+    return {"date": today_version(), "store": floorsheet_version()}
+
+
+def _sync_floorsheet():
+    """Downloads the new daily floorsheets into the store; returns the store's fingerprint after the sync."""
+    from scripts.floorsheet_store import sync_daily_floorsheet_store
+
+    sync_daily_floorsheet_store()
+    return floorsheet_version()
+
+
+def _load_floorsheet(floorsheet_sync):
+    from scripts.floorsheet_store import load_floorsheet_store
+    return load_floorsheet_store()
+
+
+def _load_adjusted_price():
+    from scripts.adjusted_price_data import get_adjusted_price_of_all_companies
+    return get_adjusted_price_of_all_companies()
+
+
+def _load_float_data():
+    from scripts.free_float_shares import free_float_market_cap
+    return free_float_market_cap()
+
+
+def _load_active_comps():
+    from scripts.ActiveCompanies import stock_and_indices_data
+    return stock_and_indices_data()
+
+
+def _load_indices_history():
+    from scripts.read_write_google_sheet import read_google_sheet
+    return read_google_sheet(INDICES_SHEET_ID)
+
+
+def _prices(adjusted_price):
+    import pandas as pd
+
+    adjusted_price = adjusted_price.copy()
+    adjusted_price['Date'] = pd.to_datetime(adjusted_price['Date'])
+    cols_to_convert = adjusted_price.columns.difference(['Date', 'Ticker'])
+    adjusted_price[cols_to_convert] = adjusted_price[cols_to_convert].astype(float)
+    return adjusted_price
+
+
+def _prices_sectorwise(prices, active_comps):
+    return prices.merge(active_comps[['Ticker', 'Sector']], on='Ticker', how='left')
+
+
+def _indices_without_nepse(indices_history):
+    indices = indices_history[indices_history['Ticker'] != "Nepse Index"].copy()
+    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        indices[col] = indices[col].str.replace(',', '').astype(float)
+    return indices
+
+
+def _calendar(floorsheet):
+    from scripts.trading_calendar import TradingCalendar
+    return TradingCalendar.from_frame(floorsheet)
+
+
+def _net_buy_vs_float(floorsheet, float_data, active_comps, calendar, n_days, top_n):
+    from scripts.top_netBuy_vs_float import compute_net_buy_vs_float
+    return compute_net_buy_vs_float(floorsheet, float_data, active_comps, n_days, top_n, calendar)
+
+
+# Cornering and the Sankey flows use each stock's own last N trading days, as the notebook does
+
+def _cornering(floorsheet, active_comps, float_data, days, top_n):
+    from scripts.accumulation_trend import compute_cornering_strength
+    return compute_cornering_strength(floorsheet, active_comps, float_data, top_n, days)
+
+
+def _broker_flows(floorsheet, cornering, days, top_n):
+    from scripts.broker_flows import compute_broker_flows
+    return compute_broker_flows(floorsheet, cornering["Ticker"], days=days, top_n=top_n)
+
+
+def _sector_charts(indices_history, days):
+    from scripts.sector_wise_accumulation import sector_wise_accumulation
+    # sector_wise_accumulation converts columns in place; other stages read the same frame
+    return capture(sector_wise_accumulation, indices_history.copy(), trading_days=days)
+
+
+def _sector_specific_charts(prices_sectorwise, sectors, days, top_n):
+    from scripts.specific_sector_accumulation import sector_specific_accumulation
+    return [
+        figure for sector in sectors
+        for figure in capture(sector_specific_accumulation, sector, prices_sectorwise, trading_days=days, top_n=top_n)
+    ]
+
+
+def _turnover_charts(prices, indices_history, days, top_n):
+    from scripts.cumulative_turnover import plot_cumulative_pct_change_by_trading_days
+    return capture(plot_cumulative_pct_change_by_trading_days, prices, indices_history, trading_days=days, top_n=top_n)
+
+
+def _vpt_charts(indices, prices_sectorwise, days):
+    from scripts.volume_price_trend import calculate_and_plot_vpt
+    return capture(calculate_and_plot_vpt, indices, 'indices', days) + capture(calculate_and_plot_vpt, prices_sectorwise, 'stocks', days)
+
+
+def _heatmap_charts(prices, float_data, top_n):
+    from scripts.volume_to_float_heatmap import plot_relative_turnover_heatmap
+    return capture(plot_relative_turnover_heatmap, prices, float_data, top_n)
+
+
+def _net_buy_charts(net_buy_vs_float):
+    from scripts.top_netBuy_vs_float import _plot_net_buy_vs_float
+    return [
+        figure for horizon, table in net_buy_vs_float.items()
+        for figure in capture(_plot_net_buy_vs_float, table.copy(), f' (Last {horizon} Days)')
+    ]
+
+
+def _cornering_charts(cornering):
+    from scripts.accumulation_trend import plot_cornering_strength
+    return [] if cornering.empty else [plot_cornering_strength(cornering)]
+
+
+def _sankey_charts(broker_flows):
+    return [flows.figure() for flows in broker_flows.values() if not flows.empty]
+
+
+def _publish(calendar, net_buy_vs_float, cornering, report_dir, **charts):
+    """
+    Writes the Word report: the tables, then every chart as a PNG exported
+    next to it through the warm ImageExporter. Returns the written paths.
+    """
+    from docx.shared import Inches
+    from scripts.Write_in_word import ReportBuilder
+    from scripts.image_export import get_image_exporter
+
+    last_trading_day = calendar.last_session.date()
+    chart_dir = os.path.join(report_dir, "Charts", str(last_trading_day))
+
+    titles, figures, paths = [], [], []
+    for name, stage_figures in charts.items():
+        for i, figure in enumerate(stage_figures):
+            titles.append(f"{name.replace('_', ' ').capitalize()} {i + 1}")
+            figures.append(figure)
+            paths.append(os.path.join(chart_dir, f"{name}-{i}.png"))
+
+    exported = get_image_exporter().export(figures, paths)
+    failed = exported[exported["Error"].notna()]
+    if not failed.empty:
+        raise RuntimeError(f"{len(failed)} chart(s) could not be exported, first: {failed['Error'].iloc[0]}")
+
+    report = ReportBuilder.daily(last_trading_day, report_dir, chart_dir)
+    for horizon, table in net_buy_vs_float.items():
+        report.add_table(f"Net Buy vs Float (Last {horizon} Days)", table)
+    report.add_table("Cornering Strength", cornering)
+    for title, path in zip(titles, paths):
+        report.add_chart(title, os.path.basename(path), width=Inches(10))
+    paths.append(report.save())
+    return paths
+
+
+def daily_report_pipeline(report_dir=None, cache_dir=DEFAULT_CACHE_DIR, **settings):
+    """
+    The daily report notebook as a ReportPipeline.
+
+    Parameters:
+    - report_dir: where the Word report and its chart images are written,
+      defaults to Write_in_word.REPORT_DIR
+    - cache_dir: where stage values are cached
+    - settings: overrides of DAILY_SETTINGS (days and top_n of each chart)
+    """
+    from scripts.Write_in_word import REPORT_DIR
+
+    unknown = set(settings) - set(DAILY_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown settings: {sorted(unknown)}")
+    s = {**DAILY_SETTINGS, **settings}
+    charts = ["sector_charts", "sector_specific_charts", "turnover_charts", "vpt_charts", "heatmap_charts",
+              "net_buy_charts", "cornering_charts", "sankey_charts"]
+
+    return ReportPipeline([
+        # The floorsheet and everything after it are keyed by the store fingerprint the sync returns
+        Stage("floorsheet_sync", _sync_floorsheet, kind="load", version=sync_version, token=True),
+        Stage("floorsheet", _load_floorsheet, ["floorsheet_sync"], kind="load", cache=False),
+        Stage("adjusted_price", _load_adjusted_price, kind="load", version=today_version, cache=False),
+        Stage("float_data", _load_float_data, kind="load", version=today_version),
+        Stage("active_comps", _load_active_comps, kind="load", version=today_version),
+        Stage("indices_history", _load_indices_history, kind="load", version=today_version),
+
+        Stage("prices", _prices, ["adjusted_price"], kind="derive", cache=False),
+        Stage("prices_sectorwise", _prices_sectorwise, ["prices", "active_comps"], kind="derive", cache=False),
+        Stage("indices", _indices_without_nepse, ["indices_history"], kind="derive"),
+        Stage("calendar", _calendar, ["floorsheet"], kind="derive"),
+
+        Stage("net_buy_vs_float", _net_buy_vs_float, ["floorsheet", "float_data", "active_comps", "calendar"],
+              params={"n_days": s["net_buy_days"], "top_n": s["net_buy_top_n"]}),
+        Stage("cornering", _cornering, ["floorsheet", "active_comps", "float_data"],
+              params={"days": s["cornering_days"], "top_n": s["cornering_top_n"]}),
+        Stage("broker_flows", _broker_flows, ["floorsheet", "cornering"],
+              params={"days": s["sankey_days"], "top_n": s["sankey_top_n"]}),
+
+        Stage("sector_charts", _sector_charts, ["indices_history"], kind="render", params={"days": s["sector_days"]}),
+        Stage("sector_specific_charts", _sector_specific_charts, ["prices_sectorwise"], kind="render",
+              params={"sectors": s["sectors"], "days": s["sector_days"], "top_n": s["sector_top_n"]}),
+        Stage("turnover_charts", _turnover_charts, ["prices", "indices_history"], kind="render",
+              params={"days": s["turnover_days"], "top_n": s["turnover_top_n"]}),
+        Stage("vpt_charts", _vpt_charts, ["indices", "prices_sectorwise"], kind="render", params={"days": s["vpt_days"]}),
+        Stage("heatmap_charts", _heatmap_charts, ["prices", "float_data"], kind="render", params={"top_n": s["heatmap_top_n"]}),
+        Stage("net_buy_charts", _net_buy_charts, ["net_buy_vs_float"], kind="render"),
+        Stage("cornering_charts", _cornering_charts, ["cornering"], kind="render"),
+        Stage("sankey_charts", _sankey_charts, ["broker_flows"], kind="render"),
+
+        Stage("report", _publish, ["calendar", "net_buy_vs_float", "cornering"] + charts, kind="publish",
+              params={"report_dir": report_dir or REPORT_DIR}),
+    ], cache_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Builds the daily report, skipping stages that are up to date.")
+    parser.add_argument("targets", nargs="*", help="stages to produce (default: all)")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to re-run even when cached")
+    parser.add_argument("--workers", type=int, default=4, help="stages run at the same time")
+    parser.add_argument("--report-dir", default=None, help="where the report is written")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="where stage values are cached")
+    parser.add_argument("--plan", action="store_true", help="only print the stages that would run")
+    args = parser.parse_args()
+
+    pipeline = daily_report_pipeline(args.report_dir, args.cache_dir)
+    if args.plan:
+        _, run = pipeline.plan(args.targets or None, args.force)
+        print("\n".join(run) or "Everything is up to date")
+    else:
+        pipeline.run(args.targets or None, args.force, args.workers)
@@ -4,7 +4,7 @@ from plotly.subplots import make_subplots
 import numpy as np
 from scripts.convert_sector_to_index_viceversa import convert_sector_or_index
 
-def sector_wise_accumulation(all_indices_data, trading_days=5, top_n=20):
+def sector_wise_accumulation(all_indices_data, trading_days=5, top_n=20, renderer=None):
     """
     Plot cumulative volume for top `n` tickers over the last `trading_days` trading days.
     
@@ -12,6 +12,7 @@ def sector_wise_accumulation(all_indices_data, trading_days=5, top_n=20):
     - all_indices_data (DataFrame): DataFrame with 'Date', 'Ticker', and 'Volume' columns.
     - trading_days (int): Number of most recent trading days to include.
     - top_n (int): Number of top tickers to display.
+    - renderer (str): Plotly renderer for fig.show(); the default renderer when None.
     """
 
     # Ensure 'Date' is datetime and sort
@@ -83,4 +84,4 @@ def sector_wise_accumulation(all_indices_data, trading_days=5, top_n=20):
         )
     )
 
-    fig.show()
\ No newline at end of file
+    fig.show(renderer=renderer)
\ No newline at end of file
@@ -2,33 +2,23 @@ import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+from scripts.price_panel import get_price_panel
 
-def sector_specific_accumulation(sector_name, sector_specific_data, trading_days=5, top_n=20):
+def sector_specific_accumulation(sector_name, sector_specific_data, trading_days=5, top_n=20, renderer=None):
     """
     Plot cumulative volume for top `n` tickers over the last `trading_days` trading days.
     
     Parameters:
-    - sector_specific_data (DataFrame): DataFrame with 'Date', 'Ticker', and 'Volume' columns.
+    - sector_specific_data (DataFrame): DataFrame with 'Date', 'Ticker', 'Sector' and 'Turnover' columns,
+      or its PricePanel.
     - trading_days (int): Number of most recent trading days to include.
     - top_n (int): Number of top tickers to display.
+    - renderer (str): Plotly renderer for fig.show(); the default renderer when None.
     """
-    sector_specific_data = sector_specific_data[sector_specific_data["Sector"] == sector_name].copy()
-    # Ensure 'Date' is datetime and sort
-    sector_specific_data['Date'] = pd.to_datetime(sector_specific_data['Date'])
-    sector_specific_data = sector_specific_data.sort_values('Date')
-    sector_specific_data = sector_specific_data[sector_specific_data["Ticker"]!= 'Nepse Index']
+    panel = get_price_panel(sector_specific_data).sector(sector_name).drop(['Nepse Index'])
 
-    # Pivot table to get turnover
-    pivot_table_vol = pd.pivot_table(
-        sector_specific_data,
-        values="Turnover",
-        index="Date",
-        columns="Ticker",
-        fill_value=0
-    )
-
-    # Keep only the last N trading days
-    pivot_table_vol = pivot_table_vol.tail(trading_days)
+    # Turnover for the last N trading days
+    pivot_table_vol = panel.tail(trading_days).frame("Turnover", fill_value=0)
 
     # Calculate cumulative volume
     cumulative_volume = pivot_table_vol.cumsum()
@@ -78,4 +68,4 @@ def sector_specific_accumulation(sector_name, sector_specific_data, trading_days
         )
     )
 
-    fig.show()
\ No newline at end of file
+    fig.show(renderer=renderer)
\ No newline at end of file
@@ -1,31 +1,37 @@
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from datetime import timedelta
+from scripts.broker_cube import buy_sell_totals
+from scripts.trading_calendar import TradingCalendar
 
-def plot_stock_brokers(floorsheet_data, days=7):
+def plot_stock_brokers(floorsheet_data, days=5, calendar=None):
     """
     Plot top buying and selling brokers for a stock based on recent 'days' worth of data.
 
     Parameters:
-    - floorsheet_data (DataFrame): Must include 'Date', 'Buyer', 'Seller', 'Amount (Rs)'.
-    - days (int): Number of most recent days to include in the analysis.
+    - floorsheet_data (DataFrame): Must include 'Date', 'Buyer', 'Seller', 'Amount (Rs)',
+      or be a broker cube (see broker_cube).
+    - days (int): Number of most recent trading days to include in the analysis. Default is 5 (one week).
+    - calendar (TradingCalendar): Optional shared calendar; built from floorsheet_data when omitted.
     """
 
     # Ensure Date column is datetime
     floorsheet_data['Date'] = pd.to_datetime(floorsheet_data['Date'])
 
-    # Filter for the last 'n' days
-    cutoff_date = floorsheet_data['Date'].max() - timedelta(days=days)
+    # Filter for the last 'n' trading days
+    if calendar is None:
+        calendar = TradingCalendar.from_frame(floorsheet_data)
+    cutoff_date = calendar.window_start(days)
     filtered_data = floorsheet_data[floorsheet_data['Date'] >= cutoff_date]
 
+    buy, sell = buy_sell_totals(filtered_data, by=[], value="Amount (Rs)")
+
     # Total transaction amount
-    total_transaction_amount = filtered_data["Amount (Rs)"].sum()
+    total_transaction_amount = buy.sum()
 
     # Top 10 Buyers
     top_buyer_broker = (
-        filtered_data.groupby(["Buyer"], as_index=False)["Amount (Rs)"]
-        .sum()
+        buy.reset_index()
         .sort_values(by="Amount (Rs)", ascending=False)
         .head(10)
     )
@@ -34,8 +40,7 @@ def plot_stock_brokers(floorsheet_data, days=7):
 
     # Top 10 Sellers
     top_seller_broker = (
-        filtered_data.groupby(["Seller"], as_index=False)["Amount (Rs)"]
-        .sum()
+        sell.reset_index()
         .sort_values(by="Amount (Rs)", ascending=False)
         .head(10)
     )
@@ -45,7 +50,7 @@ def plot_stock_brokers(floorsheet_data, days=7):
     # Plot
     fig = make_subplots(
         rows=1, cols=2, horizontal_spacing=0.15,
-        subplot_titles=(f"Top Buyers (Last {days} Days)", f"Top Sellers (Last {days} Days)")
+        subplot_titles=(f"Top Buyers (Last {days} Trading Days)", f"Top Sellers (Last {days} Trading Days)")
     )
 
     fig.add_trace(go.Bar(
@@ -67,7 +72,7 @@ def plot_stock_brokers(floorsheet_data, days=7):
     ), row=1, col=2)
 
     fig.update_layout(
-        title_text=f"Top Brokers for Last {days} Days",
+        title_text=f"Top Brokers for Last {days} Trading Days",
         template="plotly_white",
         width=1000, height=600,
         showlegend=False
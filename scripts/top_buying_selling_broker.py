@@ -1,32 +1,30 @@
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
+from scripts.broker_cube import buy_sell_totals
+from scripts.trading_calendar import TradingCalendar
 
-def plot_buyer_cumulative_turnover_from_floorsheet(combined_floorsheet, days=30):
+def plot_buyer_cumulative_turnover_from_floorsheet(combined_floorsheet, days=21, calendar=None):
     """
     Generate and plot the cumulative turnover for the top 10 buyers from the combined floorsheet data,
     filtered by the last `days` number of trading days.
 
     Parameters:
     - combined_floorsheet (DataFrame): DataFrame containing the trading data with columns 
-      'Buyer', 'Amount (Rs)', and 'Date'.
-    - days (int): Number of most recent trading days to include in the plot. Default is 30 days.
+      'Buyer', 'Amount (Rs)', and 'Date', or a broker cube (see broker_cube).
+    - days (int): Number of most recent trading days to include in the plot. Default is 21 (about a month).
+    - calendar (TradingCalendar): Optional shared calendar; built from combined_floorsheet when omitted.
     """
-    # Ensure 'Date' is datetime and filter data for the last `days` days
+    # Ensure 'Date' is datetime and filter data for the last `days` trading days
     combined_floorsheet['Date'] = pd.to_datetime(combined_floorsheet['Date'])
-    cutoff_date = datetime.now() - timedelta(days=days)
+    if calendar is None:
+        calendar = TradingCalendar.from_frame(combined_floorsheet)
+    cutoff_date = calendar.window_start(days)
     filtered_data = combined_floorsheet[combined_floorsheet['Date'] >= cutoff_date]
 
     # Create pivot table for buyers
-    buyer_brokers = pd.pivot_table(
-        filtered_data,
-        values="Amount (Rs)",
-        index="Buyer",
-        columns="Date",
-        aggfunc="sum",
-        fill_value=0
-    )
+    buy, _ = buy_sell_totals(filtered_data, by=["Date"], value="Amount (Rs)")
+    buyer_brokers = buy.unstack("Date", fill_value=0)
 
     # Calculate cumulative turnover for each buyer across all dates
     buyer_brokers_cumulative = buyer_brokers.cumsum(axis=1)
@@ -55,7 +53,7 @@ def plot_buyer_cumulative_turnover_from_floorsheet(combined_floorsheet, days=30)
 
     # Update layout and axis scaling
     fig.update_layout(
-        title=f"Cumulative Turnover for Top 10 Buyers (Last {days} Days)",
+        title=f"Cumulative Turnover for Top 10 Buyers (Last {days} Trading Days)",
         height=600,
         width=1000,
         xaxis_title="Date",
@@ -77,4 +75,4 @@ def plot_buyer_cumulative_turnover_from_floorsheet(combined_floorsheet, days=30)
 
 # Example usage:
 # Assuming you have the combined_floorsheet DataFrame available:
-# plot_buyer_cumulative_turnover_from_floorsheet(combined_floorsheet, days=30)
+# plot_buyer_cumulative_turnover_from_floorsheet(combined_floorsheet, days=21)
@@ -1,43 +1,116 @@
+import numpy as np
+import pandas as pd
 import plotly.express as px
+from scripts.broker_cube import buy_sell_totals, is_broker_cube
+from scripts.trading_calendar import TradingCalendar
+from scripts.net_positions import NetPositions
 
 
-def top_NetBuyVsFloat(combined_floorsheet, float_data, active_comps, n_day, top_n):
-    floor_sheet_reduced = combined_floorsheet[['Stock Symbol', 'Buyer', 'Seller', 'Quantity', 'Date']]
-    filtered_df = floor_sheet_reduced[floor_sheet_reduced['Stock Symbol'].isin(active_comps['Ticker'])]
-    nth_date = filtered_df['Date'].drop_duplicates().sort_values().iloc[-(n_day + 1)]
-    n_day_floorsheet = filtered_df[filtered_df['Date'] >= nth_date]
-    pivot_df_buy = n_day_floorsheet.pivot_table(
-        index='Stock Symbol',
-        columns='Buyer',
-        values='Quantity',
-        aggfunc='sum',
-        fill_value=0
-    )
+def compute_net_buy_vs_float(combined_floorsheet, float_data, active_comps, n_days, top_n, calendar=None):
+    """
+    Top (broker, company) pairs by net buy quantity as a fraction of floated shares.
+
+    Net quantity is computed only for (symbol, broker) pairs that actually
+    traded, and the top_n pairs are picked with a partial sort, so cost does
+    not grow with symbols x brokers.
+
+    Parameters:
+    - combined_floorsheet: trade-level floorsheet, a broker cube (see broker_cube) or
+      NetPositions (see net_positions), which answers each horizon from prefix sums
+    - float_data: DataFrame with 'Symbol' and 'Floated Shares'
+    - active_comps: DataFrame with 'Ticker'
+    - n_days: one horizon or a list of horizons; each window spans the last n_day + 1 trading days
+    - top_n: number of pairs to keep per horizon
+    - calendar: optional TradingCalendar; built from the active symbols' dates when omitted
+
+    Returns:
+    - dict of n_day -> DataFrame with 'Buyer Broker', 'Company', 'Net Buy/float (%)'
+      sorted from largest to smallest
+    """
+    n_days = [n_days] if np.ndim(n_days) == 0 else list(n_days)
+
+    if isinstance(combined_floorsheet, NetPositions):
+        positions = combined_floorsheet
+        if calendar is None:
+            calendar = TradingCalendar(positions.sessions())
+        nth_dates = {n_day: calendar.nth_last(n_day + 1) for n_day in n_days}
+
+        def window_net(nth_date):
+            # Net quantity of each traded pair from two prefix values
+            net = positions.window(nth_date, calendar.last_session, symbols=active_comps['Ticker'])
+            net = net.rename(columns={'net_qty': 'Net'})[['Broker', 'Stock Symbol', 'Net']]
+            return net.sort_values(['Broker', 'Stock Symbol'], kind='stable').reset_index(drop=True)
+    else:
+        # combined_floorsheet may be trade-level data or a broker cube
+        if is_broker_cube(combined_floorsheet):
+            floor_sheet_reduced = combined_floorsheet
+        else:
+            floor_sheet_reduced = combined_floorsheet[['Stock Symbol', 'Buyer', 'Seller', 'Quantity', 'Date']]
+        filtered_df = floor_sheet_reduced[floor_sheet_reduced['Stock Symbol'].isin(active_comps['Ticker'])]
+
+        if calendar is None:
+            calendar = TradingCalendar.from_frame(filtered_df)
+        nth_dates = {n_day: calendar.nth_last(n_day + 1) for n_day in n_days}
+        window = filtered_df[filtered_df['Date'] >= min(nth_dates.values())]
+
+        # Net quantity per traded (broker, symbol, date), long format
+        buy, sell = buy_sell_totals(window, by=['Stock Symbol', 'Date'], value='Quantity')
+        buy = buy.rename_axis(['Broker', 'Stock Symbol', 'Date'])
+        sell = sell.rename_axis(['Broker', 'Stock Symbol', 'Date'])
+        net_daily = buy.sub(sell, fill_value=0).reset_index(name='Net')
+        net_daily['Stock Symbol'] = net_daily['Stock Symbol'].astype(str)
+
+        def window_net(nth_date):
+            return (
+                net_daily[net_daily['Date'] >= nth_date]
+                .groupby(['Broker', 'Stock Symbol'], sort=True)['Net']
+                .sum()
+                .reset_index()
+            )
+
+    float_shares = float_data.drop_duplicates('Symbol').set_index('Symbol')['Floated Shares']
+
+    results = {}
+    for n_day, nth_date in nth_dates.items():
+        net = window_net(nth_date)
+        ratio = (net['Net'] / net['Stock Symbol'].map(float_shares)).to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(ratio))
 
-    pivot_df_sell = n_day_floorsheet.pivot_table(
-    index='Stock Symbol',
-    columns='Seller',
-    values='Quantity',
-    aggfunc='sum',
-    fill_value=0
-)
-    pivot_table_diff = pivot_df_buy.sub(pivot_df_sell, fill_value=0)
-    float_shares = float_data[['Symbol', 'Floated Shares']]
-    float_shares.set_index('Symbol', inplace = True)
-    
-    # Make sure 'Floated Shares' is aligned to pivot_df's index
-    float_percent = pivot_table_diff.div(float_shares['Floated Shares'], axis=0)
-    
-    unstacked = float_percent.unstack()
-    
-    top_n = unstacked.nlargest(top_n)
-    
-    top_n_df =  top_n.reset_index()
-    top_n_df.columns = ['Buyer Broker', 'Company', 'Net Buy/float (%)']
+        # Partial sort: only the top_n candidates are fully ordered
+        k = min(top_n, len(valid))
+        candidates = valid[np.argpartition(-ratio[valid], k - 1)[:k]] if k else valid[:0]
+        candidates = candidates[np.lexsort((candidates, -ratio[candidates]))]
 
+        results[n_day] = pd.DataFrame({
+            'Buyer Broker': net['Broker'].to_numpy()[candidates],
+            'Company': net['Stock Symbol'].to_numpy()[candidates],
+            'Net Buy/float (%)': ratio[candidates],
+        })
 
+    return results
+
+
+def top_NetBuyVsFloat(combined_floorsheet, float_data, active_comps, n_day, top_n, calendar=None):
+    """
+    Plots the top (broker, company) pairs by net buy / float.
+
+    n_day may be a list of horizons; the net positions for all of them are
+    computed in one call and one chart is drawn per horizon.
+
+    Returns:
+    - the table for n_day, or a dict of tables when n_day is a list
+    """
+    tables = compute_net_buy_vs_float(combined_floorsheet, float_data, active_comps, n_day, top_n, calendar)
+    for horizon, top_n_df in tables.items():
+        title_suffix = '' if np.ndim(n_day) == 0 else f' (Last {horizon} Days)'
+        _plot_net_buy_vs_float(top_n_df.copy(), title_suffix)
+
+    return tables[n_day] if np.ndim(n_day) == 0 else tables
+
+
+def _plot_net_buy_vs_float(top_n_df, title_suffix='', renderer=None):
     # Combine 'Buyer Broker' and 'Company' into a single label
-    top_n_df['Label'] = top_n_df['Buyer Broker'].astype(str) + ' - ' + top_n_df['Company']
+    top_n_df['Label'] = top_n_df['Buyer Broker'].astype(str) + ' - ' + top_n_df['Company'].astype(str)
 
     # Sort for cleaner layout (optional)
     top_n_df = top_n_df.sort_values('Net Buy/float (%)', ascending=True)
@@ -71,11 +144,7 @@ def top_NetBuyVsFloat(combined_floorsheet, float_data, active_comps, n_day, top_
         yaxis=dict(tickfont=dict(size=10)),
         xaxis_tickformat=".2%",
         showlegend=False,
-        title='Net Buy/Float (%) by Buyer Broker and Company',
+        title='Net Buy/Float (%) by Buyer Broker and Company' + title_suffix,
     )
 
-    fig.show()
-
-
-
-    
\ No newline at end of file
+    fig.show(renderer=renderer)
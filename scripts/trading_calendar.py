@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+
+class TradingCalendar:
+    """
+    Sorted trading sessions with O(log n) window lookups.
+
+    Build it once from the data (or the store manifest) and pass it to the
+    analysis functions so "last N trading days" means the same thing
+    everywhere and nobody re-sorts the full floorsheet to find a cutoff.
+
+    Example:
+        calendar = TradingCalendar.from_frame(combined_floorsheet)
+        cutoff = calendar.nth_last(10)        # first day of the last 10 sessions
+        window = calendar.sessions_between("2025-01-01", "2025-01-31")
+    """
+
+    def __init__(self, dates):
+        dates = pd.to_datetime(pd.Series(np.asarray(dates).ravel())).dropna()
+        self.sessions = np.unique(dates.to_numpy(dtype="datetime64[ns]"))
+
+    @classmethod
+    def from_frame(cls, df, date_column="Date"):
+        """Calendar of the dates present in df[date_column]."""
+        return cls(pd.unique(df[date_column]))
+
+    @classmethod
+    def from_store(cls, store_dir=None):
+        """Calendar of the trading dates in the local floorsheet store, read from its manifest only."""
+        from scripts.floorsheet_store import DEFAULT_STORE_DIR, store_trading_dates
+        return cls(store_trading_dates(store_dir or DEFAULT_STORE_DIR))
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, date):
+        date = np.datetime64(pd.Timestamp(date), "ns")
+        i = np.searchsorted(self.sessions, date)
+        return i < len(self.sessions) and self.sessions[i] == date
+
+    @property
+    def last_session(self):
+        return pd.Timestamp(self.sessions[-1])
+
+    def nth_last(self, n, as_of=None):
+        """
+        The n-th last session (n=1 is the latest), optionally counting back
+        from the last session on or before as_of.
+        """
+        end = len(self.sessions) if as_of is None else self._index_on_or_before(as_of) + 1
+        if n < 1 or n > end:
+            raise ValueError(f"Not enough trading days: Requested {n}, Got {end}")
+        return pd.Timestamp(self.sessions[end - n])
+
+    def last_n(self, n, as_of=None):
+        """The last n sessions (fewer if the calendar is shorter) as a DatetimeIndex."""
+        end = len(self.sessions) if as_of is None else self._index_on_or_before(as_of) + 1
+        return pd.DatetimeIndex(self.sessions[max(end - n, 0):end])
+
+    def window_start(self, n, as_of=None):
+        """
+        First session of the last n sessions (the earliest session if the
+        calendar is shorter); raises ValueError for n < 1 or an empty calendar.
+        """
+        if n < 1:
+            raise ValueError(f"Number of trading days must be at least 1, got {n}")
+        window = self.last_n(n, as_of)
+        if len(window) == 0:
+            raise ValueError("No trading days to take a window from")
+        return window[0]
+
+    def sessions_between(self, start, end):
+        """Sessions from start to end, both inclusive, as a DatetimeIndex."""
+        lo = np.searchsorted(self.sessions, np.datetime64(pd.Timestamp(start), "ns"), side="left")
+        hi = np.searchsorted(self.sessions, np.datetime64(pd.Timestamp(end), "ns"), side="right")
+        return pd.DatetimeIndex(self.sessions[lo:hi])
+
+    def _index_on_or_before(self, date):
+        return int(np.searchsorted(self.sessions, np.datetime64(pd.Timestamp(date), "ns"), side="right")) - 1
+
+
+def symbol_cutoffs(df, days, symbol_column="Stock Symbol", date_column="Date"):
+    """
+    First date of each symbol's own last `days` trading days, for all symbols at once.
+
+    Symbols with fewer than `days` trading days are left out.
+
+    Returns:
+    - Series of symbol -> cutoff date
+    """
+    sessions = pd.DataFrame({
+        symbol_column: df[symbol_column].astype(str).to_numpy(),
+        date_column: pd.to_datetime(df[date_column]).to_numpy()
+    }).drop_duplicates()
+    rank = sessions.groupby(symbol_column)[date_column].rank(method="first", ascending=False)
+    return sessions.loc[rank == days].set_index(symbol_column)[date_column]
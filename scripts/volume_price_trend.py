@@ -2,17 +2,19 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from scripts.price_panel import get_price_panel
 
-def calculate_and_plot_vpt(data: pd.DataFrame, data_type: str = "indices", trading_days: int = 300, sector_name: str = None):
+def calculate_and_plot_vpt(data: pd.DataFrame, data_type: str = "indices", trading_days: int = 300, sector_name: str = None, renderer: str = None):
     """
     Calculates and plots Volume Price Trend (VPT) for stocks (with optional sector) or indices.
 
     Parameters:
     - data: DataFrame with columns ['Date', 'Ticker', 'Close', 'Volume' or 'Turnover']
-             and 'Sector' if filtering stocks
+             and 'Sector' if filtering stocks, or its PricePanel (see price_panel)
     - data_type: 'stocks' or 'indices'
     - trading_days: Number of most recent trading days to include
     - sector_name: Sector name to filter if data_type is 'stocks'
+    - renderer: Plotly renderer for fig.show(); the default renderer when None
 
     Returns:
     - vpt: DataFrame of raw VPT values
@@ -20,25 +22,19 @@ def calculate_and_plot_vpt(data: pd.DataFrame, data_type: str = "indices", tradi
     assert data_type in ['stocks', 'indices'], "data_type must be 'stocks' or 'indices'"
     volume_col = 'Turnover' if data_type == 'stocks' else 'Volume'
 
-    data['Date'] = pd.to_datetime(data['Date'])
-    data = data.sort_values('Date')
+    panel = get_price_panel(data)
 
     # Optional sector filter
     if data_type == 'stocks' and sector_name:
-        if 'Sector' not in data.columns:
-            raise ValueError("Data must include 'Sector' column to filter by sector.")
-        data = data[data['Sector'] == sector_name]
+        panel = panel.sector(sector_name)
 
-    if data.empty:
+    if len(panel) == 0:
         raise ValueError("Filtered data is empty. Check your sector name or input data.")
 
-    # Pivot Close and Volume
-    pivot_close = pd.pivot_table(data, values="Close", index="Date", columns="Ticker", fill_value=0)
-    pivot_volume = pd.pivot_table(data, values=volume_col, index="Date", columns="Ticker", fill_value=0)
-
-    # Only use actual trading days
-    pivot_close = pivot_close.tail(trading_days)
-    pivot_volume = pivot_volume.loc[pivot_close.index]  # Align to avoid mismatches
+    # Close and Volume for the last N actual trading days, aligned by the panel
+    panel = panel.tail(trading_days)
+    pivot_close = panel.frame("Close", fill_value=0)
+    pivot_volume = panel.frame(volume_col, fill_value=0)
 
     # Daily returns
     daily_return = pivot_close.pct_change().fillna(0)
@@ -79,7 +75,7 @@ def calculate_and_plot_vpt(data: pd.DataFrame, data_type: str = "indices", tradi
         showlegend=False
     )
 
-    fig.show()
+    fig.show(renderer=renderer)
 
 def stock_wise_VPT(data: pd.DataFrame, data_type: str = "indices", trading_days: int = 300, sector_name: str = None):
     """
@@ -87,7 +83,7 @@ def stock_wise_VPT(data: pd.DataFrame, data_type: str = "indices", trading_days:
 
     Parameters:
     - data: DataFrame with columns ['Date', 'Ticker', 'Close', 'Volume' or 'Turnover']
-             and 'Sector' if filtering stocks
+             and 'Sector' if filtering stocks, or its PricePanel (see price_panel)
     - data_type: 'stocks' or 'indices'
     - trading_days: Number of most recent trading days to include
     - sector_name: Sector name to filter if data_type is 'stocks'
@@ -98,25 +94,19 @@ def stock_wise_VPT(data: pd.DataFrame, data_type: str = "indices", trading_days:
     assert data_type in ['stocks', 'indices'], "data_type must be 'stocks' or 'indices'"
     volume_col = 'Turnover' if data_type == 'stocks' else 'Volume'
 
-    data['Date'] = pd.to_datetime(data['Date'])
-    data = data.sort_values('Date')
+    panel = get_price_panel(data)
 
     # Optional sector filter
     if data_type == 'stocks' and sector_name:
-        if 'Sector' not in data.columns:
-            raise ValueError("Data must include 'Sector' column to filter by sector.")
-        data = data[data['Sector'] == sector_name]
+        panel = panel.sector(sector_name)
 
-    if data.empty:
+    if len(panel) == 0:
         raise ValueError("Filtered data is empty. Check your sector name or input data.")
 
-    # Pivot Close and Volume
-    pivot_close = pd.pivot_table(data, values="Close", index="Date", columns="Ticker", fill_value=0)
-    pivot_volume = pd.pivot_table(data, values=volume_col, index="Date", columns="Ticker", fill_value=0)
-
-    # Only use actual trading days
-    pivot_close = pivot_close.tail(trading_days)
-    pivot_volume = pivot_volume.loc[pivot_close.index]  # Align to avoid mismatches
+    # Close and Volume for the last N actual trading days, aligned by the panel
+    panel = panel.tail(trading_days)
+    pivot_close = panel.frame("Close", fill_value=0)
+    pivot_volume = panel.frame(volume_col, fill_value=0)
 
     # Daily returns
     daily_return = pivot_close.pct_change().fillna(0)
@@ -1,54 +1,58 @@
 import numpy as np
 import pandas as pd
-from datetime import timedelta
 import plotly.express as px
+from scripts.trading_calendar import TradingCalendar
+from scripts.price_panel import get_price_panel
 
-def plot_relative_turnover_heatmap(adjusted_price, float_data, top_n=20, timeframes=None):
+def plot_relative_turnover_heatmap(adjusted_price, float_data, top_n=20, timeframes=None, calendar=None, renderer=None):
     """
     Computes and plots a heatmap of relative turnover (volume / free float) 
     for the top N tickers across given timeframes.
 
     Parameters:
-        adjusted_price (pd.DataFrame): Must contain 'Date', 'Ticker', 'Volume'.
+        adjusted_price (pd.DataFrame): Must contain 'Date', 'Ticker', 'Volume'; or its PricePanel.
         float_data (pd.DataFrame): Must contain 'Symbol' and 'Floated Shares'.
         top_n (int): Number of top tickers to include based on longest timeframe.
-        timeframes (dict): Optional custom timeframes, default is {'1D': 1 day, '1W': 1 week}.
+        timeframes (dict): Optional custom timeframes of label -> start date or number of
+            trading days, default is {'1D': 1, '1W': 5} (last session and last five sessions).
+        calendar (TradingCalendar): Optional shared calendar; the price dates when omitted.
+        renderer (str): Plotly renderer for fig.show(); the default renderer when None.
     """
+    panel = get_price_panel(adjusted_price)
+
     # Default timeframes if not provided
     if timeframes is None:
-        today = adjusted_price['Date'].max()
-        timeframes = {
-            '1D': today - timedelta(days=1),
-            '1W': today - timedelta(weeks=1)
-        }
+        timeframes = {'1D': 1, '1W': 5}
+    if calendar is None:
+        calendar = TradingCalendar(panel.dates)
+    timeframes = {
+        label: calendar.window_start(start) if isinstance(start, (int, np.integer)) else pd.Timestamp(start)
+        for label, start in timeframes.items()
+    }
 
     # Step 1: Prepare floated shares
     floated_series = float_data.set_index('Symbol')['Floated Shares']
 
-    # Step 2: Pivot volume data
-    traded_shares = adjusted_price[['Date', 'Ticker', 'Volume']]
-    volume_pivot = traded_shares.pivot(index='Date', columns='Ticker', values='Volume').fillna(0)
-
-    # Step 3: Compute turnover for each timeframe
-    today = volume_pivot.index.max()
+    # Step 2: Compute turnover for each timeframe from the volume panel
+    today = panel.dates.max()
     turnover_data = {}
 
     for label, start_date in timeframes.items():
         if start_date > today:
             raise ValueError(f"Start date for timeframe '{label}' is after latest date in data.")
-        period_volume = volume_pivot.loc[start_date:today].sum()
+        period_volume = panel.between(start_date, today).frame('Volume', fill_value=0).sum()
         turnover = period_volume / floated_series
         turnover_data[label] = turnover
 
-    # Step 4: Combine into DataFrame
+    # Step 3: Combine into DataFrame
     turnover_df = pd.DataFrame(turnover_data)
     turnover_df.dropna(how='all', inplace=True)
 
-    # Step 5: Sort by longest timeframe for top_n
+    # Step 4: Sort by longest timeframe for top_n
     last_period = list(timeframes.keys())[-1]
     turnover_df_sorted = turnover_df.sort_values(by=last_period, ascending=False).head(top_n).dropna()
 
-    # Step 6: Plot heatmap
+    # Step 5: Plot heatmap
     fig = px.imshow(
         turnover_df_sorted,
         text_auto='.2f',
@@ -61,4 +65,4 @@ def plot_relative_turnover_heatmap(adjusted_price, float_data, top_n=20, timefra
         yaxis_title='Ticker',
         height=600
     )
-    fig.show()
+    fig.show(renderer=renderer)
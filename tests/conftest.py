@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StandIn:
+    """
+    A local HTTP server answering from a routes dict.
+
+    routes maps (method, path) to a response or a list of responses served in
+    turn (the last one repeats); a response is (status, body) where body is
+    bytes, str or a JSON-serializable object. Every request is recorded.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stand_in.requests.append({
+                    "method": self.command, "host": self.headers.get("Host"), "path": url.path,
+                    "query": parse_qs(url.query), "headers": dict(self.headers), "body": body,
+                })
+                responses = stand_in.routes.get((self.command, url.path), (404, "not found"))
+                if isinstance(responses, list):
+                    responses = responses.pop(0) if len(responses) > 1 else responses[0]
+                status, payload = responses
+                if not isinstance(payload, (bytes, str)):
+                    payload = json.dumps(payload)
+                payload = payload.encode() if isinstance(payload, str) else payload
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _answer
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path, host="127.0.0.1"):
+        return f"http://{host}:{self.port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
@@ -0,0 +1,48 @@
+import json
+
+from scripts.floorsheet_api import COLUMNS, fetch_floorsheet
+from scripts.get_floorsheet import make_session
+
+
+def _trade(contract_id, symbol):
+    return {
+        "contractId": contract_id, "stockSymbol": symbol, "buyerMemberId": 58, "sellerMemberId": 34,
+        "contractQuantity": 10, "contractRate": 500.0, "contractAmount": 5000.0, "businessDate": "2025-01-01",
+    }
+
+
+# Pages as recorded from the floorsheet endpoint, trimmed to two trades each
+PAGES = [
+    {"floorsheets": {"totalPages": 3, "content": [_trade(6, "NABIL"), _trade(5, "NICA")]}},
+    {"floorsheets": {"totalPages": 3, "content": [_trade(4, "NABIL"), _trade(3, "HIDCL")]}},
+    {"floorsheets": {"totalPages": 3, "content": [_trade(2, "NICA"), _trade(1, "NABIL")]}},
+]
+
+
+def _serve_pages(stand_in, method):
+    # The stand-in routes by path only, so pages are served in the order they are asked for
+    stand_in.routes[(method, "/floorsheet")] = [(200, page) for page in PAGES]
+
+
+def test_pages_are_stitched_in_page_order(stand_in):
+    _serve_pages(stand_in, "GET")
+    session = make_session(pool_size=1, headers={})
+
+    df = fetch_floorsheet(stand_in.url("/floorsheet"), page_size=2, max_workers=1, session=session)
+
+    assert list(df.columns) == COLUMNS
+    assert list(df["Contract No."]) == [6, 5, 4, 3, 2, 1]
+    assert list(df["S.N"]) == [1, 2, 3, 4, 5, 6]
+    assert [request["query"]["page"] for request in stand_in.requests] == [["0"], ["1"], ["2"]]
+    assert stand_in.requests[0]["query"]["size"] == ["2"]
+
+
+def test_payload_switches_to_post(stand_in):
+    _serve_pages(stand_in, "POST")
+    session = make_session(pool_size=1, headers={}, methods=("GET", "POST"))
+
+    df = fetch_floorsheet(stand_in.url("/floorsheet"), page_size=2, max_workers=1, session=session, payload={"id": 7})
+
+    assert len(df) == 6
+    assert {request["method"] for request in stand_in.requests} == {"POST"}
+    assert all(json.loads(request["body"]) == {"id": 7} for request in stand_in.requests)
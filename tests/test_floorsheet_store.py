@@ -0,0 +1,58 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+import scripts.floorsheet_store as floorsheet_store
+from scripts.floorsheet_store import append_to_store, load_floorsheet
+from scripts.accumulation_trend import _load_stock_window
+from scripts.broker_flows import compute_broker_flows
+
+
+def _trades():
+    # NABIL trades every session, NICA only on every third one
+    rng = np.random.default_rng(0)
+    rows = []
+    for i, date in enumerate(pd.bdate_range("2025-01-01", periods=30)):
+        for symbol in ["NABIL"] + (["NICA"] if i % 3 == 0 else []):
+            for j in range(8):
+                rows.append({
+                    "Date": date, "Contract No.": int(date.strftime("%Y%m%d")) * 10 ** 6 + len(rows),
+                    "Stock Symbol": symbol, "Buyer": int(rng.integers(1, 9)), "Seller": int(rng.integers(1, 9)),
+                    "Quantity": 10, "Rate (Rs)": 500.0, "Amount (Rs)": float(rng.integers(1000, 9000)),
+                })
+    return pd.DataFrame(rows)
+
+
+def _store(tmp_path):
+    append_to_store(_trades(), str(tmp_path))
+    return str(tmp_path)
+
+
+def test_empty_date_range_keeps_the_requested_columns(tmp_path):
+    store_dir = _store(tmp_path)
+
+    df = load_floorsheet(start_date="2030-01-01", columns=["Buyer"], store_dir=store_dir)
+    assert df.empty and list(df.columns) == ["Buyer", "Date"]
+    assert df["Buyer"].dtype == "int64" and df["Date"].dtype.kind == "M"
+
+    df = load_floorsheet(start_date="2030-01-01", store_dir=store_dir)
+    full = load_floorsheet(store_dir=store_dir)
+    assert df.empty and list(df.columns) == list(full.columns)
+    assert df.dtypes.astype(str).equals(full.dtypes.astype(str))
+
+
+def test_stock_window_uses_the_stocks_own_sessions(tmp_path, monkeypatch):
+    store_dir = _store(tmp_path)
+    monkeypatch.setattr(floorsheet_store, "load_floorsheet", functools.partial(load_floorsheet, store_dir=store_dir))
+    trades = load_floorsheet(store_dir=store_dir)
+
+    window = _load_stock_window("NICA", 5)
+
+    nica_sessions = trades.loc[trades["Stock Symbol"] == "NICA", "Date"].drop_duplicates()
+    assert window["Date"].nunique() == 5
+    assert window["Date"].min() == nica_sessions.nlargest(5).min()
+
+    from_store = compute_broker_flows(window, ["NICA"], days=5, top_n=3)["NICA"]
+    from_frame = compute_broker_flows(trades, ["NICA"], days=5, top_n=3)["NICA"]
+    pd.testing.assert_frame_equal(from_store.flows.reset_index(drop=True), from_frame.flows.reset_index(drop=True))
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from scripts.get_floorsheet import make_session, list_daily_floorsheet_files, iter_daily_floorsheet_csvs
+
+CSV = "Date,Stock Symbol,Quantity\n2025-01-01,NABIL,10\n2025-01-01,NICA,20\n"
+
+
+def _listing(stand_in):
+    # The listing is served as the API host ("localhost"), downloads as the raw host ("127.0.0.1")
+    return [
+        {"name": name, "sha": name, "download_url": stand_in.url(f"/raw/{name}")}
+        for name in ("2025-01-01.csv", "2025-01-02.csv")
+    ] + [{"name": "README.md", "sha": "x", "download_url": stand_in.url("/raw/README.md")}]
+
+
+def test_token_is_only_sent_to_the_api_host(stand_in, monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "secret")
+    stand_in.routes[("GET", "/contents")] = (200, _listing(stand_in))
+    stand_in.routes[("GET", "/raw/2025-01-01.csv")] = (200, CSV)
+    stand_in.routes[("GET", "/raw/2025-01-02.csv")] = (200, CSV)
+
+    session = make_session(pool_size=2, api_host="localhost")
+    files = list_daily_floorsheet_files(stand_in.url("/contents", host="localhost"), session=session)
+    fetched = dict((file["name"], df) for file, df in iter_daily_floorsheet_csvs(files, max_workers=2, session=session))
+
+    assert sorted(fetched) == ["2025-01-01.csv", "2025-01-02.csv"]
+    assert list(fetched["2025-01-01.csv"]["Stock Symbol"]) == ["NABIL", "NICA"]
+    authorization = {request["path"]: request["headers"].get("Authorization") for request in stand_in.requests}
+    assert authorization["/contents"] == "token secret"
+    assert authorization["/raw/2025-01-01.csv"] is None
+    assert authorization["/raw/2025-01-02.csv"] is None
+
+
+def test_downloads_are_retried_on_server_errors(stand_in):
+    stand_in.routes[("GET", "/raw/2025-01-01.csv")] = [(503, "busy"), (503, "busy"), (200, CSV)]
+    files = [{"name": "2025-01-01.csv", "download_url": stand_in.url("/raw/2025-01-01.csv")}]
+
+    session = make_session(pool_size=1, retries=3, backoff=0, headers={})
+    (file, df), = iter_daily_floorsheet_csvs(files, max_workers=1, session=session, progress=False)
+
+    assert len(stand_in.requests) == 3
+    assert isinstance(df, pd.DataFrame) and len(df) == 2
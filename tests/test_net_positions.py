@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from scripts.floorsheet_store import append_to_store, read_manifest, write_manifest, write_partition
+from scripts.net_positions import load_net_positions
+
+
+def _trades(dates, seed):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for date in dates:
+        for symbol in ["NABIL", "NICA", "ADBL"]:
+            for _ in range(6):
+                rows.append({
+                    "Date": date, "Contract No.": int(date.strftime("%Y%m%d")) * 10 ** 6 + seed * 10 ** 4 + len(rows),
+                    "Stock Symbol": symbol, "Buyer": int(rng.integers(1, 6)), "Seller": int(rng.integers(1, 6)),
+                    "Quantity": int(rng.integers(1, 50)), "Rate (Rs)": 500.0, "Amount (Rs)": float(rng.integers(1000, 9000)),
+                })
+    return pd.DataFrame(rows)
+
+
+def _net(trades, start, end):
+    """Net position per (Stock Symbol, Broker) from start to end, straight from the trades."""
+    trades = trades[(trades["Date"] >= start) & (trades["Date"] <= end)]
+    sides = []
+    for broker_column, sign in (("Buyer", 1), ("Seller", -1)):
+        side = trades.groupby(["Stock Symbol", broker_column])[["Quantity", "Amount (Rs)"]].sum() * sign
+        sides.append(side.rename_axis(["Stock Symbol", "Broker"]))
+    net = pd.concat(sides).groupby(level=[0, 1]).sum()
+    return net.rename(columns={"Quantity": "net_qty", "Amount (Rs)": "net_amt"}).astype(float)
+
+
+def _assert_matches(positions, trades):
+    dates = pd.DatetimeIndex(sorted(trades["Date"].unique()))
+    for start, end in [(dates[0], dates[-1]), (dates[3], dates[7]), (dates[-2], dates[-1])]:
+        window = positions.window(start, end).set_index(["Stock Symbol", "Broker"]).sort_index()
+        window.index = window.index.set_levels(window.index.levels[1].astype("int64"), level=1)
+        pd.testing.assert_frame_equal(window.astype(float), _net(trades, start, end), check_names=False)
+
+    start = dates[2]
+    cumulative = positions.cumulative("NICA", start, dates[2:])
+    for date in dates[2:]:
+        expected = _net(trades, start, date).loc["NICA", "net_amt"]
+        actual = cumulative[date]
+        actual.index = actual.index.astype("int64")
+        pd.testing.assert_series_equal(actual[actual.index.isin(expected.index)].sort_index(), expected, check_names=False)
+
+
+def test_incremental_updates_match_a_full_groupby(tmp_path):
+    store_dir = str(tmp_path)
+    dates = pd.bdate_range("2025-01-01", periods=12)
+    trades = []
+    for seed, chunk in enumerate([dates[:5], dates[5:6], dates[6:9], dates[9:]]):
+        trades.append(_trades(chunk, seed))
+        append_to_store(trades[-1], store_dir)
+        positions = load_net_positions(store_dir)
+
+    assert len(read_manifest(store_dir)["positions"]["parts"]) == 4
+    _assert_matches(positions, pd.concat(trades, ignore_index=True))
+
+
+def test_backfill_and_changed_files_rebuild(tmp_path):
+    store_dir = str(tmp_path)
+    dates = pd.bdate_range("2025-01-01", periods=12)
+    early, late = _trades(dates[:6], 0), _trades(dates[8:], 1)
+    append_to_store(early, store_dir)
+    append_to_store(late, store_dir)
+    load_net_positions(store_dir)
+
+    # Days older than the last processed one
+    backfill = _trades(dates[6:8], 2)
+    append_to_store(backfill, store_dir)
+    trades = pd.concat([early, late, backfill], ignore_index=True)
+    positions = load_net_positions(store_dir)
+    assert len(read_manifest(store_dir)["positions"]["parts"]) == 1
+    _assert_matches(positions, trades)
+
+    # A re-downloaded file: same partition, new content and sha, cube dropped by the sync
+    manifest = read_manifest(store_dir)
+    name = next(name for name in manifest["files"] if name.startswith(f"{dates[4]:%Y-%m-%d}"))
+    redownload = _trades(dates[4:5], 3)
+    entry = write_partition(redownload, store_dir, name)
+    entry["sha"] = "changed"
+    manifest["files"][name] = entry
+    write_manifest(manifest, store_dir)
+    trades = pd.concat([trades[trades["Date"] != dates[4]], redownload], ignore_index=True)
+    _assert_matches(load_net_positions(store_dir), trades)
+
+
+def test_file_without_trades_is_skipped(tmp_path):
+    store_dir = str(tmp_path)
+    dates = pd.bdate_range("2025-01-01", periods=10)
+    trades = _trades(dates, 0)
+    append_to_store(trades, store_dir)
+    load_net_positions(store_dir)
+
+    manifest = read_manifest(store_dir)
+    manifest["files"]["empty.csv"] = dict(write_partition(trades.iloc[:0], store_dir, "empty"), sha="empty")
+    write_manifest(manifest, store_dir)
+
+    positions = load_net_positions(store_dir)
+    assert "empty.csv" in read_manifest(store_dir)["positions"]["files"]
+    _assert_matches(positions, trades)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+import scripts.price_panel as price_panel
+from scripts.price_panel import get_price_panel
+
+
+def _prices():
+    dates = pd.bdate_range("2025-01-01", periods=30)
+    tickers = ["NABIL", "NICA", "HIDCL"]
+    return pd.DataFrame({
+        "Date": np.repeat(dates, len(tickers)),
+        "Ticker": np.tile(tickers, len(dates)),
+        "Close": np.arange(len(dates) * len(tickers), dtype=float),
+        "Turnover": 1.0,
+    })
+
+
+def test_second_call_neither_pivots_nor_hashes(monkeypatch):
+    data = _prices()
+    built, hashed = [], []
+    build = price_panel._PANEL_CACHE.build
+    monkeypatch.setattr(price_panel._PANEL_CACHE, "build", lambda df: built.append(1) or build(df))
+    monkeypatch.setattr(pd.util, "hash_pandas_object", lambda *args, **kwargs: hashed.append(1))
+
+    first = get_price_panel(data)
+    second = get_price_panel(data)
+
+    assert second is first
+    assert len(built) == 1 and not hashed
+    expected = data.pivot_table(values="Close", index="Date", columns="Ticker")
+    pd.testing.assert_frame_equal(second.tail(20).frame("Close"), expected.tail(20), check_names=False)
+
+
+def test_panel_is_rebuilt_when_rows_are_added():
+    data = _prices()
+    panel = get_price_panel(data)
+    data.loc[len(data)] = [pd.Timestamp("2025-03-01"), "NABIL", 1.0, 1.0]
+
+    assert get_price_panel(data) is not panel
+    assert get_price_panel(data).dates[-1] == pd.Timestamp("2025-03-01")
+
+
+def test_version_is_shared_between_copies():
+    data = _prices()
+    assert get_price_panel(data.copy(), version="etag-1") is get_price_panel(data.copy(), version="etag-1")
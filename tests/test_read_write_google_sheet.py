@@ -0,0 +1,125 @@
+import re
+import json
+from urllib.parse import urlparse, unquote, parse_qs
+
+import gspread
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter
+
+from scripts.read_write_google_sheet import SheetsClient, dataframe_values
+
+
+class FakeSheets(BaseAdapter):
+    """
+    A one-worksheet spreadsheet behind the Sheets API, mounted on a requests session.
+
+    Keeps the cell values and grid size and records every request as
+    (method, API call, query).
+    """
+
+    def __init__(self, rows=1000, cols=26):
+        super().__init__()
+        self.values = []
+        self.rows, self.cols = rows, cols
+        self.calls = []
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        path = unquote(url.path).split("/v4/spreadsheets/S")[-1]
+        body = json.loads(request.body) if request.body else None
+        call = re.sub(r"/values/[^:]*", "/values", path) or "/"
+        self.calls.append((request.method, call, parse_qs(url.query)))
+
+        if path.endswith(":append"):
+            # INSERT_ROWS adds rows to the grid
+            self.values += body["values"]
+            self.rows += len(body["values"])
+            return self._response(request, {"updates": {}})
+        if path.endswith(":clear"):
+            self.values = []
+            return self._response(request, {})
+        if path.endswith("values:batchUpdate"):
+            for data in body["data"]:
+                start = int(re.match(r"(?:.*!)?A(\d+):", data["range"]).group(1)) - 1
+                self.values += [[]] * max(0, start + len(data["values"]) - len(self.values))
+                self.values[start:start + len(data["values"])] = data["values"]
+            return self._response(request, {})
+        if path.endswith(":batchUpdate"):
+            grid = body["requests"][0]["updateSheetProperties"]["properties"]["gridProperties"]
+            self.rows, self.cols = grid.get("rowCount", self.rows), grid.get("columnCount", self.cols)
+            return self._response(request, {})
+        if "/values/" in path:
+            return self._response(request, {"values": [[str(value) for value in row] for row in self.values]})
+        return self._response(request, {
+            "spreadsheetId": "S", "properties": {"title": "Prices"},
+            "sheets": [{"properties": {
+                "sheetId": 0, "title": "Sheet1", "index": 0,
+                "gridProperties": {"rowCount": self.rows, "columnCount": self.cols},
+            }}],
+        })
+
+    def _response(self, request, body):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        response.headers["Content-Type"] = "application/json"
+        response.url, response.request = request.url, request
+        return response
+
+    def close(self):
+        pass
+
+
+def _sheets(fake, chunk_rows):
+    session = requests.Session()
+    session.mount("https://", fake)
+    return SheetsClient(gspread.Client(auth=None, session=session), chunk_rows=chunk_rows)
+
+
+def _prices(rows):
+    df = pd.DataFrame({"Ticker": [f"T{i}" for i in range(rows)], "Close": np.arange(rows) * 1.5, "Volume": np.arange(rows)})
+    df.loc[3, "Close"] = np.nan
+    return df
+
+
+def test_append_sends_chunked_server_side_appends():
+    fake = FakeSheets()
+    sheets = _sheets(fake, chunk_rows=100)
+
+    sheets.write(_prices(250), "S", mode="append")
+
+    appends = [query for method, call, query in fake.calls if call.endswith(":append")]
+    assert len(appends) == 3
+    assert all(query["valueInputOption"] == ["USER_ENTERED"] and query["insertDataOption"] == ["INSERT_ROWS"] for query in appends)
+    assert fake.values == dataframe_values(_prices(250), include_column_header=False)
+    assert fake.values[3] == ["T3", "", 3]
+
+
+def test_overwrite_resizes_the_grid_and_writes_in_chunks():
+    fake = FakeSheets(rows=1000, cols=2)
+    sheets = _sheets(fake, chunk_rows=1000)
+    df = _prices(2500)
+
+    sheets.overwrite(df, "S")
+
+    updates = [call for method, call, query in fake.calls if call.endswith("values:batchUpdate")]
+    assert len(updates) == 3
+    assert (fake.rows, fake.cols) == (2501, 4)
+    assert fake.values == dataframe_values(df, include_index=True)
+    assert fake.values[0] == ["", "Ticker", "Close", "Volume"]
+
+
+def test_overwrite_reads_the_current_grid_size():
+    fake = FakeSheets(rows=1000)
+    sheets = _sheets(fake, chunk_rows=1000)
+    sheets.read("S")  # caches the worksheet with 1000 rows
+    _sheets(fake, chunk_rows=1000).append(_prices(1500), "S")  # another writer grows the grid
+    fake.calls.clear()
+
+    sheets.overwrite(_prices(2000), "S")
+
+    # The grid already has 2500 rows; the cached size would shrink it to 2001
+    assert fake.rows == 2500
+    assert not any(call.endswith(":batchUpdate") and not call.endswith("values:batchUpdate") for _, call, _ in fake.calls)
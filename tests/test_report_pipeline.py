@@ -0,0 +1,70 @@
+from scripts.report_pipeline import ReportPipeline, Stage
+
+
+class FakeStore:
+    """A store whose sync copies the days published upstream."""
+
+    def __init__(self):
+        self.today = "2025-01-02"
+        self.days = ["2025-01-01"]
+        self.upstream = ["2025-01-01", "2025-01-02"]
+        self.calls = []
+
+    def version(self):
+        return {"date": self.today, "store": list(self.days)}
+
+    def sync(self):
+        self.calls.append("sync")
+        self.days = list(self.upstream)
+        return list(self.days)
+
+    def load(self, sync):
+        self.calls.append("load")
+        return list(self.days)
+
+    def analyze(self, floorsheet):
+        self.calls.append("analyze")
+        return len(floorsheet)
+
+
+def _pipeline(store, cache_dir):
+    return ReportPipeline([
+        Stage("sync", store.sync, kind="load", version=store.version, token=True),
+        Stage("floorsheet", store.load, ["sync"], kind="load", cache=False),
+        Stage("sessions", store.analyze, ["floorsheet"]),
+    ], str(cache_dir))
+
+
+def test_run_after_a_sync_that_added_a_day_is_fully_cached(tmp_path):
+    store = FakeStore()
+
+    assert _pipeline(store, tmp_path).run() == {"sessions": 2}
+    assert store.calls == ["sync", "load", "analyze"]
+
+    store.calls.clear()
+    assert _pipeline(store, tmp_path).run() == {"sessions": 2}
+    assert store.calls == []
+
+
+def test_sync_without_new_days_rebuilds_nothing_else(tmp_path):
+    store = FakeStore()
+    _pipeline(store, tmp_path).run()
+
+    store.today = "2025-01-03"
+    store.calls.clear()
+    _pipeline(store, tmp_path).run()
+    assert store.calls == ["sync"]
+
+    store.today = "2025-01-04"
+    store.upstream.append("2025-01-04")
+    store.calls.clear()
+    assert _pipeline(store, tmp_path).run() == {"sessions": 3}
+    assert store.calls == ["sync", "load", "analyze"]
+
+
+def test_plan_has_no_side_effects(tmp_path):
+    store = FakeStore()
+    _, run = _pipeline(store, tmp_path).plan()
+
+    assert run == ["sync", "floorsheet", "sessions"]
+    assert store.calls == [] and store.days == ["2025-01-01"]